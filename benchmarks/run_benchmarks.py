@@ -0,0 +1,286 @@
+"""Benchmarks of the sample generation pipeline on synthetic graphs.
+
+Each case is timed (best of --repeat runs) and memory profiled (peak of
+the traced allocations, in a separate run) on graphs 1x, 10x, 100x, 1000x
+the size the notebook is tuned for (see utils.synthetic.BASE_GRAPH). Cases
+whose output would exceed --max-items are skipped and reported as such.
+
+Usage, from the repository root:
+
+    python -m benchmarks.run_benchmarks --scales 1 10 100
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/baseline.json
+"""
+
+from typing import Any, List, Dict, Callable, Tuple
+import argparse
+import os
+import platform
+import random
+import sys
+import tracemalloc
+# graph_utils exports neo4j.time, import the functions rather than the module
+from time import perf_counter, strftime
+
+# Import local modules
+from utils.utilities import *
+from utils.graph_utils import *
+from utils.synthetic import synthetic_graph, scaled_graph
+from utils.templates import *
+from utils.generators import GeneratorContext
+from utils.instance_table import tabulate_views
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class Case:
+    """One benchmarked call: run() returns the size of its output,
+    estimate() the expected size, checked against max_items before running."""
+
+    def __init__(self,
+                 name: str,
+                 run: Callable[[], int],
+                 estimate: Callable[[], int] = None,
+                 ) -> None:
+        self.name = name
+        self.run = run
+        self.estimate = estimate
+
+
+def _template(kind: str,
+              ctx: GeneratorContext,
+              ) -> QueryTemplate:
+    """First template of a sampler kind whose instance sources are available."""
+    views = {NODE: ctx.dparsed, NODE_PAIR: ctx.dparsed, NODE_PAIR_SAME_LABEL: ctx.dparsed,
+             RELATIONSHIP: ctx.drels, RELATIONSHIP_WITH_PROPS: ctx.drelsprops}.get(kind, {})
+    return next(t for t in TEMPLATES.values()
+                if t.sampler == kind and all(src in views for src in t.sources))
+
+
+def _pairs_estimate(nlist_1: List[List],
+                    nlist_2: List[List],
+                    same_node: bool,
+                    ) -> int:
+    if not same_node:
+        return len(nlist_1) * len(nlist_2)
+    counts = {}
+    for e in nlist_2:
+        counts[e[0]] = counts.get(e[0], 0) + 1
+    return sum(counts.get(e[0], 0) for e in nlist_1)
+
+
+def build_cases(scale: float,
+                seed: int = 0,
+                subschemas: int = 1000,
+                sample_max: int = 500,
+                ) -> Tuple[Dict[str, int], List[Case]]:
+    """Synthetic graph parameters and benchmark cases at a given scale."""
+
+    params = scaled_graph(scale)
+    jschema, node_instances, rels_instances = synthetic_graph(seed=seed, **params)
+    schema_index = as_schema_index(jschema)
+    nodes = get_nodes_list(schema_index)
+    ctx = GeneratorContext(schema_index, node_instances, rels_instances)
+    dparsed, drels, drelsprops = ctx.dparsed, ctx.drels, ctx.drelsprops
+
+    strings = dparsed.get("string_parsed", [])
+    numbers = dparsed.get("integer_parsed", [])
+    all_nodes = dparsed["dtypes_parsed"]
+    all_rels = drels.get("all_rels", [])
+    all_rels_props = drelsprops.get("all_rels", [])
+
+    node_prompter = ctx.prompter(_template(NODE, ctx))
+    same_prompter = ctx.prompter(_template(NODE_PAIR_SAME_LABEL, ctx))
+    pair_prompter = ctx.prompter(_template(NODE_PAIR, ctx))
+    labels_prompter = ctx.prompter(_template(LABEL_PAIR, ctx))
+    rel_prompter = ctx.prompter(_template(RELATIONSHIP, ctx))
+    relprops_prompter = ctx.prompter(_template(RELATIONSHIP_WITH_PROPS, ctx)) if all_rels_props else None
+
+    # Random subschema requests, as issued by the prompters
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(subschemas):
+        rel = rng.choice(schema_index.relationships)
+        start_props = schema_index.node_properties(rel['start'])
+        end_props = schema_index.node_properties(rel['end'])
+        requests.append(([[rel['start'], rng.choice(start_props)], [rel['end'], rng.choice(end_props)]],
+                         [[rel['type']]]))
+
+    def subschemas_uncached() -> int:
+        return len([build_minimal_subschema(schema_index, n, r, True, False, True) for n, r in requests])
+
+    def subschemas_cached() -> int:
+        renderer = SubschemaRenderer(schema_index)
+        return len([renderer.render(n, r, True, False, True) for n, r in requests])
+
+    cases = [
+        Case("parse_node_instances_datatype",
+             lambda: len(parse_node_instances_datatype(schema_index, node_instances, nodes, "STRING", True))),
+        Case("build_datatype_views",
+             lambda: len(build_datatype_views(schema_index, node_instances, rels_instances)[0]["dtypes_parsed"])),
+        Case("build_datatype_views_columnar",
+             lambda: len(build_datatype_views(schema_index, node_instances, rels_instances,
+                                              columnar=True)[0]["dtypes_parsed"])),
+        Case("tabulate_views",
+             lambda: len(tabulate_views(dparsed, drels, drelsprops)[0]["dtypes_parsed"])),
+        Case("filter_relationships_instances",
+             lambda: len(filter_relationships_instances(schema_index, rels_instances, "STRING", "STRING"))),
+        Case("get_property_pairs_same_label",
+             lambda: len(get_property_pairs(strings, all_nodes, True, True)),
+             lambda: _pairs_estimate(strings, all_nodes, True)),
+        Case("get_property_pairs",
+             lambda: len(get_property_pairs(strings, numbers, False, True)),
+             lambda: _pairs_estimate(strings, numbers, False)),
+        Case("build_node_sampler",
+             lambda: len(build_node_sampler(all_nodes, node_prompter, True)),
+             lambda: len(all_nodes)),
+        Case("build_nodes_property_pairs_sampler_same_label",
+             lambda: len(build_nodes_property_pairs_sampler(strings, all_nodes, same_prompter, True, True)),
+             lambda: _pairs_estimate(strings, all_nodes, True)),
+        Case("build_nodes_property_pairs_sampler",
+             lambda: len(build_nodes_property_pairs_sampler(strings, numbers, pair_prompter, False, True)),
+             lambda: _pairs_estimate(strings, numbers, False)),
+        Case("build_nodes_pairs",
+             lambda: len(build_nodes_pairs(nodes, labels_prompter, True)),
+             lambda: len(nodes) ** 2),
+        Case("build_relationships_samples",
+             lambda: len(build_relationships_samples(all_rels, rel_prompter, True)),
+             lambda: sum(len(e[1]) * len(e[4]) for e in all_rels)),
+        Case("build_minimal_subschema", subschemas_uncached),
+        Case("subschema_renderer", subschemas_cached),
+        Case("collect_samples_list",
+             lambda: len(collect_samples(all_nodes, sample_max, seed)),
+             lambda: len(all_nodes)),
+        Case("collect_samples_stream",
+             lambda: len(collect_samples(iter_node_sampler(all_nodes, node_prompter, True), sample_max, seed)),
+             lambda: len(all_nodes)),
+    ]
+    if relprops_prompter is not None:
+        cases.insert(12, Case("build_relationships_props_samples",
+                              lambda: len(build_relationships_props_samples(all_rels_props, relprops_prompter, True)),
+                              lambda: sum(len(e[1]) * len(e[3]) * len(e[5]) for e in all_rels_props)))
+    return params, cases
+
+
+def run_case(case: Case,
+             repeat: int,
+             max_items: int,
+             ) -> Dict[str, Any]:
+    """Times and memory profiles one case."""
+    if case.estimate is not None:
+        estimate = case.estimate()
+        if estimate > max_items:
+            return {"case": case.name, "skipped": f"{estimate} items > max items {max_items}"}
+
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        items = case.run()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        # A single run is enough for the slow cases
+        if elapsed > 2.0:
+            break
+
+    tracemalloc.start()
+    case.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"case": case.name, "seconds": best, "peak_mb": peak / 2**20, "items": items}
+
+
+def run_benchmarks(scales: List[float],
+                   repeat: int = 3,
+                   max_items: int = 1_000_000,
+                   only: List[str] = None,
+                   seed: int = 0,
+                   ) -> Dict[str, Any]:
+    """Runs the cases at each scale, returns the results with the run metadata."""
+    results = []
+    for scale in scales:
+        start = perf_counter()
+        params, cases = build_cases(scale, seed)
+        print(f"Scale {scale:g}x: {params} (setup {perf_counter() - start:.1f}s)")
+        for case in cases:
+            if only and case.name not in only:
+                continue
+            result = dict(run_case(case, repeat, max_items), scale=scale)
+            results.append(result)
+            _print_result(result)
+
+    return {"meta": {"date": strftime("%Y-%m-%d %H:%M:%S"),
+                     "python": platform.python_version(),
+                     "platform": platform.platform(),
+                     "repeat": repeat,
+                     "max_items": max_items,
+                     "seed": seed},
+            "results": results}
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    if "skipped" in result:
+        print(f"  {result['case']:<46} skipped: {result['skipped']}")
+    else:
+        print(f"  {result['case']:<46} {result['seconds']:>9.4f}s {result['peak_mb']:>9.1f} MB "
+              f"{result['items']:>10} items")
+
+
+def compare(current: Dict[str, Any],
+            baseline: Dict[str, Any],
+            tolerance: float = 1.25,
+            min_seconds: float = 0.01,
+            ) -> List[str]:
+    """Prints the time ratios against a baseline run, returns the regressed cases:
+    slower than tolerance times the baseline and than min_seconds."""
+    previous = {(r["scale"], r["case"]): r for r in baseline["results"] if "seconds" in r}
+    regressions = []
+    print(f"Comparison with the run of {baseline['meta']['date']}:")
+    for r in current["results"]:
+        before = previous.get((r["scale"], r["case"]))
+        if before is None or "seconds" not in r:
+            continue
+        ratio = r["seconds"] / before["seconds"] if before["seconds"] else float("inf")
+        flag = ""
+        if ratio > tolerance and r["seconds"] > min_seconds:
+            flag = "  REGRESSION"
+            regressions.append(f"{r['case']} at {r['scale']:g}x")
+        print(f"  {r['scale']:>6g}x {r['case']:<46} {before['seconds']:>9.4f}s -> {r['seconds']:>9.4f}s "
+              f"({ratio:.2f}x){flag}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run_benchmarks",
+        description="Time and memory profile the generation pipeline on synthetic graphs.")
+    parser.add_argument("--scales", nargs="+", type=float, default=[1, 10, 100, 1000],
+                        help="graph sizes, as multiples of the base graph (default: 1 10 100 1000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, the best is kept")
+    parser.add_argument("--max-items", type=int, default=1_000_000,
+                        help="skip the cases with a larger output (default: 1000000)")
+    parser.add_argument("--only", nargs="+", metavar="CASE", help="run only these cases")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic graphs")
+    parser.add_argument("--output", default=None,
+                        help="results json file (default: benchmarks/results/benchmark_<date>.json)")
+    parser.add_argument("--compare", default=None, metavar="FILE", help="results of a previous run")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="slowdown ratio reported as a regression (default: 1.25)")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.scales, args.repeat, args.max_items, args.only, args.seed)
+
+    output = args.output or os.path.join(RESULTS_DIR, strftime("benchmark_%Y%m%d_%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    write_json(current, output)
+    print(f"Results saved to {output}.")
+
+    if args.compare:
+        regressions = compare(current, read_json(args.compare), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""Synthetic graph shared by the tests, no Neo4j database needed."""
+
+import pytest
+
+# Import local modules
+from utils.synthetic import synthetic_graph
+from utils.graph_utils import build_datatype_views
+
+
+@pytest.fixture(scope="session")
+def graph():
+    """(jschema, node_instances, rels_instances) of a small synthetic graph."""
+    return synthetic_graph(seed=3)
+
+
+@pytest.fixture(scope="session")
+def views(graph):
+    """(dparsed, drels, drelsprops) list views of the synthetic graph."""
+    return build_datatype_views(*graph)
@@ -0,0 +1,101 @@
+import gzip
+import json
+
+import pytest
+
+# Import local modules
+from utils.dataset_io import *
+
+
+def samples(n=250):
+    """Samples sharing a few Prompt and Schema values."""
+    return [{"Prompt": f"Prompt {i % 2}",
+             "Question": f"Question {i}?",
+             "Schema": f"Graph schema: Label{i % 7}",
+             "Cypher": f"MATCH (n:Label{i % 7}) RETURN n LIMIT {i}"}
+            for i in range(n)]
+
+
+@pytest.mark.parametrize("ext", [JSONL, JSONL_GZ, JSON])
+def test_round_trip(tmp_path, ext):
+    path = str(tmp_path / f"trainer{ext}")
+    assert write_dataset(samples(), path) == 250
+    assert read_dataset(path) == samples()
+
+
+def test_tables_are_written_once(tmp_path):
+    path = str(tmp_path / "trainer.jsonl")
+    with DatasetWriter(path) as writer:
+        writer.write_all(samples())
+    assert writer.distinct == {"Prompt": 2, "Schema": 7}
+    with open(path, encoding="utf-8") as fp:
+        lines = [json.loads(line) for line in fp]
+    assert lines[0]["format"] == FORMAT
+    assert sum(1 for line in lines if isinstance(line, list)) == 9
+
+
+def test_sample_records(tmp_path):
+    path = str(tmp_path / "trainer.jsonl.gz")
+    write_dataset([Sample(s["Prompt"], s["Question"], s["Schema"], s["Cypher"]) for s in samples()], path)
+    assert read_dataset(path) == samples()
+
+
+def test_shards(tmp_path):
+    path = str(tmp_path / "trainer.jsonl.gz")
+    with DatasetWriter(path, shard_size=100) as writer:
+        writer.write_all(samples())
+    assert [os.path.basename(f) for f in writer.files] == [f"trainer-0000{i}.jsonl.gz" for i in range(3)]
+    assert dataset_files(path) == writer.files
+    assert read_dataset(path) == samples()
+    # Each shard is readable on its own
+    assert list(iter_dataset(writer.files[1])) == samples()[100:200]
+
+
+def test_extra_fields(tmp_path):
+    data = [dict(s, Error="Unknown label") if i % 3 == 0 else s for i, s in enumerate(samples())]
+    path = str(tmp_path / "trainer.jsonl")
+    write_dataset(data, path)
+    assert read_dataset(path) == data
+
+
+def test_invalid_files(tmp_path):
+    with pytest.raises(ValueError):
+        DatasetWriter(str(tmp_path / "trainer.csv"))
+    path = tmp_path / "trainer.jsonl.gz"
+    with gzip.open(path, "wt") as fp:
+        fp.write('{"format": "other"}\n')
+    with pytest.raises(ValueError):
+        read_dataset(str(path))
+    with pytest.raises(FileNotFoundError):
+        read_dataset(str(tmp_path / "missing.jsonl"))
+
+
+def test_convert(tmp_path):
+    source, target = str(tmp_path / "trainer.json"), str(tmp_path / "trainer.jsonl.gz")
+    write_json(samples(), source)
+    assert main([source, target, "--shard-size", "100"]) == 0
+    assert read_dataset(target) == samples()
+
+
+#### Parquet ####
+
+def test_parquet_row_groups(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "trainer.parquet")
+    with DatasetWriter(path, row_group_size=60) as writer:
+        writer.write_all(samples())
+    assert pq.ParquetFile(path).metadata.num_row_groups == 5
+    assert pa.types.is_dictionary(pq.read_schema(path).field("Schema").type)
+    assert writer.distinct == {"Prompt": 2, "Schema": 7}
+    assert read_dataset(path) == samples()
+
+
+def test_parquet_columns(tmp_path):
+    pytest.importorskip("pyarrow")
+    data = [dict(s, Error="Unknown label") if i > 200 else s for i, s in enumerate(samples())]
+    path = str(tmp_path / "trainer.parquet")
+    write_dataset(data, path, shard_size=100, columns=list(Sample.KEYS) + ["Error"])
+    assert read_dataset(path) == data
+    with pytest.raises(ValueError):
+        with DatasetWriter(str(tmp_path / "other.parquet"), row_group_size=100) as writer:
+            writer.write_all(data)
@@ -0,0 +1,81 @@
+import pytest
+
+# Import local modules
+from utils.dedup import *
+
+
+def sample(question, cypher="MATCH (n) RETURN n"):
+    return {"Question": question, "Cypher": cypher}
+
+
+QUESTIONS = [f"Find the {i} nodes of label Label{i % 7} with prop{i % 5} greater than {i * 13}" for i in range(300)]
+
+
+def test_normalize_cypher():
+    assert normalize_cypher("MATCH (n:A)  WHERE n.x = 'a  b' \n RETURN n ;") == "MATCH(n:A)WHERE n.x='a  b' RETURN n"
+    assert (normalize_cypher("MATCH (n) WHERE n.x = 'a' AND n.y = 3 RETURN n", mask_literals=True)
+            == normalize_cypher("MATCH (n) WHERE n.x = 'b' AND n.y = 4 RETURN n", mask_literals=True))
+
+
+def test_minhash_similarity():
+    hasher = MinHasher(num_perm=128)
+    text = normalize_question(QUESTIONS[0])
+    sig = hasher.signature(shingles(text, 5))
+    assert hasher.similarity(sig, hasher.signature(shingles(text, 5))) == 1.0
+    assert hasher.similarity(sig, hasher.signature(shingles("something else entirely", 5))) < 0.5
+
+
+def test_exact_duplicates():
+    dedup = Deduplicator(near=False)
+    assert dedup.check(sample("q1", "MATCH (n) RETURN n"), "a")
+    assert not dedup.check(sample("q2", "MATCH (n)\nRETURN n;"), "a")
+    assert dedup.check(sample("q3", "MATCH (m) RETURN m"), "b")
+    assert dedup.stats()["a"] == {"seen": 2, "exact": 1, "near": 0, "kept": 1, "rate": 0.5}
+
+
+def test_near_duplicates():
+    dedup = Deduplicator(exact=False)
+    assert dedup.check(sample("Find the nodes of label Person whose name is Alice"))
+    assert not dedup.check(sample("Find the nodes of label Person whose name is Alice!"))
+    assert dedup.check(sample("How many relationships of type KNOWS are in the graph?"))
+
+
+def brute_force_kept(samples, dedup):
+    """Kept samples when every earlier kept sample sharing a band key is a candidate."""
+    kept, seen = [], []
+    for s in samples:
+        sig = dedup.minhasher.signature(shingles(normalize_question(s["Question"]), dedup.shingle_size))
+        bands = set(dedup._band_keys(sig))
+        if not any(bands & other_bands and dedup.minhasher.similarity(sig, other) >= dedup.threshold
+                   for other, other_bands in seen):
+            seen.append((sig, bands))
+            kept.append(s)
+    return kept
+
+
+def test_band_keys_keep_several_samples():
+    samples = [sample(q) for q in QUESTIONS + [q.replace("nodes", "node") for q in QUESTIONS]]
+    dedup = Deduplicator(exact=False, threshold=0.8, bucket_size=len(samples))
+    assert list(dedup.filter(samples)) == brute_force_kept(samples, Deduplicator(exact=False, threshold=0.8))
+    capped = Deduplicator(exact=False, threshold=0.8, bucket_size=2)
+    list(capped.filter(samples))
+    assert max(len(ids) for ids in capped._bands.values()) <= 2
+
+
+def test_memory_is_bounded():
+    dedup = Deduplicator(max_entries=50)
+    kept = list(dedup.filter(sample(q, f"RETURN {i}") for i, q in enumerate(QUESTIONS)))
+    assert len(dedup._entries) == 50
+    assert len(dedup._signatures) == 50
+    assert all(entry_id in dedup._signatures for ids in dedup._bands.values() for entry_id in ids)
+    assert len(dedup._exact) == 50
+    assert kept
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        Deduplicator(num_perm=64, bands=10)
+    with pytest.raises(ValueError):
+        Deduplicator(threshold=0)
+    with pytest.raises(ValueError):
+        Deduplicator(bucket_size=0)
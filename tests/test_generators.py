@@ -0,0 +1,126 @@
+import itertools
+
+import pytest
+
+# Import local modules
+from utils.generators import *
+
+
+# Generators of SFT_Functional_Data_Builder.ipynb, in notebook order
+NOTEBOOK_GENERATORS = [
+    "count_nodes_of_given_label",
+    "paths_with_node_endpoint",
+    "match_one_node_one_prop",
+    "where_one_node_one_prop_notnull_numeral",
+    "where_one_node_one_prop_notnull_literal",
+    "where_one_node_one_prop_null_numeral",
+    "find_node_notproperty_count",
+    "find_node_property_count",
+    "find_node_by_property",
+    "match_skip_limit_return_property",
+    "match_where_skip_limit_return_property",
+    "where_one_node_one_prop_one_val",
+    "where_one_node_one_string_contains",
+    "find_node_by_start_substring",
+    "where_one_node_string_re",
+    "find_count_in_interval",
+    "find_nodes_today",
+    "find_nodes_monday",
+    "find_property_after_hour",
+    "where_one_node_one_prop_equals_year",
+    "where_one_node_one_prop_equals_date",
+    "find_unique_rels",
+    "connection_thru_two_rels",
+    "rels_and_counts_and_nodes",
+    "rels_and_counts",
+    "find_node_neighbours",
+    "find_neighbors_properties",
+    "find_node_neighbors_properties",
+    "find_properties_neighbors_relationship",
+    "nodes_connected_to_two_nodes",
+    "longest_path_from_node",
+    "node_properties_for_two_relationships",
+    "average_props",
+    "first_and_far_neighbors",
+    "nodes_connected_to_node",
+    "find_far_unique_rels",
+    "find_far_neighbors_properties",
+    "find_far_neighbors",
+    "match_with_where_not_value",
+    "match_with_where_contains_substring",
+    "match_with_where_starts_with_substring",
+    "match_with_where_not_is_value",
+    "match_properties_with_union",
+    "where_one_node_two_props_notnull_or",
+    "find_property_in_year",
+    "find_property_in_month",
+    "where_one_node_two_props_two_vals_or_notnull_date",
+    "find_property_after_date",
+    "aggregate_integers_by_string",
+    "match_with_where_not_null",
+    "aggregate_numerical_by_integer",
+    "match_with_where_or_numerical_literal",
+    "find_nodes_connected_to_two_nodes",
+    "nodes_connected_to_two_nodes_both",
+    "find_common_rels",
+    "rel_and_common_prop",
+    "match_nodes_with_union_all",
+    "match_nodes_with_union",
+    "match_two_nodes_two_props",
+    "where_not_simple_path_and_property",
+    "path_existence",
+    "number_of_paths",
+    "end_of_the_path",
+    "shortest_path_between_two_nodes",
+    "find_not_connected_nodes",
+    "find_connected_nodes",
+    "find_node_relation_count",
+    "nodes_connected_to_first_node_and_not_connected_to_second_node",
+    "find_node_property_with_count_limit",
+    "find_node_property_by_condition_on_node",
+    "where_and_exists_simple_path",
+    "find_node_relation_ordered_count_desc",
+    "find_node_relation_ordered_count",
+    "find_node_relation_ordered_count_filter",
+    "find_common_prop",
+    "find_end_nodes_path",
+    "find_end_node_properties",
+    "find_node_relation_ordered_count_collect",
+    "find_node_aggregation_date_rels",
+    "where_and_simple_path",
+    "relation_with_and_where",
+    "find_not_connected_nodes_relprops",
+    "find_connected_nodes_relprops",
+    "find_node_relation_count_relprops",
+    "find_node_property_with_count_limit_relprops",
+    "where_and_exists_simple_path_relprops",
+    "find_node_relation_ordered_count_desc_relprops",
+    "find_node_relation_ordered_count_relprops",
+    "find_common_prop_relprops",
+    "find_end_nodes_path_relprops",
+    "find_end_node_properties_relprops",
+    "find_node_relation_node_count_relprops",
+    "relation_with_and_where_relprops",
+    "find_node_aggregation_date_rels_relprops",
+    "where_and_simple_path_relprops",
+]
+
+
+@pytest.fixture(scope="module")
+def ctx(graph):
+    return GeneratorContext(*graph)
+
+
+def test_registry_holds_the_notebook_generators():
+    assert len(NOTEBOOK_GENERATORS) == len(set(NOTEBOOK_GENERATORS)) == 95
+    assert list(GENERATORS) == NOTEBOOK_GENERATORS
+    assert list(TEMPLATES) == NOTEBOOK_GENERATORS
+
+
+def test_every_generator_runs(ctx):
+    for name, generator in GENERATORS.items():
+        samples = list(itertools.islice(generator(ctx), 3))
+        assert samples, name
+        for sample in samples:
+            assert sample["Prompt"] == SYSTEM_MESSAGE
+            assert sample["Question"] and sample["Schema"] and sample["Cypher"]
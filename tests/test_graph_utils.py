@@ -0,0 +1,126 @@
+import copy
+import datetime
+
+import pytest
+from neo4j import time, spatial
+
+# Import local modules
+from utils.utilities import write_jsonl, read_jsonl, write_json, read_json
+from utils.graph_utils import *
+
+
+#### Serialize temporal and spatial values ####
+
+TEMPORALS = [
+    (time.Date(2023, 11, 10), "2023-11-10"),
+    (time.DateTime(2023, 11, 10, 12, 23, 32, tzinfo=datetime.timezone.utc), "2023-11-10 T 12:23:32 UTC"),
+    (time.DateTime(2023, 11, 10, 12, 23, 32), "2023-11-10 T 12:23:32"),
+    (time.Time(10, 2, 3), "10:02:03"),
+    (time.Duration(days=3, hours=2), "P3DT2H"),
+    (spatial.WGS84Point((13.4, 52.5)), "point({srid: 4326, x: 13.4, y: 52.5})"),
+    (spatial.CartesianPoint((1.0, 2.0, 3.0)), "point({srid: 9157, x: 1.0, y: 2.0, z: 3.0})"),
+]
+
+
+def node_record(value):
+    """An extracted node instance holding value."""
+    return {"label": "Event",
+            "Instance": {"identity": 1, "labels": ["Event"],
+                         "properties": {"name": "launch", "at": value, "tags": ["a", value]}}}
+
+
+@pytest.mark.parametrize("value, expected", TEMPORALS)
+def test_values_round_trip_through_jsonl(tmp_path, value, expected):
+    path = str(tmp_path / "nodes.jsonl")
+    assert write_jsonl([node_record(value)], path, cls=Neo4jJSONEncoder) == 1
+    assert list(read_jsonl(path)) == [node_record(expected)]
+    write_json([node_record(value)], str(tmp_path / "nodes.json"), cls=Neo4jJSONEncoder)
+    assert read_json(str(tmp_path / "nodes.json")) == [node_record(expected)]
+
+
+def test_the_input_is_not_modified():
+    records = [node_record(value) for value, _ in TEMPORALS]
+    before = copy.deepcopy(records)
+    serialized = serialize_nodes_data([records])
+    assert records == before
+    assert serialized == [[node_record(expected) for _, expected in TEMPORALS]]
+    rels = [{"Person_start": {"born": TEMPORALS[0][0]}, "KNOWS": {}, "Person_end": {"name": "Bob"}}]
+    before = copy.deepcopy(rels)
+    assert serialize_relationships_data([rels]) == [[{"Person_start": {"born": "2023-11-10"}, "KNOWS": {},
+                                                      "Person_end": {"name": "Bob"}}]]
+    assert rels == before
+
+
+def test_nested_values():
+    value = {"a": [1, {"b": (TEMPORALS[0][0], [TEMPORALS[3][0]])}], "c": {"d": {"e": TEMPORALS[4][0]}}}
+    assert serialize_value(value) == {"a": [1, {"b": ["2023-11-10", ["10:02:03"]]}], "c": {"d": {"e": "P3DT2H"}}}
+    assert serialize_value([TEMPORALS[5][0], "x"]) == ["point({srid: 4326, x: 13.4, y: 52.5})", "x"]
+
+
+def test_plain_values_are_returned_as_they_are():
+    record = node_record("2023-11-10")
+    assert serialize_value(record) is record
+    assert serialize_node_record(record) is record
+    for value in ("a", 1, 1.5, True, None, [1, "a"], {"a": [1, {"b": 2}]}):
+        assert serialize_value(value) is value
+    # The unchanged parts of a converted copy are shared
+    record = {"a": {"b": 1}, "c": TEMPORALS[0][0]}
+    assert serialize_value(record) == {"a": {"b": 1}, "c": "2023-11-10"}
+    assert serialize_value(record)["a"] is record["a"]
+
+
+#### Datatype views ####
+
+def test_views_match_the_per_datatype_parsers(graph, views):
+    jschema, node_instances, rels_instances = graph
+    dparsed, drels, drelsprops = views
+    jschema = as_schema_index(jschema)
+    nodes = get_nodes_list(jschema)
+    for datatype in jschema.node_datatypes:
+        assert (dparsed[f"{datatype.lower()}_parsed"]
+                == parse_node_instances_datatype(jschema, node_instances, nodes, datatype, True))
+    assert dparsed['dtypes_parsed'] == sum((dparsed[f"{dt.lower()}_parsed"] for dt in jschema.node_datatypes), [])
+
+    expected = {}
+    for dt1, dt2 in product(jschema.node_datatypes, repeat=2):
+        filtered = filter_relationships_instances(jschema, rels_instances, dt1, dt2)
+        if filtered:
+            expected[f"{dt1.lower()}_{dt2.lower()}_rels"] = filtered
+    expected['all_rels'] = sum(expected.values(), [])
+    assert drels == expected
+
+    instances_with_rel_props = retrieve_instances_with_relationships_props(rels_instances)
+    expected = {}
+    for dt1, dt2 in product(jschema.node_datatypes, repeat=2):
+        for rt in jschema.rel_datatypes:
+            filtered = filter_relationships_with_props_instances(jschema, instances_with_rel_props, dt1, rt, dt2)
+            if filtered:
+                expected[f"{dt1.lower()}_{rt.lower()}_{dt2.lower()}_rels"] = filtered
+    expected['all_rels'] = sum(expected.values(), [])
+    assert len(expected) > 2
+    assert drelsprops == expected
+
+
+#### Subschema ####
+
+def test_renderer_caches_the_subschemas(graph):
+    jschema = graph[0]
+    renderer = SubschemaRenderer(jschema)
+    rel = jschema['relationships'][0]
+    label = rel['start']
+    prop = jschema['node_props'][label][0]['property']
+    calls = [([[label, prop]], [], True, False, True, False),
+             ([[label, prop], [rel['end']]], [[rel['type']]], True, False, True, True),
+             ([[label]], [[rel['type']]], False, False, False, True)]
+    for _ in range(3):
+        for nodes_info, relationships_info, *flags in calls:
+            assert (renderer.render(nodes_info, relationships_info, *flags)
+                    == build_minimal_subschema(jschema, nodes_info, relationships_info, *flags))
+    info = renderer.cache_info()
+    assert (info["misses"], info["hits"], info["size"]) == (3, 6, 3)
+    assert "6 hits, 3 misses" in renderer.report() and "hit rate 66.7%" in renderer.report()
+    # Lists and tuples are the same key
+    renderer.render(((label, prop),), (), True, False, True, False)
+    assert renderer.cache_info()["hits"] == 7
+    renderer.clear()
+    assert renderer.cache_info()["size"] == 0
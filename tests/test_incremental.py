@@ -0,0 +1,85 @@
+import copy
+
+# Import local modules
+from utils.incremental import *
+
+
+def graph_stats(jschema, count=10):
+    """apoc.meta.stats style counts, count for every label and relationship pattern."""
+    stats = {"labels": {label: count for label in jschema['node_props']},
+             "relTypes": {},
+             "relTypesCount": {}}
+    for rel in jschema['relationships']:
+        stats["relTypes"][f"(:{rel['start']})-[:{rel['type']}]->()"] = count
+        stats["relTypes"][f"()-[:{rel['type']}]->(:{rel['end']})"] = count
+        stats["relTypesCount"][rel['type']] = count
+    return stats
+
+
+def state_of(jschema, stats=None, node_instances_size=12, rels_instances_size=12):
+    return instances_state(jschema, stats or graph_stats(jschema), node_instances_size, rels_instances_size)
+
+
+def test_first_run_extracts_everything(graph):
+    jschema = graph[0]
+    changes = diff_states(None, state_of(jschema))
+    assert changes["labels"] == list(jschema['node_props'])
+    assert changes["triples"] == [triple_id(rel) for rel in jschema['relationships']]
+    assert changes["removed_labels"] == changes["removed_triples"] == []
+
+
+def test_unchanged_state_extracts_nothing(graph):
+    jschema = graph[0]
+    assert diff_states(state_of(jschema), state_of(copy.deepcopy(jschema))) == {
+        "labels": [], "removed_labels": [], "triples": [], "removed_triples": []}
+
+
+def test_changed_instances_size_extracts_everything(graph):
+    jschema = graph[0]
+    changes = diff_states(state_of(jschema), state_of(jschema, node_instances_size=20))
+    assert changes["labels"] == list(jschema['node_props'])
+    assert changes["triples"] == []
+    changes = diff_states(state_of(jschema), state_of(jschema, rels_instances_size=20))
+    assert changes["labels"] == []
+    assert len(changes["triples"]) == len(jschema['relationships'])
+
+
+def test_changed_count(graph):
+    jschema = graph[0]
+    rel = jschema['relationships'][0]
+    stats = graph_stats(jschema)
+    stats["labels"]["Label0"] += 1
+    stats["relTypes"][f"(:{rel['start']})-[:{rel['type']}]->()"] += 1
+    changes = diff_states(state_of(jschema), state_of(jschema, stats))
+    assert changes["labels"] == ["Label0"]
+    # Every triple starting at the same label with the same type
+    assert changes["triples"] == [triple_id(r) for r in jschema['relationships']
+                                  if (r['start'], r['type']) == (rel['start'], rel['type'])]
+
+
+def test_changed_properties(graph):
+    jschema = graph[0]
+    current = copy.deepcopy(jschema)
+    current['node_props']['Label1'].append({"property": "added", "datatype": "STRING"})
+    changes = diff_states(state_of(jschema), state_of(current))
+    assert changes["labels"] == ["Label1"]
+    assert changes["triples"] == [triple_id(r) for r in jschema['relationships']
+                                  if 'Label1' in (r['start'], r['end'])]
+
+    rtype = next(iter(jschema['rel_props']))
+    current = copy.deepcopy(jschema)
+    current['rel_props'][rtype].append({"property": "added", "datatype": "STRING"})
+    changes = diff_states(state_of(jschema), state_of(current))
+    assert changes["labels"] == []
+    assert changes["triples"] == [triple_id(r) for r in jschema['relationships'] if r['type'] == rtype]
+
+
+def test_removed_labels_and_triples(graph):
+    jschema = graph[0]
+    current = copy.deepcopy(jschema)
+    del current['node_props']['Label2']
+    removed = current['relationships'].pop()
+    changes = diff_states(state_of(jschema), state_of(current))
+    assert changes["removed_labels"] == ["Label2"]
+    assert changes["removed_triples"] == [triple_id(removed)]
+    assert triple_id(removed) not in changes["triples"]
@@ -0,0 +1,40 @@
+# Import local modules
+from utils.instance_store import *
+from utils.graph_utils import (get_nodes_list, parse_node_instances_datatype, filter_relationships_instances,
+                               filter_relationships_with_props_instances)
+
+
+def test_lookups(graph):
+    jschema, node_instances, rels_instances = graph
+    store = InstanceStore(node_instances, rels_instances)
+    for label, group in zip(get_nodes_list(jschema), node_instances):
+        assert store.nodes(label) == group
+    for rel, group in zip(jschema['relationships'], rels_instances):
+        assert store.relationships(rel) == group
+        assert store.relationships((rel['start'], rel['type'], rel['end'])) == group
+    assert store.nodes("Missing") == []
+    assert store.relationships(("Missing", "TYPE", "Missing")) == []
+    assert store.count_nodes() == {label: len(group)
+                                   for label, group in zip(get_nodes_list(jschema), node_instances) if group}
+
+
+def test_mixed_and_split_groups(graph):
+    node_instances = graph[1]
+    first, second = node_instances[0], node_instances[1]
+    store = InstanceStore([[], first[:3] + second[:2], first[3:], second[2:]])
+    assert store.labels() == [node_label(first[0]), node_label(second[0])]
+    assert store.nodes(node_label(first[0])) == first
+    assert store.nodes(node_label(second[0])) == second
+
+
+def test_parsers_give_the_same_results_from_a_store(graph):
+    jschema, node_instances, rels_instances = graph
+    store = InstanceStore(node_instances, rels_instances)
+    nodes = get_nodes_list(jschema)
+    for datatype in ("STRING", "INTEGER", "DATE"):
+        assert (parse_node_instances_datatype(jschema, store, nodes, datatype, True)
+                == parse_node_instances_datatype(jschema, node_instances, nodes, datatype, True))
+    assert (filter_relationships_instances(jschema, store, "STRING", "INTEGER")
+            == filter_relationships_instances(jschema, rels_instances, "STRING", "INTEGER"))
+    assert (filter_relationships_with_props_instances(jschema, store, "STRING", "STRING", "STRING")
+            == filter_relationships_with_props_instances(jschema, rels_instances, "STRING", "STRING", "STRING"))
@@ -0,0 +1,60 @@
+import random
+
+# Import local modules
+from utils.instance_table import *
+from utils.graph_utils import build_datatype_views
+from utils.utilities import build_node_sampler, build_relationships_samples, collect_samples
+
+
+def prompter(*args):
+    """Stand-in prompter, returns its parameters."""
+    return args
+
+
+def test_columnar_views_match_the_list_views(graph, views):
+    columnar = build_datatype_views(*graph, columnar=True)
+    for tables, lists in zip(columnar, views):
+        assert list(tables) == list(lists)
+        for key, entries in lists.items():
+            assert len(tables[key]) == len(entries)
+            assert list(tables[key]) == entries
+            assert [tables[key][i] for i in range(len(entries))] == entries
+
+
+def test_tabulate_views_match_the_list_views(views):
+    for tables, lists in zip(tabulate_views(*views), views):
+        for key, entries in lists.items():
+            assert list(tables[key]) == entries
+    assert isinstance(tabulate_views(*views)[0]['dtypes_parsed'], TableChain)
+
+
+def test_samplers_read_the_tables_as_lists(graph, views):
+    dparsed, drels, _ = build_datatype_views(*graph, columnar=True)
+    for allow_repeats in (True, False):
+        assert (build_node_sampler(dparsed['dtypes_parsed'], prompter, allow_repeats)
+                == build_node_sampler(views[0]['dtypes_parsed'], prompter, allow_repeats))
+        assert (build_relationships_samples(drels['all_rels'], prompter, allow_repeats)
+                == build_relationships_samples(views[1]['all_rels'], prompter, allow_repeats))
+    assert (collect_samples(iter(dparsed['string_parsed']), 10, seed=1)
+            == collect_samples(iter(views[0]['string_parsed']), 10, seed=1))
+
+
+def test_node_table_access(views):
+    entries = views[0]['integer_parsed']
+    table = NodeTable(entries, "INTEGER")
+    assert table[-1] == entries[-1]
+    assert table[2:9] == entries[2:9]
+    label = entries[0][0]
+    assert list(table.select(label=label)) == [i for i, e in enumerate(entries) if e[0] == label]
+    assert table.group_by_label() == {e[0]: array("I", [i for i, f in enumerate(entries) if f[0] == e[0]])
+                                      for e in entries}
+
+
+def test_relationship_table_access(views):
+    entries = views[2]['all_rels']
+    table = RelationshipTable(entries)
+    assert table.with_rel_props
+    rtype = entries[0][2]
+    assert list(table.select(rtype=rtype)) == [i for i, e in enumerate(entries) if e[2] == rtype]
+    indices = random.Random(0).sample(range(len(entries)), 5)
+    assert table.rows(indices) == [entries[i] for i in indices]
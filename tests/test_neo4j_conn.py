@@ -0,0 +1,99 @@
+import pytest
+from neo4j.exceptions import CypherSyntaxError
+
+# Import local modules
+from utils.neo4j_conn import Neo4jGraph
+
+
+class Record:
+    def __init__(self, i):
+        self.i = i
+
+    def data(self):
+        return {"i": self.i}
+
+
+class Session:
+    """Stand-in for a driver session: run yields $n records, the pulled records are counted."""
+
+    def __init__(self, driver, database, fetch_size=None):
+        self.driver = driver
+        self.database = database
+        self.fetch_size = fetch_size
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+    def run(self, cypher_query, params={}):
+        if cypher_query == "SYNTAX ERROR":
+            raise CypherSyntaxError("Invalid input")
+        for i in range(params.get("n", 5)):
+            self.driver.pulled.append(i)
+            yield Record(i)
+
+
+class Driver:
+    def __init__(self):
+        self.sessions = []
+        self.pulled = []
+
+    def session(self, **kwargs):
+        self.sessions.append(Session(self, **kwargs))
+        return self.sessions[-1]
+
+
+@pytest.fixture
+def driver(monkeypatch):
+    """Replaces the Neo4j driver of Neo4jGraph."""
+    driver = Driver()
+
+    def init(self, url, username, password, database, max_connection_pool_size=None):
+        self._driver = driver
+        self._database = database
+
+    monkeypatch.setattr(Neo4jGraph, "__init__", init)
+    return driver
+
+
+def connect():
+    return Neo4jGraph("bolt://localhost", "neo4j", "", "neo4j")
+
+
+def test_stream_yields_records_lazily(driver):
+    records = connect().stream("MATCH (n) RETURN n", {"n": 5}, fetch_size=2)
+    # No session before the first record is asked for
+    assert driver.sessions == []
+    assert next(records) == {"i": 0}
+    session = driver.sessions[0]
+    assert (session.database, session.fetch_size) == ("neo4j", 2)
+    assert driver.pulled == [0]
+    assert not session.closed
+    assert next(records) == {"i": 1}
+    assert driver.pulled == [0, 1]
+    assert list(records) == [{"i": i} for i in range(2, 5)]
+    assert session.closed
+
+
+def test_stream_closed_early_closes_the_session(driver):
+    records = connect().stream("MATCH (n) RETURN n", {"n": 1000}, db="other")
+    assert next(records) == {"i": 0}
+    records.close()
+    session = driver.sessions[0]
+    assert session.closed
+    assert (session.database, session.fetch_size) == ("other", 1000)
+    assert driver.pulled == [0]
+
+
+def test_stream_syntax_error(driver):
+    with pytest.raises(ValueError, match="not valid"):
+        list(connect().stream("SYNTAX ERROR"))
+    assert driver.sessions[0].closed
+
+
+def test_query_reads_all_records(driver):
+    assert connect().query("MATCH (n) RETURN n", {"n": 3}) == [{"i": i} for i in range(3)]
+    assert driver.sessions[0].closed
@@ -0,0 +1,439 @@
+import re
+
+import pytest
+
+# Import local modules
+from utils.neo4j_conn import Neo4jGraph
+from utils.neo4j_schema import *
+
+
+def meta_data_rows(jschema):
+    """apoc.meta.data() rows of a structured schema."""
+    rows = []
+    for label, props in jschema['node_props'].items():
+        rows += [{"label": label, "other": [], "elementType": "node", "type": p['datatype'], "property": p['property']}
+                 for p in props]
+        ends = {}
+        for rel in jschema['relationships']:
+            if rel['start'] == label:
+                ends.setdefault(rel['type'], []).append(rel['end'])
+        rows += [{"label": label, "other": others, "elementType": "node", "type": "RELATIONSHIP", "property": rtype}
+                 for rtype, others in ends.items()]
+    for rtype, props in jschema['rel_props'].items():
+        rows.append({"label": rtype, "other": [], "elementType": "relationship", "type": "RELATIONSHIP",
+                     "property": "start"})
+        rows += [{"label": rtype, "other": [], "elementType": "relationship", "type": p['datatype'],
+                  "property": p['property']} for p in props]
+    return rows
+
+
+def collect_properties(rows, element_type, key):
+    """The WITH label, collect({property, datatype}) step of the per-part queries."""
+    grouped = {}
+    for row in rows:
+        if row["type"] != "RELATIONSHIP" and row["elementType"] == element_type:
+            grouped.setdefault(row["label"], []).append({"property": row["property"], "datatype": row["type"]})
+    return [{"output": {key: label, "properties": props}} for label, props in grouped.items()]
+
+
+class Server:
+    """Stand-in for the database: answers the schema queries from the meta data rows."""
+
+    def __init__(self, rows, stats):
+        self.rows = rows
+        self.stats = stats
+        self.queries = []
+
+    def query(self, cypher_query, params={}, db=None):
+        self.queries.append(cypher_query)
+        if cypher_query == meta_data_query:
+            return [dict(row) for row in self.rows]
+        if cypher_query == node_properties_query:
+            return collect_properties(self.rows, "node", "label")
+        if cypher_query == rel_properties_query:
+            return collect_properties(self.rows, "relationship", "type")
+        if cypher_query == rel_query:
+            return [{"output": {"start": row["label"], "type": row["property"], "end": str(other)}}
+                    for row in self.rows if row["type"] == "RELATIONSHIP" and row["elementType"] == "node"
+                    for other in row["other"]]
+        if cypher_query in (schema_fingerprint_query, graph_stats_query):
+            return [self.stats]
+        raise AssertionError(f"Unexpected query {cypher_query}")
+
+
+@pytest.fixture
+def server(graph, monkeypatch):
+    jschema = graph[0]
+    stats = {"labels": {label: 10 for label in jschema['node_props']},
+             "relTypes": {},
+             "relTypesCount": {rel['type']: 10 for rel in jschema['relationships']}}
+    server = Server(meta_data_rows(jschema), stats)
+
+    def init(self, url, username, password, database, max_connection_pool_size=None):
+        self._driver = None
+        self._database = database
+
+    monkeypatch.setattr(Neo4jGraph, "__init__", init)
+    monkeypatch.setattr(Neo4jGraph, "query", lambda self, q, params={}, db=None: server.query(q, params, db))
+    return server
+
+
+def connect(**kwargs):
+    return Neo4jSchema("bolt://localhost", "neo4j", "", "neo4j", **kwargs)
+
+
+def test_one_call_gives_the_multi_query_schema(graph, server):
+    schema = connect()
+    assert server.queries == [meta_data_query]
+
+    # The schema of the three per-part queries, as built before
+    node_properties = [el["output"] for el in server.query(node_properties_query)]
+    rel_properties = [el["output"] for el in server.query(rel_properties_query)]
+    relationships = [el["output"] for el in server.query(rel_query)]
+    expected = {"node_props": {el["label"]: el["properties"] for el in node_properties},
+                "rel_props": {el["type"]: el["properties"] for el in rel_properties},
+                "relationships": relationships}
+    assert schema.get_structured_schema == expected
+    # The rows are grouped by start label, so are the relationships
+    triple = lambda rel: (rel['start'], rel['type'], rel['end'])
+    assert (sorted(map(triple, schema.get_structured_schema['relationships']))
+            == sorted(map(triple, graph[0]['relationships'])))
+    assert schema.get_structured_schema['node_props'] == graph[0]['node_props']
+    assert schema.get_schema_index.labels() == list(graph[0]['node_props'])
+    assert schema.get_schema.splitlines()[0] == "Node properties are the following:"
+
+
+def test_schema_cache(server, tmp_path):
+    path = str(tmp_path / "schema.json")
+    structured_schema = connect(schema_cache_path=path).get_structured_schema
+    assert server.queries == [schema_fingerprint_query, meta_data_query]
+    assert read_json(path)["structured_schema"] == structured_schema
+
+    # Same fingerprint: the cached schema is used
+    server.queries.clear()
+    assert connect(schema_cache_path=path).get_structured_schema == structured_schema
+    assert server.queries == [schema_fingerprint_query]
+
+    # Refresh: rebuilt
+    server.queries.clear()
+    connect(schema_cache_path=path, refresh_schema=True)
+    assert server.queries == [schema_fingerprint_query, meta_data_query]
+
+    # Changed counts: rebuilt, with the new fingerprint saved
+    server.stats["labels"]["Label0"] += 1
+    server.rows = [row for row in server.rows if row["label"] != "Label0"]
+    server.queries.clear()
+    schema = connect(schema_cache_path=path)
+    assert server.queries == [schema_fingerprint_query, meta_data_query]
+    assert "Label0" not in schema.get_structured_schema["node_props"]
+    assert read_json(path)["fingerprint"] == schema.schema_fingerprint()
+    server.queries.clear()
+    connect(schema_cache_path=path)
+    assert server.queries == [schema_fingerprint_query]
+
+
+#### Property projection ####
+
+PROPS = [{"property": "name", "datatype": "STRING"},
+         {"property": "age", "datatype": "INTEGER"},
+         {"property": "tags", "datatype": "LIST OF STRING"},
+         {"property": "odd`key", "datatype": "STRING"},
+         {"property": "born", "datatype": "DATE"}]
+
+
+def test_projection_keys():
+    projection = PropertyProjection(datatypes=["STRING", "INTEGER"])
+    assert projection.expression("p", "Person", PROPS) == "{`name`: p.`name`, `age`: p.`age`, `odd``key`: p.`odd``key`}"
+
+    projection = PropertyProjection(datatypes=["STRING", "INTEGER"], deny=["age", "Person.name"])
+    assert projection.expression("p", "Person", PROPS) == "{`odd``key`: p.`odd``key`}"
+    # Label.property entries only apply to their label
+    assert projection.expression("p", "Movie", PROPS) == "{`name`: p.`name`, `odd``key`: p.`odd``key`}"
+
+    projection = PropertyProjection(allow=["born", "Person.age"])
+    assert projection.expression("a", "Person", PROPS) == "{`age`: a.`age`, `born`: a.`born`}"
+    assert projection.expression("a", "Movie", PROPS) == "{`born`: a.`born`}"
+    assert projection.expression("a", "Movie", []) == "{}"
+
+
+def test_projection_truncation():
+    projection = PropertyProjection(datatypes=["STRING", "INTEGER", "LIST OF STRING"], max_value_size=50)
+    assert projection.expression("r", "KNOWS", PROPS[:3], relationship=True) == (
+        "{`name`: CASE WHEN size(r.`name`) <= 50 THEN r.`name` END, "
+        "`age`: r.`age`, "
+        "`tags`: CASE WHEN size(r.`tags`) <= 50 THEN r.`tags` END}")
+    assert drop_null_properties({"name": None, "age": 3, "flag": False}) == {"age": 3, "flag": False}
+
+
+def test_projection_datatypes_from_the_templates(graph):
+    index = SchemaIndex(graph[0])
+    projection = PropertyProjection(templates=[TEMPLATES["where_one_node_one_prop_one_val"]])
+    assert projection.node_datatypes is None
+    projection.bind(index)
+    assert (projection.node_datatypes, projection.rel_datatypes) == ({"STRING"}, set())
+    assert projection.expression("p", "Person", PROPS) == "{`name`: p.`name`, `odd``key`: p.`odd``key`}"
+    assert projection.expression("r", "KNOWS", PROPS, relationship=True) == "{}"
+
+    # Given datatypes are kept
+    projection = PropertyProjection(datatypes=["DATE"], templates=[TEMPLATES["where_one_node_one_prop_one_val"]])
+    projection.bind(index)
+    assert projection.node_datatypes == projection.rel_datatypes == {"DATE"}
+
+
+def project_instances(graph, projection):
+    """The instances with only the properties fetched by the projection."""
+    jschema, node_instances, rels_instances = graph
+    keep = lambda props, owner, schema, relationship=False: {
+        el['property']: props[el['property']]
+        for el in projection.selected(owner, schema.get(owner, []), relationship) if el['property'] in props}
+    nodes = [[{"Instance": {"Label": rec["Instance"]["Label"],
+                            "properties": keep(rec["Instance"]["properties"], rec["Instance"]["Label"],
+                                               jschema['node_props'])}}
+              for rec in instances]
+             for instances in node_instances]
+    rels = []
+    for rel, instances in zip(jschema['relationships'], rels_instances):
+        start, end = f"{rel['start']}_Start", f"{rel['end']}_End"
+        rels.append([{start: keep(rec[start], rel['start'], jschema['node_props']),
+                      rel['type']: keep(rec[rel['type']], rel['type'], jschema['rel_props'], True),
+                      end: keep(rec[end], rel['end'], jschema['node_props'])}
+                     for rec in instances])
+    return jschema, nodes, rels
+
+
+def test_projection_keeps_the_template_properties(graph):
+    from utils.generators import GeneratorContext, run_template
+
+    # The first template of every sampler kind
+    templates = {}
+    for template in TEMPLATES.values():
+        templates.setdefault(template.sampler, template)
+    ctx = GeneratorContext(*graph)
+    index = SchemaIndex(graph[0])
+    narrowed = 0
+    for template in templates.values():
+        projection = PropertyProjection(templates=[template])
+        projection.bind(index)
+        projected = project_instances(graph, projection)
+        narrowed += projected != graph
+        assert run_template(template, GeneratorContext(*projected)) == run_template(template, ctx), template.name
+    # Not only templates reading every datatype
+    assert narrowed >= 3
+
+
+#### Batched extraction ####
+
+def test_batch_queries():
+    query = node_instances_batch_query(["A", "B"], ["{`x`: p.`x`}", "properties(p)"])
+    assert query == (
+        "CALL {\n"
+        "    MATCH (p:`A`)\n    WITH p LIMIT $n\n"
+        "    RETURN 0 AS idx, {Label: $labels[0], properties: {`x`: p.`x`}} AS Instance\n"
+        "    UNION ALL\n"
+        "    MATCH (p:`B`)\n    WITH p LIMIT $n\n"
+        "    RETURN 1 AS idx, {Label: $labels[1], properties: properties(p)} AS Instance\n"
+        "}\nRETURN idx, Instance")
+
+    query = relationship_instances_batch_query([{"start": "A", "type": "R", "end": "B"}])
+    assert query == (
+        "CALL {\n"
+        "    MATCH (a:`A`)-[r:`R`]->(b:`B`)\n    WITH a, r, b LIMIT $n\n"
+        "    RETURN 0 AS idx, properties(a) AS source, properties(r) AS rel, properties(b) AS target\n"
+        "}\nRETURN idx, source, rel, target")
+
+
+class BatchServer:
+    """Stand-in for the database: answers the batched instance queries from the synthetic
+    instances, and the other queries with the schema server."""
+
+    def __init__(self, graph, server):
+        self.server = server
+        self.jschema, self.node_instances, self.rels_instances = graph
+        self.labels = list(self.jschema['node_props'])
+        self.queries = []
+
+    def query(self, cypher_query, params={}, db=None):
+        if not cypher_query.startswith("CALL {"):
+            return self.server.query(cypher_query, params, db)
+        self.queries.append((cypher_query, params))
+        rows = []
+        if cypher_query.endswith("RETURN idx, Instance"):
+            for idx, label in enumerate(params["labels"]):
+                for rec in self.node_instances[self.labels.index(label)][:params["n"]]:
+                    # Null entries of the projected maps
+                    rows.append({"idx": idx, "Instance": {"Label": label,
+                                                          "properties": dict(rec["Instance"]["properties"], gone=None)}})
+        else:
+            triples = [{"start": start, "type": rtype, "end": end} for start, rtype, end
+                       in re.findall(r"MATCH \(a:`(.*?)`\)-\[r:`(.*?)`\]->\(b:`(.*?)`\)", cypher_query)]
+            for idx, rel in enumerate(triples):
+                instances = self.rels_instances[self.jschema['relationships'].index(rel)]
+                rows += [{"idx": idx, "source": rec[f"{rel['start']}_Start"], "rel": rec[rel['type']],
+                          "target": rec[f"{rel['end']}_End"]} for rec in instances[:params["n"]]]
+        return rows
+
+
+@pytest.fixture
+def batch_server(graph, server, monkeypatch):
+    batch_server = BatchServer(graph, server)
+    monkeypatch.setattr(Neo4jGraph, "query", lambda self, q, params={}, db=None: batch_server.query(q, params, db))
+    return batch_server
+
+
+def test_batched_node_extraction(graph, server, batch_server):
+    schema = connect(projection=PropertyProjection())
+    labels = list(graph[0]['node_props'])
+    extracted = schema.extract_node_instances(labels, 5, batch_size=3)
+    assert extracted == [instances[:5] for instances in graph[1]]
+
+    # 8 labels: batches of 3, 3 and 2, in order
+    assert [params["labels"] for _, params in batch_server.queries] == [labels[:3], labels[3:6], labels[6:]]
+    for query, params in batch_server.queries:
+        assert params["n"] == 5
+        assert query.count("UNION ALL") == len(params["labels"]) - 1
+        for idx, label in enumerate(params["labels"]):
+            assert (f"MATCH (p:`{label}`)\n    WITH p LIMIT $n\n    RETURN {idx} AS idx, "
+                    f"{{Label: $labels[{idx}], properties: {schema._node_properties(label)}}} AS Instance") in query
+
+    # One batch when batch_size covers all the labels
+    batch_server.queries.clear()
+    assert schema.extract_node_instances(labels, 5, batch_size=50) == extracted
+    assert len(batch_server.queries) == 1
+
+
+def test_batched_relationship_extraction(graph, server, batch_server):
+    schema = connect(projection=PropertyProjection())
+    rtriples = graph[0]['relationships']
+    extracted = schema.extract_multiple_relationships_instances(rtriples, 4, batch_size=5)
+    assert extracted == [instances[:4] for instances in graph[2]]
+
+    # 12 triples: batches of 5, 5 and 2, in order
+    assert [query.count("UNION ALL") + 1 for query, _ in batch_server.queries] == [5, 5, 2]
+    for batch, (query, params) in zip(batched(rtriples, 5), batch_server.queries):
+        assert params == {"n": 4}
+        for idx, rel in enumerate(batch):
+            source, relp, target = schema._relationship_properties(rel)
+            assert (f"MATCH (a:`{rel['start']}`)-[r:`{rel['type']}`]->(b:`{rel['end']}`)\n"
+                    f"    WITH a, r, b LIMIT $n\n"
+                    f"    RETURN {idx} AS idx, {source} AS source, {relp} AS rel, {target} AS target") in query
+
+
+#### Sampling ####
+
+REL = {"start": "A", "type": "R", "end": "B"}
+
+
+def test_sampling_queries():
+    assert start_ids_query(REL) == (
+        "MATCH (a:`A`)\n"
+        "    WHERE EXISTS { MATCH (a)-[:`R`]->(:`B`) }\n"
+        "    RETURN id(a) AS id")
+    query = relationship_sample_query(REL)
+    # The expansion is capped before the shuffle
+    assert ("        MATCH (a)-[r:`R`]->(b:`B`)\n"
+            "        WITH r, b LIMIT $max_expand\n"
+            "        WITH r, b ORDER BY rand() LIMIT $per_node\n") in query
+    assert query.endswith("RETURN properties(a) AS source, properties(r) AS rel, properties(b) AS target")
+    assert node_sample_query("A") == "UNWIND $ids AS i\n    MATCH (p:`A`) WHERE id(p) = i\n    RETURN properties(p) AS properties"
+
+
+class SampleServer:
+    """Stand-in for the database: answers the sampling queries from a map of node ids to labels,
+    and the other queries with the schema server. The start nodes of degrees have degrees[id]
+    relationships of type R to the node 0."""
+
+    def __init__(self, server, ids, degrees=None):
+        self.server = server
+        self.ids = ids
+        self.degrees = degrees or {}
+        self.queries = []
+
+    def query(self, cypher_query, params={}, db=None):
+        self.queries.append((cypher_query, params))
+        if cypher_query == node_count_query:
+            return [{"count": len(self.ids)}]
+        if cypher_query == label_count_query("A"):
+            return [{"count": sum(label == "A" for label in self.ids.values())}]
+        if cypher_query == id_range_probe_query:
+            found = [i for i in self.ids if params["low"] <= i <= params["high"]]
+            return [{"max_id": max(found) if found else None}]
+        if cypher_query == max_id_query:
+            return [{"max_id": max(self.ids)}]
+        if cypher_query == label_ids_query("A"):
+            return [{"id": i} for i, label in self.ids.items() if label == "A"]
+        if cypher_query == start_ids_query(REL):
+            return [{"id": i} for i in self.degrees]
+        if cypher_query == node_sample_query("A"):
+            return [{"properties": {"uid": i}} for i in params["ids"] if self.ids.get(i) == "A"]
+        if cypher_query == relationship_sample_query(REL):
+            return [{"source": {"uid": i}, "rel": {"rank": k}, "target": {"uid": 0}}
+                    for i in params["ids"] if i in self.degrees
+                    for k in range(min(self.degrees[i], params["max_expand"]))[:params["per_node"]]]
+        self.queries.pop()
+        return self.server.query(cypher_query, params, db)
+
+    def count(self, cypher_query):
+        return sum(query == cypher_query for query, _ in self.queries)
+
+
+def sample_server(server, monkeypatch, ids, degrees=None):
+    sample_server = SampleServer(server, ids, degrees)
+    monkeypatch.setattr(Neo4jGraph, "query", lambda self, q, params={}, db=None: sample_server.query(q, params, db))
+    return sample_server
+
+
+def test_id_bound_probes(server, monkeypatch):
+    ids = {i: "A" if i % 2 else "B" for i in range(2500)}
+    sampling = sample_server(server, monkeypatch, ids)
+    schema = connect()
+    assert schema.node_id_upper_bound(block=100) == 2500
+    assert sampling.count(max_id_query) == 0
+    # Computed once
+    probes = sampling.count(id_range_probe_query)
+    schema.node_id_upper_bound(block=100)
+    assert sampling.count(id_range_probe_query) == probes
+
+    instances = schema.sample_label_instances("A", 100, seed=1, scan_threshold=10)
+    uids = [rec["Instance"]["properties"]["uid"] for rec in instances]
+    assert len(set(uids)) == 100 and all(i % 2 for i in uids)
+    assert sampling.count(max_id_query) == 0
+    assert schema.sample_label_instances("A", 100, seed=1, scan_threshold=10) == instances
+
+
+def test_id_gap_falls_back_to_max_id(server, monkeypatch):
+    # 50 nodes after a gap of more than a probe block
+    ids = {i: "A" for i in list(range(50)) + list(range(5000, 5050))}
+    sampling = sample_server(server, monkeypatch, ids)
+    schema = connect()
+    assert schema.node_id_upper_bound() == 100
+
+    instances = schema.sample_label_instances("A", 80, seed=1, scan_threshold=10)
+    uids = [rec["Instance"]["properties"]["uid"] for rec in instances]
+    assert len(set(uids)) == 80
+    assert any(i >= 5000 for i in uids)
+    assert sampling.count(max_id_query) == 1
+    assert schema.node_id_upper_bound() == 5050
+
+    # All of them, the exact bound is not recomputed
+    assert len(schema.sample_label_instances("A", 200, seed=2, scan_threshold=10)) == 100
+    assert sampling.count(max_id_query) == 1
+
+
+def test_triple_sampling_caps_the_expansion(server, monkeypatch):
+    ids = {i: "A" for i in range(20)}
+    degrees = {0: 100000, 3: 2, 7: 1}
+    sampling = sample_server(server, monkeypatch, ids, degrees)
+    schema = connect()
+
+    # Small start label: the start nodes of the triple only
+    instances = schema.sample_triple_instances(REL, 10, seed=1, per_node=2, max_expand=50)
+    assert sampling.count(start_ids_query(REL)) == 1
+    assert sorted(rec["A_Start"]["uid"] for rec in instances) == [0, 0, 3, 3, 7]
+    params = [params for query, params in sampling.queries if query == relationship_sample_query(REL)]
+    assert params and all((p["per_node"], p["max_expand"]) == (2, 50) for p in params)
+
+    # Large start label: id seeks, with the same cap
+    instances = schema.sample_multiple_relationships_instances([REL], 3, seed=1, scan_threshold=5, max_expand=10)
+    assert len(instances[0]) == 3
+    assert sampling.count(start_ids_query(REL)) == 1
+    assert sampling.queries[-1][1]["max_expand"] == 10
@@ -0,0 +1,64 @@
+import csv
+
+import pytest
+
+# Import local modules
+from utils.profiling import *
+from utils.dedup import Deduplicator
+from utils.generators import GeneratorContext, GENERATORS, run_template
+from utils.templates import TEMPLATES
+
+
+@pytest.fixture(scope="module")
+def ctx(graph):
+    return GeneratorContext(*graph)
+
+
+NAME = "where_one_node_one_prop_one_val"
+
+
+def test_profile_generator_counts(ctx):
+    candidates = run_template(TEMPLATES[NAME], ctx)
+    assert len(candidates) > 20
+    samples, record = profile_generator(NAME, GENERATORS[NAME], ctx, 20, seed=1)
+    assert samples == collect_samples(iter(candidates), 20, seed=1)
+    assert list(record) == PROFILE_FIELDS
+    assert record["name"] == NAME
+    assert record["candidates"] == len(candidates)
+    assert record["emitted"] == 20
+    assert record["render_misses"] + record["render_hits"] == len(candidates)
+    assert record["duplicates"] is None
+
+    # A generator returning a list is counted as well
+    samples, record = profile_generator(NAME, lambda ctx: candidates[:10], ctx, 20)
+    assert samples == candidates[:10]
+    assert (record["candidates"], record["emitted"], record["render_misses"]) == (10, 10, 0)
+
+
+def test_duplicates_and_report(ctx, tmp_path):
+    samples, record = profile_generator(NAME, GENERATORS[NAME], ctx, 20, seed=1)
+    dedup = Deduplicator(near=False)
+    assert len(list(dedup.filter(samples + samples[:5], NAME))) == len(samples)
+    add_duplicates([record], dedup.stats())
+    assert record["duplicates"] == 5
+
+    path = str(tmp_path / "profile.csv")
+    write_profile_report([record], path)
+    with open(path, newline="") as fp:
+        rows = list(csv.DictReader(fp))
+    assert list(rows[0]) == PROFILE_FIELDS
+    assert (rows[0]["name"], rows[0]["candidates"], rows[0]["emitted"], rows[0]["duplicates"]) == (
+        NAME, str(record["candidates"]), "20", "5")
+
+    path = str(tmp_path / "profile.json")
+    write_profile_report([dict(record, extra=1)], path)
+    assert read_json(path) == [record]
+    assert NAME in profile_summary([record])
+
+
+def test_render_report(ctx):
+    records = [profile_generator(NAME, GENERATORS[NAME], ctx, 20)[1] for _ in range(2)]
+    hits = sum(r["render_hits"] for r in records)
+    misses = sum(r["render_misses"] for r in records)
+    assert records[1]["render_misses"] == 0
+    assert f"{hits} hits, {misses} misses, hit rate {hits / (hits + misses):.1%}" in render_report(records)
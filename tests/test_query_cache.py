@@ -0,0 +1,119 @@
+import itertools
+import pickle
+
+import pytest
+
+# Import local modules
+from utils import query_cache
+from utils.query_cache import *
+from utils.neo4j_conn import Neo4jGraph, CachedNeo4jGraph
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with QueryCache(str(tmp_path / "cache.sqlite")) as cache:
+        yield cache
+
+
+def test_round_trip(cache, graph):
+    node_instances = graph[1]
+    key = query_key("neo4j", "MATCH (n) RETURN n", {"n": 3})
+    assert cache.get(key) is MISSING
+    cache.put(key, node_instances, "MATCH (n) RETURN n")
+    assert cache.get(key) == node_instances
+    assert cache.cache_info()["hits"] == 1 and cache.cache_info()["misses"] == 1
+    with QueryCache(cache.file_path, mode=REPLAY) as reopened:
+        assert reopened.get(key) == node_instances
+
+
+def test_keys():
+    assert query_key("neo4j", "RETURN 1") == query_key("neo4j", "RETURN 1", {})
+    assert query_key("neo4j", "RETURN $x", {"x": 1, "y": 2}) == query_key("neo4j", "RETURN $x", {"y": 2, "x": 1})
+    assert query_key("neo4j", "RETURN 1") != query_key("other", "RETURN 1")
+
+
+def test_ttl(cache, monkeypatch):
+    cache.ttl = 10
+    cache.put("a", 1)
+    later = query_cache.now() + 11
+    monkeypatch.setattr(query_cache, "now", lambda: later)
+    assert cache.get("a") is MISSING
+    assert len(cache) == 0
+
+
+def test_least_recently_used_eviction(cache, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(query_cache, "now", lambda: next(clock))
+    cache.max_entries = 2
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    cache.max_entries = None
+    cache.max_bytes = 2 * len(pickle.dumps("x" * 100, protocol=pickle.HIGHEST_PROTOCOL))
+    for key in "defg":
+        cache.put(key, "x" * 100)
+    assert cache.cache_info()["bytes"] <= cache.max_bytes
+    assert cache.get("g") == "x" * 100
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        QueryCache(str(tmp_path / "cache.sqlite"), mode="write")
+
+
+#### CachedNeo4jGraph ####
+
+@pytest.fixture
+def server(monkeypatch):
+    """Replaces the Neo4j connection: stream yields $n records, the pulled records are counted."""
+    pulled = []
+
+    def init(self, url, username, password, database, max_connection_pool_size=None):
+        self._driver = None
+        self._database = database
+
+    def stream(self, cypher_query, params={}, db=None, fetch_size=1000):
+        for i in range(params.get("n", 5)):
+            pulled.append(i)
+            yield {"i": i}
+
+    monkeypatch.setattr(Neo4jGraph, "__init__", init)
+    monkeypatch.setattr(Neo4jGraph, "stream", stream)
+    monkeypatch.setattr(Neo4jGraph, "query", lambda self, q, params={}, db=None: list(stream(self, q, params)))
+    return pulled
+
+
+def test_stream_yields_records_as_they_arrive(cache, server):
+    graph = CachedNeo4jGraph("bolt://localhost", "neo4j", "", "neo4j", cache)
+    records = graph.stream("MATCH (n) RETURN n", {"n": 5})
+    assert next(records) == {"i": 0}
+    assert len(server) == 1
+    assert len(cache) == 0
+    assert list(records) == [{"i": i} for i in range(1, 5)]
+    assert len(cache) == 1
+
+    # Served from the cache, also to query
+    assert list(graph.stream("MATCH (n) RETURN n", {"n": 5})) == [{"i": i} for i in range(5)]
+    assert graph.query("MATCH (n) RETURN n", {"n": 5}) == [{"i": i} for i in range(5)]
+    assert len(server) == 5
+
+
+def test_stream_skips_large_and_unfinished_results(cache, server):
+    graph = CachedNeo4jGraph("bolt://localhost", "neo4j", "", "neo4j", cache, max_stream_records=10)
+    assert len(list(graph.stream("MATCH (n) RETURN n", {"n": 11}))) == 11
+    records = graph.stream("MATCH (n) RETURN n", {"n": 3})
+    next(records)
+    records.close()
+    assert len(cache) == 0
+
+
+def test_replay(cache, server):
+    CachedNeo4jGraph("bolt://localhost", "neo4j", "", "neo4j", cache).query("RETURN 1", {"n": 2})
+    with QueryCache(cache.file_path, mode=REPLAY) as replay_cache:
+        graph = CachedNeo4jGraph("bolt://localhost", "neo4j", "", "neo4j", replay_cache)
+        assert list(graph.stream("RETURN 1", {"n": 2})) == [{"i": 0}, {"i": 1}]
+        with pytest.raises(LookupError):
+            list(graph.stream("RETURN 2"))
@@ -0,0 +1,88 @@
+import pytest
+
+# Import local modules
+from utils.utilities import write_json
+from utils.snapshot import *
+from utils.graph_utils import get_nodes_list, build_datatype_views
+from utils.templates import TEMPLATES, RELATIONSHIP, RELATIONSHIP_WITH_PROPS
+from utils.generators import required_instances
+
+
+@pytest.fixture
+def snapshots(graph, tmp_path):
+    """Node and relationship snapshots of the synthetic graph."""
+    jschema, node_instances, rels_instances = graph
+    node_path, rels_path = str(tmp_path / "nodes.snap"), str(tmp_path / "rels.snap")
+    write_node_instances_snapshot(node_instances, node_path, get_nodes_list(jschema))
+    write_relationships_instances_snapshot(rels_instances, rels_path, jschema['relationships'])
+    return node_path, rels_path
+
+
+def test_round_trip(graph, snapshots):
+    jschema, node_instances, rels_instances = graph
+    node_path, rels_path = snapshots
+    with InstanceSnapshot(node_path) as snapshot:
+        assert snapshot.kind == NODES
+        assert snapshot.keys() == get_nodes_list(jschema)
+        assert list(snapshot) == node_instances
+    with InstanceSnapshot(rels_path) as snapshot:
+        assert snapshot.kind == RELATIONSHIPS
+        assert list(snapshot) == rels_instances
+
+
+def test_uncompressed_round_trip(graph, tmp_path):
+    node_instances = graph[1]
+    path = str(tmp_path / "nodes.snap")
+    assert write_snapshot(node_instances, path, NODES, compress=False) == sum(map(len, node_instances))
+    with InstanceSnapshot(path) as snapshot:
+        assert not snapshot.compressed
+        assert list(snapshot) == [group for group in node_instances if group]
+
+
+def test_groups_reads_the_selected_keys(graph, snapshots):
+    jschema, node_instances, rels_instances = graph
+    node_path, rels_path = snapshots
+    labels = get_nodes_list(jschema)
+    with InstanceSnapshot(node_path) as snapshot:
+        assert snapshot.groups([labels[2], "Missing", labels[0]]) == [node_instances[2], node_instances[0]]
+        assert snapshot.count(labels[1]) == len(node_instances[1])
+        assert labels[1] in snapshot and "Missing" not in snapshot
+    rel = jschema['relationships'][3]
+    with InstanceSnapshot(rels_path) as snapshot:
+        assert snapshot.groups([rel]) == [rels_instances[3]]
+        assert snapshot[(rel['start'], rel['type'], rel['end'])] == rels_instances[3]
+
+
+def test_read_instances(graph, snapshots, tmp_path):
+    jschema, node_instances, _ = graph
+    node_path, _ = snapshots
+    assert read_instances(node_path) == node_instances
+    assert read_instances(node_path, get_nodes_list(jschema)[:1]) == node_instances[:1]
+    json_path = str(tmp_path / "nodes.json")
+    write_json(node_instances, json_path)
+    assert read_instances(json_path, get_nodes_list(jschema)[:1]) == node_instances
+
+
+def test_duplicate_key_raises(graph, tmp_path):
+    node_instances = graph[1]
+    path = tmp_path / "nodes.snap"
+    with pytest.raises(ValueError):
+        write_snapshot([node_instances[0], node_instances[1], node_instances[0]], str(path), NODES)
+    assert not path.exists()
+    with pytest.raises(ValueError):
+        write_snapshot(node_instances[:2], str(path), NODES, keys=["A", "A"])
+
+
+def test_required_groups_give_the_same_views(graph, snapshots):
+    jschema = graph[0]
+    node_path, rels_path = snapshots
+    names = ["find_count_in_interval", "relation_with_and_where"]
+    labels, rtriples = required_instances(jschema, names)
+    assert len(labels) + len(rtriples) < len(get_nodes_list(jschema)) + len(jschema['relationships'])
+    full = build_datatype_views(jschema, read_instances(node_path), read_instances(rels_path))
+    partial = build_datatype_views(jschema, read_instances(node_path, labels), read_instances(rels_path, rtriples))
+    for template in (TEMPLATES[name] for name in names):
+        views = {RELATIONSHIP: (full[1], partial[1]),
+                 RELATIONSHIP_WITH_PROPS: (full[2], partial[2])}.get(template.sampler, (full[0], partial[0]))
+        for source in template.sources:
+            assert views[1].get(source) == views[0].get(source)
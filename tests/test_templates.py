@@ -0,0 +1,235 @@
+import pytest
+
+# Import local modules
+from utils.templates import *
+from utils.generators import GeneratorContext, SYSTEM_MESSAGE, iter_template, run_template
+from utils.graph_utils import SubschemaRenderer
+
+
+#### Prompters of SFT_Functional_Data_Builder.ipynb, before the registry ####
+
+system_message = SYSTEM_MESSAGE
+subschema_renderer = None
+
+
+def count_nodes_of_given_label(*params, **kwargs):
+
+    label_1 = params[0]
+
+    subschema =  subschema_renderer.render([[label_1, ]],[], False, False, False, include_relationships=False)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Find the total number of {label_1} in the graph!""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f"MATCH (n:{label_1}) RETURN count(n)"
+               }
+    return message
+
+
+def find_nodes_connected_to_two_nodes(*params, **kwargs):
+
+    label_1 = params[0]
+    label_2 = params[1]
+
+    subschema = subschema_renderer.render([[label_1, ], [label_2, ]], [], False, False, False, include_relationships=False)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Find nodes that share a relationship with both {label_1} and {label_2}!""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f"""MATCH (c:{label_1})<-[r1]-(n)-[r2]->(d:{label_2}) RETURN labels(n)"""
+                       }
+    return message
+
+
+def match_skip_limit_return_property(*params, **kwargs):
+
+    label_1 = params[0]
+    prop_1 = params[1]
+
+    nrecs = kwargs.get('nrecs', 2)
+
+    subschema = subschema_renderer.render([[label_1, prop_1]], [], True, False, True, include_relationships=False)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Return the {prop_1} of the {label_1}, skip the first {nrecs} records and return {nrecs} records!""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f"MATCH (n:{label_1}) RETURN n.{prop_1}  SKIP {nrecs} LIMIT {nrecs}"
+               }
+    return message
+
+
+def where_one_node_two_props_two_vals_or_notnull_date(*params, **kwargs):
+
+    label_1 = params[0]
+    prop_1 = params[1]
+    val_1 = params[2]
+    prop_2 = params[3]
+    val_2 = params[4]
+
+    subschema = subschema_renderer.render([[label_1, prop_1], [label_1, prop_2]], [], True, False, True, include_relationships=False)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Find the {prop_2} for those {label_1}s where {prop_1} is {val_1} and the year of the {prop_2} is {val_2[:4]}!""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f"MATCH (n:{label_1}) WHERE n.{prop_1} = '{val_1}' AND date(n.{prop_2}).year = {val_2[:4]} RETURN n.{prop_2} AS {prop_2}"
+               }
+    return message
+
+
+def rel_and_common_prop(*params, **kwargs):
+
+    label_1 = params[0]
+    prop_1 = params[1]
+    val_1 = params[2]
+    label_2 = params[3]
+    prop_2 = params[4]
+    val_2 = params[5]
+
+    subschema = subschema_renderer.render([[label_1, prop_1], [label_2, prop_2]], [], True, False, True, include_relationships=False)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Are there any nodes that are connected with {label_1} where {prop_1} is {val_1} and share a common property with {label_2}, for which {prop_2} equals {val_2}?""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f"""MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n), (d:{label_2}{{{prop_2}:'{val_2}'}}) WHERE ANY(key in keys(n) WHERE n[key] = d[key]) RETURN n"""}
+    return message
+
+
+def where_and_simple_path(*params, **kwardgs):
+
+    label_1= params[0]
+    prop_1 = params[1]
+    val_1 = params[2]
+    rel_1 = params[3]
+    label_2 = params[4]
+    prop_2 = params[5]
+
+    subschema = subschema_renderer.render([[label_1, prop_1], [label_2, prop_2 ]], [[rel_1, ]], True, False, True)
+    message = {"Prompt": "Convert the following question into a Cypher query using the provided graph schema!",
+               "Question": f"""Retrieve the {prop_2} for {label_2} that is linked through a {rel_1} relationship with the {label_1} where {prop_1} is {val_1}!""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f"MATCH (n:{label_1}) -[{rel_1[:2].lower()}:{rel_1}]->(m) WHERE n.{prop_1}='{val_1}' RETURN m.{prop_2}"
+               }
+    return message
+
+
+def find_far_unique_rels(*params, **kwargs):
+
+    label_1= params[0]
+    prop_1 = params[1]
+    val_1 = params[2]
+    nhops = kwargs.get('nhops', 2)
+
+
+    subschema = subschema_renderer.render([[label_1, prop_1]], [], True, False, True, include_relationships=False)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""List the distinct properties of nodes that are {nhops} hops away from {label_1} with {prop_1} equal to {val_1}!""",
+               "Schema": f"Graph schema: {subschema}",
+               "Cypher": f" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[*{nhops}]->(n) RETURN DISTINCT properties(n) AS props"
+               }
+    return message
+
+
+def relation_with_and_where_relprops(*params, **kwardgs):
+
+    label_1 = params[0]
+    prop_1 = params[1]
+    val_1 = params[2]
+    rel_1 = params[3]
+    rprop_1 = params[4]
+    label_2 = params[6]
+    prop_2 = params[7]
+
+    subschema = subschema_renderer.render([[label_1, prop_1], [label_2,prop_2]], [[rel_1,rprop_1 ]],True, True, True)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Find the {label_2} with a {prop_2} starting with {label_2[0]}, and linked with an {label_1} through {rel_1} relationship. The {label_1} must have {prop_1}: {val_1} and be {rel_1} with {rprop_1} recorded!""",
+               "Schema": f"{subschema}",
+               "Cypher": f"MATCH (n:{label_1} {{{prop_1}: '{val_1}'}}) -[r:{rel_1}]- (m:{label_2}) WHERE m.{prop_2} STARTS WITH '{label_2[0]}' AND r.{rprop_1} IS NOT NULL RETURN n.{prop_2}"
+    }
+    return message
+
+
+def find_not_connected_nodes_relprops(*params, **kwardgs):
+
+    label_1= params[0]
+    rel_1 = params[3]
+    rprop_1 = params[4]
+    rval_1 = params[5]
+
+    subschema = subschema_renderer.render([[label_1, ]], [[rel_1,rprop_1]],False, True, True)
+    message = {"Prompt": f"{system_message}",
+               "Question": f"""Fetch five {label_1} that are not linked through {rel_1} relationships where {rprop_1} is {rval_1}!""",
+               "Schema": f"{subschema}",
+               "Cypher": f"MATCH (p:{label_1}) WHERE NOT EXISTS {{(p)-[r:{rel_1}]->() WHERE r.{rprop_1}='{rval_1}' }} RETURN p LIMIT 5"
+    }
+    return message
+
+
+NOTEBOOK_PROMPTERS = {f.__name__: f for f in [
+    count_nodes_of_given_label,
+    find_nodes_connected_to_two_nodes,
+    match_skip_limit_return_property,
+    where_one_node_two_props_two_vals_or_notnull_date,
+    rel_and_common_prop,
+    where_and_simple_path,
+    find_far_unique_rels,
+    relation_with_and_where_relprops,
+    find_not_connected_nodes_relprops,
+]}
+
+
+class NotebookContext(GeneratorContext):
+    """Runs the notebook prompters in place of the compiled ones."""
+
+    def prompter(self, template):
+        return NOTEBOOK_PROMPTERS[template.name]
+
+
+@pytest.fixture(scope="module")
+def contexts(graph):
+    global subschema_renderer
+    subschema_renderer = SubschemaRenderer(graph[0])
+    return {allow_repeats: (GeneratorContext(*graph, allow_repeats=allow_repeats),
+                            NotebookContext(*graph, allow_repeats=allow_repeats))
+            for allow_repeats in (True, False)}
+
+
+#### Compiler ####
+
+def test_compiled_prompters_match_the_notebook_prompters(contexts):
+    assert {TEMPLATES[name].sampler for name in NOTEBOOK_PROMPTERS} == set(SAMPLER_PARAMS)
+    for ctx, notebook_ctx in contexts.values():
+        for name in NOTEBOOK_PROMPTERS:
+            samples = run_template(TEMPLATES[name], ctx)
+            assert samples
+            assert samples == list(iter_template(TEMPLATES[name], notebook_ctx))
+
+
+def test_compiled_prompter(graph):
+    renderer = SubschemaRenderer(graph[0])
+    template = TEMPLATES["match_skip_limit_return_property"]
+    prompter = compile_prompter(template, renderer.render_canonical, "System")
+    assert prompter.__name__ == template.name
+    assert prompter.__doc__ == template.doc
+    sample = prompter("Label0", "prop0", "v")
+    assert sample.prompt == "System"
+    assert sample.schema == "Graph schema: " + renderer.render([["Label0", "prop0"]], [], True, False, True, False)
+    assert sample.cypher == "MATCH (n:Label0) RETURN n.prop0  SKIP 2 LIMIT 2"
+    # The constants are keyword arguments
+    assert prompter("Label0", "prop0", "v", nrecs=5).cypher == "MATCH (n:Label0) RETURN n.prop0  SKIP 5 LIMIT 5"
+    assert renderer.cache_info()["misses"] == 1
+
+
+def test_escaped_texts():
+    template = QueryTemplate(name="escapes", sampler=LABEL, subschema=Subschema(nodes=[["label_1"]]),
+                             question='Say "{label_1}"\\n\nnow!',
+                             cypher="MATCH (n:{label_1} {{name: '{label_1[::-1]}'}}) RETURN n")
+    prompter = compile_prompter(template, lambda *args: "", "")
+    sample = prompter("Person")
+    assert sample.question == 'Say "Person"\\n\nnow!'
+    assert sample.cypher == "MATCH (n:Person {name: 'nosreP'}) RETURN n"
+
+
+def test_invalid_templates():
+    with pytest.raises(ValueError):
+        QueryTemplate(name="unknown", sampler="path", subschema=Subschema(nodes=[]), question="", cypher="")
+    with pytest.raises(ValueError):
+        QueryTemplate(name="sources", sampler=NODE, subschema=Subschema(nodes=[]), question="", cypher="")
+    template = QueryTemplate(name="unbalanced", sampler=LABEL, subschema=Subschema(nodes=[["label_1"]]),
+                             question="Find {label_1", cypher="")
+    with pytest.raises(ValueError):
+        compile_prompter(template, lambda *args: "", "")
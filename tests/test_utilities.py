@@ -0,0 +1,104 @@
+import random
+
+# Import local modules
+from utils.utilities import *
+
+
+def prompter(*args):
+    """Stand-in prompter, returns its parameters."""
+    return args
+
+
+#### Streaming samplers ####
+
+def test_iter_builders_match_the_list_builders(views):
+    dparsed, drels, drelsprops = views
+    for allow_repeats in (True, False):
+        assert (list(iter_node_sampler(dparsed['string_parsed'], prompter, allow_repeats))
+                == build_node_sampler(dparsed['string_parsed'], prompter, allow_repeats))
+        assert (list(iter_relationships_samples(drels['all_rels'], prompter, allow_repeats))
+                == build_relationships_samples(drels['all_rels'], prompter, allow_repeats))
+        assert (list(iter_relationships_props_samples(drelsprops['all_rels'], prompter, allow_repeats))
+                == build_relationships_props_samples(drelsprops['all_rels'], prompter, allow_repeats))
+
+
+def test_node_sampler_without_repeats_keeps_the_first_label_property(views):
+    entries = views[0]['dtypes_parsed']
+    seen = set()
+    expected = []
+    for label, prop, value in entries:
+        if (label, prop) not in seen:
+            seen.add((label, prop))
+            expected.append((label, prop, value))
+    assert build_node_sampler(entries, prompter, allow_repeats=False) == expected
+
+
+def test_builders_accept_plain_lists(views):
+    entries = views[0]['string_parsed']
+    rels = views[1]['all_rels']
+    assert (build_node_sampler([list(e) for e in entries], prompter, True)
+            == build_node_sampler(entries, prompter, True))
+    assert (build_relationships_samples([list(e) for e in rels], prompter, False)
+            == build_relationships_samples(rels, prompter, False))
+    rels_props = views[2]['all_rels']
+    assert (build_relationships_props_samples([list(e) for e in rels_props], prompter, False)
+            == build_relationships_props_samples(rels_props, prompter, False))
+    assert (build_nodes_property_pairs_sampler([list(e) for e in entries], [list(e) for e in entries],
+                                               prompter, same_node=True, allow_repeats=False)
+            == build_nodes_property_pairs_sampler(entries, entries, prompter, same_node=True, allow_repeats=False))
+
+
+#### Property pairs ####
+
+def cartesian_property_pairs(nlist_1, nlist_2, same_node, allow_repeats):
+    """Reference pairs: the filtered cartesian product, first (label, property) pairs without repeats."""
+    output = [e for e in product(nlist_1, nlist_2) if not same_node or e[0][0] == e[1][0]]
+    if allow_repeats:
+        return output
+    seen = set()
+    filtered = []
+    for e1, e2 in output:
+        key = (e1[0], e1[1], e2[0], e2[1])
+        if key not in seen:
+            seen.add(key)
+            filtered.append((e1, e2))
+    return filtered
+
+
+def test_property_pairs_match_the_cartesian_filter(views):
+    dparsed = views[0]
+    for key_1, key_2 in [('string_parsed', 'string_parsed'), ('integer_parsed', 'date_parsed'),
+                         ('dtypes_parsed', 'float_parsed')]:
+        for same_node in (True, False):
+            for allow_repeats in (True, False):
+                expected = cartesian_property_pairs(dparsed[key_1], dparsed[key_2], same_node, allow_repeats)
+                assert get_property_pairs(dparsed[key_1], dparsed[key_2],
+                                          same_node, allow_repeats) == expected
+
+
+def test_same_node_pairs_share_the_label(views):
+    entries = views[0]['string_parsed']
+    pairs = get_property_pairs(entries, entries, same_node=True, allow_repeats=True)
+    assert pairs
+    assert all(e1[0] == e2[0] for e1, e2 in pairs)
+
+
+#### Sample selection ####
+
+def test_reservoir_sample_keeps_short_streams():
+    assert reservoir_sample(iter(range(5)), 10) == [0, 1, 2, 3, 4]
+    assert reservoir_sample(iter(range(5)), 0) == []
+
+
+def test_collect_samples_from_a_generator():
+    selected = collect_samples((i for i in range(1000)), 50, seed=7)
+    assert len(selected) == 50
+    assert len(set(selected)) == 50
+    assert selected == collect_samples((i for i in range(1000)), 50, seed=7)
+    assert selected == collect_samples((i for i in range(1000)), 50, seed=random.Random(7))
+
+
+def test_collect_samples_from_a_list():
+    samples = list(range(20))
+    assert collect_samples(samples, 50) is samples
+    assert collect_samples(samples, 5, seed=1) == random.Random(1).sample(samples, 5)
@@ -0,0 +1,51 @@
+# Import local modules
+from utils.validation import *
+
+
+class Explainer:
+    """Local stand-in for Neo4jGraph.explain: queries on Label3 do not plan."""
+
+    def __init__(self):
+        self.planned = []
+
+    def explain(self, queries):
+        self.planned.extend(queries)
+        return [None if "Label3" not in query else "Unknown label" for query in queries]
+
+
+SAMPLES = [{"Question": f"q{i}", "Cypher": f"MATCH (n:Label{i % 4}) RETURN n LIMIT {i % 3}"}
+           for i in range(100)]
+
+
+def test_one_query_planned_per_structure():
+    explainer = Explainer()
+    validator = QueryValidator(explainer, batch_size=3, max_workers=2)
+    errors = validator.validate_queries(sample["Cypher"] for sample in SAMPLES)
+    assert errors == [None if "Label3" not in s["Cypher"] else "Unknown label" for s in SAMPLES]
+    assert len(explainer.planned) == len({structural_key(s["Cypher"]) for s in SAMPLES})
+    validator.validate_queries(sample["Cypher"] for sample in SAMPLES)
+    assert validator.cache_info()["misses"] == len(explainer.planned)
+
+
+def test_validate_samples():
+    validator = QueryValidator(Explainer())
+    kept = validator.validate_samples(SAMPLES, drop=True)
+    assert kept == [s for s in SAMPLES if "Label3" not in s["Cypher"]]
+    tagged = validator.validate_samples(SAMPLES)
+    assert [s.get("Error") for s in tagged] == [None if "Label3" not in s["Cypher"] else "Unknown label"
+                                                for s in SAMPLES]
+
+
+def test_lazy_validation_matches_and_reads_one_chunk_at_a_time():
+    for drop in (True, False):
+        assert (list(QueryValidator(Explainer()).iter_validate_samples(iter(SAMPLES), drop=drop, chunk_size=7))
+                == QueryValidator(Explainer()).validate_samples(SAMPLES, drop=drop))
+
+    read = []
+    def stream():
+        for sample in SAMPLES:
+            read.append(sample)
+            yield sample
+    results = QueryValidator(Explainer()).iter_validate_samples(stream(), chunk_size=10)
+    next(results)
+    assert len(read) == 10
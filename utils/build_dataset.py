@@ -0,0 +1,364 @@
+"""Headless builder of the fine-tuning dataset.
+
+Runs the generators of utils.generators over a process pool, from a saved
+schema and saved node / relationship instances (json files or binary
+snapshots). Each generator writes its samples to its own shard, the shards
+are merged in the registry order at the end, optionally through the
+duplicate filter of utils.dedup and the EXPLAIN validation of
+utils.validation (the Neo4j password is read from NEO4J_PASSWORD), into
+a json list or, for a .jsonl.gz / .jsonl / .parquet output, the compact
+format of utils.dataset_io. Each
+generator is profiled (see utils.profiling), the report lists where the
+time, the memory and the samples go.
+
+Usage, from the repository root:
+
+    python -m utils.build_dataset \
+        --schema datas/schema_file.json \
+        --node-instances datas/node_instances.snap \
+        --rels-instances datas/rels_instances.snap \
+        --output datas/parametric_trainer_with_repeats.json \
+        --workers 8 -M 500 --dedup
+"""
+
+from typing import Any, List, Dict, Tuple
+import argparse
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Import local modules
+from utils.utilities import *
+from utils.snapshot import read_instances
+from utils.generators import GENERATORS, GeneratorContext, required_instances
+from utils.dedup import Deduplicator
+from utils.validation import QueryValidator
+from utils.neo4j_conn import Neo4jGraph
+from utils.profiling import profile_generator, add_duplicates, write_profile_report, profile_summary, render_report
+from utils.dataset_io import PARQUET, write_dataset, is_compact_dataset, require_pyarrow
+
+# Context of the current worker process, set by _init_worker
+_CONTEXT: GeneratorContext = None
+
+
+def select_generators(only: List[str] = None,
+                      exclude: List[str] = None,
+                      ) -> List[str]:
+    """Names of the generators to run, in registry order."""
+    unknown = [name for name in (only or []) + (exclude or []) if name not in GENERATORS]
+    if unknown:
+        raise ValueError(f"Unknown generator(s): {', '.join(unknown)}")
+    names = list(GENERATORS) if not only else [name for name in GENERATORS if name in only]
+    return [name for name in names if name not in (exclude or [])]
+
+
+def parse_sample_limits(entries: List[str]) -> Dict[str, int]:
+    """Parses the NAME=M options into a dictionary."""
+    limits = {}
+    for entry in entries or []:
+        name, sep, value = entry.partition("=")
+        if not sep or not value.isdigit():
+            raise ValueError(f"Expected NAME=M, got {entry!r}")
+        limits[name] = int(value)
+    return limits
+
+
+# Record the peak memory of the generators in the current worker process
+_TRACE_MEMORY: bool = False
+
+
+def _init_worker(schema_path: str,
+                 node_instances_path: str,
+                 rels_instances_path: str,
+                 allow_repeats: bool,
+                 trace_memory: bool = False,
+                 columnar: bool = False,
+                 labels: List[str] = None,
+                 rtriples: List[Dict] = None,
+                 ) -> None:
+    """Loads the data and parses the instances once per worker process.
+    With labels / rtriples, only these groups of the .snap files are read."""
+    global _CONTEXT, _TRACE_MEMORY
+    _TRACE_MEMORY = trace_memory
+    _CONTEXT = GeneratorContext(read_json(schema_path),
+                                read_instances(node_instances_path, labels),
+                                read_instances(rels_instances_path, rtriples),
+                                allow_repeats=allow_repeats,
+                                columnar=columnar)
+
+
+def _run_generator(index: int,
+                   name: str,
+                   sample_max: int,
+                   seed: Any,
+                   shard_path: str,
+                   ) -> Dict[str, Any]:
+    """Runs one generator in the worker and writes its samples to shard_path.
+    Returns its profile record, with the index and shard path."""
+    try:
+        samples, record = profile_generator(name, GENERATORS[name], _CONTEXT,
+                                            sample_max, seed, trace_memory=_TRACE_MEMORY)
+    except Exception as e:
+        return {"index": index, "name": name, "error": f"{type(e).__name__}: {e}"}
+
+    write_json(samples, shard_path)
+    return dict(record, index=index, shard=shard_path)
+
+
+def merge_shards(shard_paths: List[str],
+                 output_path: str,
+                 dedup: Deduplicator = None,
+                 sources: List[str] = None,
+                 validator: QueryValidator = None,
+                 drop_invalid: bool = False,
+                 output_shard_size: int = None,
+                 ) -> int:
+    """Concatenates the json shards into a single json list, or a compact dataset
+    file for a .jsonl.gz / .jsonl / .parquet output_path (see utils.dataset_io),
+    returns its size. The compact files are written as the shards are read.
+    With dedup, the duplicates are dropped, sources name the shards in its statistics.
+    With validator, the invalid queries are dropped or tagged with an Error key.
+    output_shard_size splits a compact output into files of at most that many samples."""
+    def iter_samples():
+        for i, path in enumerate(shard_paths):
+            samples = read_json(path)
+            if dedup is not None:
+                samples = dedup.filter(samples, sources[i] if sources else path)
+            yield from samples
+
+    trainer = iter_samples()
+    columns = list(Sample.KEYS)
+    if validator is not None:
+        trainer = validator.iter_validate_samples(trainer, drop=drop_invalid)
+        if not drop_invalid:
+            columns.append("Error")
+    if is_compact_dataset(output_path):
+        return write_dataset(trainer, output_path, output_shard_size, columns=columns)
+    trainer = list(trainer)
+    write_json(trainer, output_path)
+    return len(trainer)
+
+
+def build_dataset(schema_path: str,
+                  node_instances_path: str,
+                  rels_instances_path: str,
+                  output_path: str,
+                  workers: int = None,
+                  only: List[str] = None,
+                  exclude: List[str] = None,
+                  sample_max: int = 500,
+                  sample_limits: Dict[str, int] = None,
+                  allow_repeats: bool = True,
+                  seed: int = None,
+                  shard_dir: str = None,
+                  keep_shards: bool = False,
+                  dedup: Deduplicator = None,
+                  validator: QueryValidator = None,
+                  drop_invalid: bool = False,
+                  trace_memory: bool = False,
+                  columnar: bool = False,
+                  output_shard_size: int = None,
+                  ) -> List[Dict[str, Any]]:
+    """
+    Runs the selected generators over workers processes and merges their shards
+    into output_path. Returns one status dictionary per generator, the profile
+    record of the generator (see utils.profiling) or its error.
+
+    - sample_max: default maximum number of samples per generator (M in the notebook)
+    - sample_limits: per generator overrides of sample_max
+    - seed: base seed, generator i samples with seed + i
+    - dedup: duplicate filter applied while merging, its per generator
+    statistics are added to the status dictionaries
+    - validator, drop_invalid: EXPLAIN validation of the merged samples,
+    the invalid ones are dropped or tagged with an Error key
+    - trace_memory: record the peak memory of each generator (slower)
+    - columnar: keep the parsed instances in columnar tables (see utils.instance_table),
+    less memory per worker for slower sampling
+    - output_shard_size: samples per file of a compact (.jsonl.gz, .jsonl, .parquet) output
+    """
+    names = select_generators(only, exclude)
+    if output_path.endswith(PARQUET):
+        require_pyarrow()
+    sample_limits = sample_limits or {}
+    workers = workers or os.cpu_count() or 1
+    shard_dir = shard_dir or output_path + ".shards"
+    os.makedirs(shard_dir, exist_ok=True)
+
+    tasks = [(i, name, sample_limits.get(name, sample_max),
+              None if seed is None else seed + i,
+              os.path.join(shard_dir, f"{i:03d}_{name}.json"))
+             for i, name in enumerate(names)]
+    # The workers read only the snapshot groups of the selected generators
+    labels, rtriples = required_instances(read_json(schema_path), names)
+    initargs = (schema_path, node_instances_path, rels_instances_path, allow_repeats, trace_memory, columnar,
+                labels, rtriples)
+
+    results = []
+    if workers == 1:
+        _init_worker(*initargs)
+        for task in tasks:
+            results.append(_run_generator(*task))
+            _report_progress(results[-1], len(results), len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            futures = [executor.submit(_run_generator, *task) for task in tasks]
+            for future in as_completed(futures):
+                results.append(future.result())
+                _report_progress(results[-1], len(results), len(tasks))
+
+    results.sort(key=lambda r: r["index"])
+    merged = [r for r in results if "shard" in r]
+    total = merge_shards([r["shard"] for r in merged], output_path,
+                         dedup=dedup, sources=[r["name"] for r in merged],
+                         validator=validator, drop_invalid=drop_invalid,
+                         output_shard_size=output_shard_size)
+    if dedup is not None:
+        add_duplicates(merged, dedup.stats())
+        print(dedup.report())
+    if validator is not None:
+        print(validator.report())
+    print(render_report(merged))
+    print(f"There are {total} samples in the fine-tuning dataset, saved to {output_path}.")
+
+    if not keep_shards:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    return results
+
+
+def _report_progress(result: Dict[str, Any],
+                     done: int,
+                     total: int,
+                     ) -> None:
+    if "error" in result:
+        print(f"[{done}/{total}] {result['name']} failed: {result['error']}", file=sys.stderr)
+    else:
+        print(f"[{done}/{total}] {result['name']}: {result['emitted']} of "
+              f"{result['candidates']} samples ({result['seconds']:.2f}s)")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.build_dataset",
+        description="Build the question-Cypher fine-tuning dataset from saved schema and instances.")
+    parser.add_argument("--schema", help="schema json file (structured_schema)")
+    parser.add_argument("--node-instances", help="node instances, .snap snapshot or json file")
+    parser.add_argument("--rels-instances", help="relationship instances, .snap snapshot or json file")
+    parser.add_argument("--output", help="output json file, or compact .jsonl.gz / .jsonl / .parquet file")
+    parser.add_argument("--output-shard-size", type=int, default=None, metavar="N",
+                        help="split a compact output into files of at most N samples")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run only these generators")
+    parser.add_argument("--exclude", nargs="+", metavar="NAME", help="skip these generators")
+    parser.add_argument("-M", "--max-samples", type=int, default=500,
+                        help="maximum number of samples per generator (default: 500)")
+    parser.add_argument("--max-samples-for", nargs="+", metavar="NAME=M", default=[],
+                        help="per generator maximum number of samples")
+    parser.add_argument("--no-repeats", action="store_true",
+                        help="exclude entries that only differ by the property value")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the sample selection")
+    parser.add_argument("--shard-dir", default=None, help="directory of the per generator shards")
+    parser.add_argument("--keep-shards", action="store_true", help="do not delete the shards after merging")
+    parser.add_argument("--list", action="store_true", help="list the generators and exit")
+    parser.add_argument("--columnar", action="store_true",
+                        help="keep the parsed instances in columnar tables, to save memory on large graphs")
+    parser.add_argument("--dedup", action="store_true",
+                        help="drop exact (Cypher) and near (Question) duplicates while merging")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9,
+                        help="question similarity above which a sample is a near-duplicate (default: 0.9)")
+    parser.add_argument("--dedup-mask-literals", action="store_true",
+                        help="compare the Cypher queries without their literal values")
+    parser.add_argument("--dedup-max-entries", type=int, default=1_000_000,
+                        help="number of samples remembered by the duplicate filter (default: 1000000)")
+    parser.add_argument("--validate", action="store_true",
+                        help="check the Cypher queries with EXPLAIN against the graph")
+    parser.add_argument("--neo4j-url", default=os.environ.get("NEO4J_URI"), help="graph url (default: $NEO4J_URI)")
+    parser.add_argument("--neo4j-user", default=os.environ.get("NEO4J_USERNAME", "neo4j"),
+                        help="graph user name (default: $NEO4J_USERNAME or neo4j)")
+    parser.add_argument("--neo4j-database", default=os.environ.get("NEO4J_DATABASE", "neo4j"),
+                        help="graph database (default: $NEO4J_DATABASE or neo4j)")
+    parser.add_argument("--drop-invalid", action="store_true",
+                        help="drop the samples that fail validation instead of tagging them")
+    parser.add_argument("--validation-cache", default=None,
+                        help="json file of the validation results per query structure, reused and updated")
+    parser.add_argument("--profile-report", default=None, metavar="FILE",
+                        help="save the per generator profile, csv if FILE ends with .csv, json otherwise")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="record the peak memory of each generator with tracemalloc (slower)")
+    parser.add_argument("--top", type=int, default=None, metavar="N",
+                        help="print the N most expensive generators (default: 10 when profiling)")
+    parser.add_argument("--top-by", default="seconds",
+                        choices=["seconds", "candidates", "emitted", "peak_mb", "render_seconds", "duplicates"],
+                        help="measure used to rank the generators (default: seconds)")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(GENERATORS))
+        return 0
+
+    missing = [opt for opt in ("schema", "node_instances", "rels_instances", "output")
+               if getattr(args, opt) is None]
+    if missing:
+        parser.error("the following arguments are required: " +
+                     ", ".join("--" + opt.replace("_", "-") for opt in missing))
+
+    try:
+        dedup = Deduplicator(threshold=args.dedup_threshold,
+                             max_entries=args.dedup_max_entries,
+                             mask_literals=args.dedup_mask_literals) if args.dedup else None
+        validator = _make_validator(args, parser) if args.validate else None
+        results = build_dataset(args.schema, args.node_instances, args.rels_instances, args.output,
+                                workers=args.workers,
+                                only=args.only,
+                                exclude=args.exclude,
+                                sample_max=args.max_samples,
+                                sample_limits=parse_sample_limits(args.max_samples_for),
+                                allow_repeats=not args.no_repeats,
+                                seed=args.seed,
+                                shard_dir=args.shard_dir,
+                                keep_shards=args.keep_shards,
+                                dedup=dedup,
+                                validator=validator,
+                                drop_invalid=args.drop_invalid,
+                                trace_memory=args.profile_memory,
+                                columnar=args.columnar,
+                                output_shard_size=args.output_shard_size)
+    except (ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    records = [r for r in results if "error" not in r]
+    if args.profile_report:
+        write_profile_report(records, args.profile_report)
+        print(f"Profile report saved to {args.profile_report}.")
+    if args.top or args.profile_report or args.profile_memory:
+        print(profile_summary(records, args.top or 10, args.top_by))
+
+    if validator is not None:
+        if args.validation_cache:
+            validator.save_cache(args.validation_cache)
+        validator.explainer.close()
+
+    return 1 if any("error" in r for r in results) else 0
+
+
+def _make_validator(args: argparse.Namespace,
+                    parser: argparse.ArgumentParser,
+                    ) -> QueryValidator:
+    """Connects to the graph and loads the validation cache."""
+    password = os.environ.get("NEO4J_PASSWORD")
+    if not args.neo4j_url or password is None:
+        parser.error("--validate needs --neo4j-url (or NEO4J_URI) and the NEO4J_PASSWORD variable")
+    cache = None
+    if args.validation_cache and os.path.exists(args.validation_cache):
+        cache = read_json(args.validation_cache)
+    graph = Neo4jGraph(args.neo4j_url, args.neo4j_user, password, args.neo4j_database,
+                       max_connection_pool_size=args.workers)
+    return QueryValidator(graph, max_workers=args.workers or 4, cache=cache)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""Compact output format of the fine-tuning dataset.
+
+Most samples share their Prompt (the system message) and one of a few hundred
+Schema strings. DatasetWriter streams the samples to json lines files
+(.jsonl, gzip compressed for .jsonl.gz) where each distinct value of these
+fields is written once, as a [field, id, value] table line placed before
+its first use, and the samples reference it by id:
+
+    {"format": "cypher-dataset", "version": 1, "tables": ["Prompt", "Schema"]}
+    ["Prompt", 0, "Convert the following question ..."]
+    ["Schema", 0, "Graph schema: Relevant node labels ..."]
+    {"Prompt": 0, "Question": "...", "Schema": 0, "Cypher": "..."}
+
+With .parquet files (needs pyarrow), the samples are written in row groups of
+row_group_size samples and the table fields are dictionary encoded string
+columns; the columns are fixed by the first row group (or by columns). With shard_size, the samples are split in shards of at most
+shard_size samples, <name>-00000.jsonl.gz, ..., each readable on its own.
+
+read_dataset / iter_dataset expand any of these files (and the plain json
+list written by write_json) back to the {Prompt, Question, Schema, Cypher}
+dictionaries, e.g. for Dataset.from_list(read_dataset(path)).
+
+Usage, from the repository root, to convert between the formats:
+
+    python -m utils.dataset_io datas/trainer.jsonl.gz datas/trainer.json
+"""
+
+from typing import Any, List, Dict, Iterable, Iterator, Tuple
+import argparse
+from itertools import islice
+import glob
+import gzip
+import json
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Import local modules
+from utils.utilities import *
+
+FORMAT = "cypher-dataset"
+VERSION = 1
+
+# Fields stored once per distinct value
+TABLE_FIELDS = ("Prompt", "Schema")
+
+# Extensions of the dataset files, compound ones first
+JSONL_GZ = ".jsonl.gz"
+JSONL = ".jsonl"
+PARQUET = ".parquet"
+JSON = ".json"
+EXTENSIONS = (JSONL_GZ, JSONL, PARQUET, JSON)
+COMPACT_EXTENSIONS = (JSONL_GZ, JSONL, PARQUET)
+
+# Lines parsed per json.loads call by the reader
+READ_BATCH = 10_000
+
+# Samples per row group of the .parquet files
+ROW_GROUP_SIZE = 50_000
+
+
+def split_extension(file_path: str) -> Tuple[str, str]:
+    """(stem, extension) of a dataset file, ValueError for an unknown extension."""
+    for ext in EXTENSIONS:
+        if file_path.endswith(ext):
+            return file_path[:-len(ext)], ext
+    raise ValueError(f"Unknown dataset file extension for {file_path}, expected one of {', '.join(EXTENSIONS)}.")
+
+
+def is_compact_dataset(file_path: str) -> bool:
+    """If the file is written in the compact format (.jsonl, .jsonl.gz or .parquet)."""
+    return file_path.endswith(COMPACT_EXTENSIONS)
+
+
+def require_pyarrow() -> None:
+    """Raises an ImportError when pyarrow, needed by the .parquet files, is missing."""
+    if pa is None:
+        raise ImportError("The .parquet dataset files need pyarrow (pip install pyarrow).")
+
+
+def _open_text(file_path: str, mode: str, compresslevel: int = 6) -> Any:
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, mode + "t", encoding="utf-8", compresslevel=compresslevel)
+    return open(file_path, mode, encoding="utf-8")
+
+
+#### Writer ####
+
+class DatasetWriter:
+    """Streams samples (Sample records or dictionaries) to compact dataset files."""
+
+    def __init__(self,
+                 file_path: str,
+                 shard_size: int = None,
+                 table_fields: Tuple[str, ...] = TABLE_FIELDS,
+                 compresslevel: int = 6,
+                 row_group_size: int = ROW_GROUP_SIZE,
+                 columns: Iterable[str] = None,
+                 ) -> None:
+        """
+        - file_path: .jsonl, .jsonl.gz or .parquet file
+        - shard_size: maximum number of samples per file, one file by default
+        - table_fields: fields whose distinct values are stored once
+        - compresslevel: gzip level of the .jsonl.gz files
+        - row_group_size: samples buffered per row group of the .parquet files
+        - columns: columns of the .parquet files, the fields of the first row group by default
+        """
+        stem, ext = split_extension(file_path)
+        if ext not in COMPACT_EXTENSIONS:
+            raise ValueError(f"DatasetWriter writes {', '.join(COMPACT_EXTENSIONS)} files, got {file_path}.")
+        if ext == PARQUET:
+            require_pyarrow()
+        if shard_size is not None and shard_size < 1:
+            raise ValueError("The shard size must be a positive integer.")
+        if row_group_size < 1:
+            raise ValueError("The row group size must be a positive integer.")
+        self.file_path = file_path
+        self.shard_size = shard_size
+        self.table_fields = tuple(table_fields)
+        self.compresslevel = compresslevel
+        self.row_group_size = row_group_size
+        self.columns: List[str] = None if columns is None else list(columns)
+        self.files: List[str] = []
+        self.count = 0
+        self.distinct = {field: 0 for field in self.table_fields}
+        self._stem, self._ext = stem, ext
+        self._fp = None
+        self._parquet = None
+        self._schema = None
+        self._rows: List[Dict] = []
+        self._tables: Dict[str, Dict[Any, int]] = {}
+        self._in_shard = 0
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _next_shard(self) -> None:
+        self._close_shard()
+        path = self.file_path if self.shard_size is None else f"{self._stem}-{len(self.files):05d}{self._ext}"
+        self.files.append(path)
+        self._tables = {field: {} for field in self.table_fields}
+        self._in_shard = 0
+        if self._ext != PARQUET:
+            self._fp = _open_text(path, "w", self.compresslevel)
+            self._fp.write(json.dumps({"format": FORMAT, "version": VERSION, "tables": list(self.table_fields)}))
+            self._fp.write("\n")
+
+    def _close_shard(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+        self._flush_row_group()
+        if self._parquet is not None:
+            self._parquet.close()
+            self._parquet = None
+
+    def _flush_row_group(self) -> None:
+        """Writes the buffered samples as one row group of the current .parquet shard."""
+        if not self._rows:
+            return
+        if self._schema is None:
+            if self.columns is None:
+                self.columns = list(dict.fromkeys(key for row in self._rows for key in row))
+            self._schema = _parquet_schema(self.columns, self.table_fields)
+        for field in self.table_fields:
+            table = self._tables[field]
+            for row in self._rows:
+                value = row.get(field)
+                if value is not None and value not in table:
+                    table[value] = len(table)
+                    self.distinct[field] += 1
+        if self._parquet is None:
+            self._parquet = pq.ParquetWriter(self.files[-1], self._schema, compression="zstd")
+        self._parquet.write_table(_parquet_table(self._rows, self._schema))
+        self._rows = []
+
+    def write(self, sample: Any) -> None:
+        """Appends one sample."""
+        if isinstance(sample, Sample):
+            sample = sample.to_dict()
+        if not self.files or (self.shard_size is not None and self._in_shard >= self.shard_size):
+            self._next_shard()
+        self._in_shard += 1
+        self.count += 1
+
+        if self._ext == PARQUET:
+            self._rows.append(sample)
+            if len(self._rows) >= self.row_group_size:
+                self._flush_row_group()
+            return
+
+        encoded = dict(sample)
+        for field in self.table_fields:
+            if field not in sample:
+                continue
+            table = self._tables[field]
+            value = sample[field]
+            idx = table.get(value)
+            if idx is None:
+                idx = table[value] = len(table)
+                self.distinct[field] += 1
+                self._fp.write(json.dumps([field, idx, value]))
+                self._fp.write("\n")
+            encoded[field] = idx
+        self._fp.write(json.dumps(encoded))
+        self._fp.write("\n")
+
+    def write_all(self, samples: Iterable[Any]) -> int:
+        """Appends the samples, returns the number of samples written so far."""
+        for sample in samples:
+            self.write(sample)
+        return self.count
+
+    def close(self) -> None:
+        """Writes the pending shard and closes the files."""
+        self._close_shard()
+
+    def report(self) -> str:
+        """One line summary of the written dataset."""
+        tables = ", ".join(f"{n} distinct {field}" for field, n in self.distinct.items())
+        return f"{self.count} samples in {len(self.files)} file(s), {tables}"
+
+
+def _parquet_schema(columns: List[str],
+                    table_fields: Tuple[str, ...],
+                    ) -> Any:
+    """String columns, dictionary encoded for the table fields."""
+    return pa.schema([(key, pa.dictionary(pa.int32(), pa.string()) if key in table_fields else pa.string())
+                      for key in columns])
+
+
+def _parquet_table(rows: List[Dict],
+                   schema: Any,
+                   ) -> Any:
+    """One row group of samples, missing fields as nulls."""
+    extra = {key for row in rows for key in row}.difference(schema.names)
+    if extra:
+        raise ValueError(f"Field(s) {', '.join(sorted(extra))} not in the parquet columns "
+                         f"{', '.join(schema.names)}, pass them in columns.")
+    arrays = []
+    for field in schema:
+        array = pa.array([row.get(field.name) for row in rows], type=pa.string())
+        arrays.append(array.dictionary_encode() if pa.types.is_dictionary(field.type) else array)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_dataset(samples: Iterable[Any],
+                  file_path: str,
+                  shard_size: int = None,
+                  columns: Iterable[str] = None,
+                  ) -> int:
+    """Writes the samples to a compact dataset file (or shards), or to a json list
+    for a .json file. Returns the number of samples.
+    columns fixes the columns of a .parquet file, see DatasetWriter."""
+    if not is_compact_dataset(file_path):
+        samples = list(samples)
+        write_json(samples, file_path)
+        return len(samples)
+    with DatasetWriter(file_path, shard_size, columns=columns) as writer:
+        return writer.write_all(samples)
+
+
+#### Expander ####
+
+def dataset_files(file_path: str) -> List[str]:
+    """The file itself if it exists, otherwise its shards <name>-00000<ext>, ... in order."""
+    if os.path.exists(file_path):
+        return [file_path]
+    stem, ext = split_extension(file_path)
+    files = sorted(glob.glob(f"{glob.escape(stem)}-[0-9][0-9][0-9][0-9][0-9]{ext}"))
+    if not files:
+        raise FileNotFoundError(f"No dataset file or shard for {file_path}.")
+    return files
+
+
+def _iter_jsonl(file_path: str) -> Iterator[Dict]:
+    with _open_text(file_path, "r") as fp:
+        header = json.loads(fp.readline())
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise ValueError(f"{file_path} is not a {FORMAT} file.")
+        if header.get("version", 0) > VERSION:
+            raise ValueError(f"{file_path} has format version {header['version']}, "
+                             f"this reader supports up to {VERSION}.")
+        tables = [(field, []) for field in header.get("tables", [])]
+        # Batches of lines are parsed as one json array, much faster than line by line
+        for lines in iter(lambda: list(islice(fp, READ_BATCH)), []):
+            for rec in json.loads("[" + ",".join(line for line in lines if line.strip()) + "]"):
+                if type(rec) is list:
+                    field, idx, value = rec
+                    values = dict(tables).get(field)
+                    if values is None or idx != len(values):
+                        raise ValueError(f"{file_path}: unexpected table entry {field} {idx}.")
+                    values.append(value)
+                    continue
+                for field, values in tables:
+                    idx = rec.get(field)
+                    if idx is not None:
+                        rec[field] = values[idx]
+                yield rec
+
+
+def _iter_parquet(file_path: str) -> Iterator[Dict]:
+    require_pyarrow()
+    for batch in pq.ParquetFile(file_path).iter_batches():
+        for row in batch.to_pylist():
+            # Columns missing from a sample are read back as nulls
+            yield {key: value for key, value in row.items() if value is not None}
+
+
+def iter_dataset(file_path: str) -> Iterator[Dict]:
+    """Lazily reads the samples of a dataset file, or of its shards, as dictionaries."""
+    for path in dataset_files(file_path):
+        ext = split_extension(path)[1]
+        if ext == PARQUET:
+            yield from _iter_parquet(path)
+        elif ext == JSON:
+            yield from read_json(path)
+        else:
+            yield from _iter_jsonl(path)
+
+
+def read_dataset(file_path: str) -> List[Dict]:
+    """Reads the samples of a dataset file, or of its shards, as a list of
+    dictionaries with keys Prompt, Question, Schema, Cypher."""
+    return list(iter_dataset(file_path))
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.dataset_io",
+        description="Convert a fine-tuning dataset between the json, compact json lines and parquet formats.")
+    parser.add_argument("input", help="dataset file (.json, .jsonl, .jsonl.gz, .parquet) or sharded name")
+    parser.add_argument("output", help="output file, its extension selects the format")
+    parser.add_argument("--shard-size", type=int, default=None, help="maximum number of samples per output file")
+    args = parser.parse_args(argv)
+
+    try:
+        total = write_dataset(iter_dataset(args.input), args.output, args.shard_size)
+    except (ValueError, ImportError, FileNotFoundError) as e:
+        parser.error(str(e))
+    print(f"{total} samples saved to {args.output}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
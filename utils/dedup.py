@@ -0,0 +1,302 @@
+"""Bounded-memory duplicate and near-duplicate filter for generated samples.
+
+A sample is dropped when its normalized Cypher was already emitted (exact
+duplicate), or when its Question is a near-duplicate of an emitted one
+(MinHash signatures over character shingles, candidates found with LSH
+banding, then confirmed on the estimated Jaccard similarity). Only the last
+max_entries kept samples are remembered, so memory stays bounded whatever
+the size of the stream."""
+
+from typing import Any, List, Dict, Iterable, Iterator, Tuple
+from collections import OrderedDict, deque
+from array import array
+import hashlib
+import random
+import re
+import zlib
+
+# Mersenne prime for the universal hash family of the MinHash permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_EMPTY = 1 << 32
+_OFFSET = 0x9E3779B1
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?(?![\w.])")
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION_SPACE = re.compile(r"\s*([(){}\[\],:<>=\-])\s*")
+
+
+#### Normalization ####
+
+def normalize_cypher(query: str,
+                     mask_literals: bool = False,
+                     ) -> str:
+    """
+    Canonical form of a Cypher query for exact matching: whitespace collapsed
+    and removed around punctuation, trailing semicolon dropped.
+    With mask_literals, string and number literals are replaced by ?, so that
+    queries that only differ by a value are equal.
+    """
+    # String literals are kept verbatim (or masked), only the code between them is rewritten
+    parts = []
+    pos = 0
+    for match in _STRING_LITERAL.finditer(query):
+        parts.append(_normalize_code(query[pos:match.start()], mask_literals))
+        parts.append("?" if mask_literals else match.group())
+        pos = match.end()
+    parts.append(_normalize_code(query[pos:], mask_literals))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def _normalize_code(code: str,
+                    mask_literals: bool,
+                    ) -> str:
+    if mask_literals:
+        code = _NUMBER_LITERAL.sub("?", code)
+    code = _WHITESPACE.sub(" ", code)
+    return _PUNCTUATION_SPACE.sub(r"\1", code)
+
+
+def normalize_question(text: str) -> str:
+    """Lower case, whitespace collapsed form of a question."""
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def shingles(text: str,
+             size: int,
+             ) -> List[int]:
+    """32-bit hashes of the distinct character shingles of the text."""
+    if len(text) <= size:
+        return [zlib.crc32(text.encode("utf-8"))]
+    return list({zlib.crc32(text[i:i + size].encode("utf-8")) for i in range(len(text) - size + 1)})
+
+
+#### MinHash ####
+
+class MinHasher:
+    """
+    One permutation MinHash: each shingle hash is permuted once and sent to
+    one of num_perm bins, a bin keeps its minimum. Empty bins borrow the
+    value of the next non empty bin (rotation densification). The signature
+    costs one pass over the shingles instead of num_perm passes.
+    """
+
+    def __init__(self,
+                 num_perm: int = 64,
+                 seed: int = 1,
+                 ) -> None:
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._a = rng.randrange(1, _PRIME)
+        self._b = rng.randrange(0, _PRIME)
+
+    def signature(self,
+                  hashes: Iterable[int],
+                  ) -> array:
+        """Signature of a non empty set of 32-bit hashes."""
+        k = self.num_perm
+        a, b = self._a, self._b
+        bins = [_EMPTY] * k
+        for x in hashes:
+            h = (a * x + b) % _PRIME
+            i = h % k
+            v = (h // k) & _MAX_HASH
+            if v < bins[i]:
+                bins[i] = v
+
+        # Fill the empty bins from the next non empty one, the offset keeps
+        # borrowed values distinct from the original ones
+        if _EMPTY in bins:
+            original = list(bins)
+            for i in range(k):
+                if original[i] == _EMPTY:
+                    step = 1
+                    while original[(i + step) % k] == _EMPTY:
+                        step += 1
+                    bins[i] = (original[(i + step) % k] + step * _OFFSET) & _MAX_HASH
+        return array("I", bins)
+
+    @staticmethod
+    def similarity(sig_1: array,
+                   sig_2: array,
+                   ) -> float:
+        """Estimated Jaccard similarity of the sets behind two signatures."""
+        return sum(1 for x, y in zip(sig_1, sig_2) if x == y) / len(sig_1)
+
+
+#### Filter ####
+
+class Deduplicator:
+    """
+    Streaming filter of exact and near-duplicate samples.
+
+    Samples are dictionaries with Question and Cypher keys. Pass them in
+    output order through check (or filter); the source name, usually the
+    generator name, is used for the per-source duplicate rates.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.9,
+                 num_perm: int = 64,
+                 bands: int = 16,
+                 shingle_size: int = 5,
+                 max_entries: int = 1_000_000,
+                 bucket_size: int = 8,
+                 exact: bool = True,
+                 near: bool = True,
+                 mask_literals: bool = False,
+                 seed: int = 1,
+                 ) -> None:
+        """
+        - threshold: estimated Jaccard similarity of the questions above which
+        a sample is a near-duplicate
+        - num_perm, bands: MinHash signature length and number of LSH bands,
+        bands must divide num_perm
+        - shingle_size: length of the character shingles of the questions
+        - max_entries: number of kept samples remembered, oldest forgotten first
+        - bucket_size: number of samples remembered per LSH band key, the latest ones
+        - exact, near: enable the exact Cypher / near-duplicate question checks
+        - mask_literals: ignore the literal values when comparing Cypher queries
+        """
+        if not 0 < threshold <= 1:
+            raise ValueError("The threshold must be in (0, 1].")
+        if num_perm % bands:
+            raise ValueError("The number of bands must divide num_perm.")
+        if max_entries < 1:
+            raise ValueError("max_entries must be a positive integer.")
+        if bucket_size < 1:
+            raise ValueError("bucket_size must be a positive integer.")
+
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.bucket_size = bucket_size
+        self.exact = exact
+        self.near = near
+        self.mask_literals = mask_literals
+        self.minhasher = MinHasher(num_perm, seed)
+
+        # Exact keys point to the id of the kept sample, LSH band keys to the ids
+        # of the last bucket_size kept samples, oldest first; signatures are
+        # kept for the candidates check
+        self._exact: Dict[bytes, int] = {}
+        self._bands: Dict[Tuple[int, bytes], List[int]] = {}
+        self._signatures: Dict[int, array] = {}
+        self._entries: deque = deque()
+        self._next_id = 0
+        self._stats: Dict[str, Dict[str, int]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return (f"Deduplicator(threshold={self.threshold}, bands={self.bands}, rows={self.rows}, "
+                f"entries={len(self._entries)}/{self.max_entries})")
+
+    def _exact_key(self, sample: Dict) -> bytes:
+        query = normalize_cypher(sample["Cypher"], self.mask_literals)
+        return hashlib.blake2b(query.encode("utf-8"), digest_size=8).digest()
+
+    def _band_keys(self, signature: array) -> List[Tuple[int, bytes]]:
+        rows = self.rows
+        return [(i, signature[i * rows:(i + 1) * rows].tobytes()) for i in range(self.bands)]
+
+    def _source_stats(self, source: str) -> Dict[str, int]:
+        stats = self._stats.get(source)
+        if stats is None:
+            stats = self._stats[source] = {"seen": 0, "exact": 0, "near": 0, "kept": 0}
+        return stats
+
+    def check(self,
+              sample: Dict,
+              source: str = "",
+              ) -> bool:
+        """Returns True if the sample is new (and remembers it), False if it is a duplicate."""
+        stats = self._source_stats(source)
+        stats["seen"] += 1
+
+        exact_key = self._exact_key(sample) if self.exact else None
+        if exact_key is not None and exact_key in self._exact:
+            stats["exact"] += 1
+            return False
+
+        signature = band_keys = None
+        if self.near:
+            signature = self.minhasher.signature(
+                shingles(normalize_question(sample["Question"]), self.shingle_size))
+            band_keys = self._band_keys(signature)
+            candidates = {entry_id for key in band_keys for entry_id in self._bands.get(key, ())}
+            for candidate in candidates:
+                if self.minhasher.similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    stats["near"] += 1
+                    return False
+
+        self._remember(exact_key, signature, band_keys)
+        stats["kept"] += 1
+        return True
+
+    def _remember(self,
+                  exact_key: bytes,
+                  signature: array,
+                  band_keys: List[Tuple[int, bytes]],
+                  ) -> None:
+        entry_id = self._next_id
+        self._next_id += 1
+        if exact_key is not None:
+            self._exact[exact_key] = entry_id
+        if signature is not None:
+            self._signatures[entry_id] = signature
+            for key in band_keys:
+                ids = self._bands.get(key)
+                if ids is None:
+                    self._bands[key] = [entry_id]
+                else:
+                    ids.append(entry_id)
+                    if len(ids) > self.bucket_size:
+                        del ids[0]
+        self._entries.append((entry_id, exact_key, band_keys))
+
+        while len(self._entries) > self.max_entries:
+            old_id, old_key, old_bands = self._entries.popleft()
+            if old_key is not None and self._exact.get(old_key) == old_id:
+                del self._exact[old_key]
+            if old_bands is not None:
+                self._signatures.pop(old_id, None)
+                # The oldest entry is first in the lists that still hold it
+                for key in old_bands:
+                    ids = self._bands.get(key)
+                    if ids and ids[0] == old_id:
+                        del ids[0]
+                        if not ids:
+                            del self._bands[key]
+
+    def filter(self,
+               samples: Iterable[Dict],
+               source: str = "",
+               ) -> Iterator[Dict]:
+        """Yields the samples that are not duplicates."""
+        for sample in samples:
+            if self.check(sample, source):
+                yield sample
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per source counts of seen, exact and near duplicates, kept samples and duplicate rate."""
+        return {source: dict(counts, rate=(counts["exact"] + counts["near"]) / counts["seen"]
+                             if counts["seen"] else 0.0)
+                for source, counts in self._stats.items()}
+
+    def report(self) -> str:
+        """Table of the per source duplicate rates, followed by the totals."""
+        stats = self.stats()
+        width = max([len(source) for source in stats] + [5])
+        lines = [f"{'source':<{width}} {'seen':>8} {'exact':>8} {'near':>8} {'kept':>8} {'rate':>7}"]
+        totals = {"seen": 0, "exact": 0, "near": 0, "kept": 0}
+        for source, counts in stats.items():
+            lines.append(f"{source:<{width}} {counts['seen']:>8} {counts['exact']:>8} "
+                         f"{counts['near']:>8} {counts['kept']:>8} {counts['rate']:>7.1%}")
+            for key in totals:
+                totals[key] += counts[key]
+        rate = (totals["exact"] + totals["near"]) / totals["seen"] if totals["seen"] else 0.0
+        lines.append(f"{'total':<{width}} {totals['seen']:>8} {totals['exact']:>8} "
+                     f"{totals['near']:>8} {totals['kept']:>8} {rate:>7.1%}")
+        return "\n".join(lines)
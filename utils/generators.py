@@ -0,0 +1,131 @@
+"""Question-Cypher sample generators, one per query template.
+
+The query types are those of SFT_Functional_Data_Builder.ipynb, declared in
+utils.templates. Each generator takes a GeneratorContext holding the schema
+and the parsed instances and returns an iterator over the samples of its
+template, so that collect_samples keeps only the selected ones in memory
+(run_template returns them as a list)."""
+
+from typing import Any, List, Dict, Callable, Iterable, Iterator, Tuple
+from functools import partial
+
+# Import local modules
+from utils.utilities import *
+from utils.graph_utils import *
+from utils.templates import *
+
+
+SYSTEM_MESSAGE = "Convert the following question into a Cypher query using the provided graph schema!"
+
+
+class GeneratorContext:
+    """Schema, parsed instances and options shared by the generators."""
+
+    def __init__(self,
+                 jschema: Dict,
+                 node_instances: List[Any],
+                 rels_instances: List[Any],
+                 allow_repeats: bool = True,
+                 system_message: str = SYSTEM_MESSAGE,
+                 columnar: bool = False,
+                 ) -> None:
+        """Parse the (serialized) instances into the datatype views used by the samplers.
+        With columnar, the views are stored as NodeTable / RelationshipTable
+        (see utils.instance_table), which take less memory on large extractions."""
+
+        self.jschema = jschema
+        self.schema_index = as_schema_index(jschema)
+        self.nodes = get_nodes_list(self.schema_index)
+        self.relationships = self.schema_index.relationships
+        self.allow_repeats = allow_repeats
+        self.system_message = system_message
+
+        self.dparsed, self.drels, self.drelsprops = build_datatype_views(self.schema_index,
+                                                                         node_instances,
+                                                                         rels_instances,
+                                                                         columnar=columnar)
+        self.subschema_renderer = SubschemaRenderer(self.schema_index)
+        self._prompters: Dict[str, Callable[..., Sample]] = {}
+
+    def prompter(self,
+                 template: QueryTemplate,
+                 ) -> Callable[..., Sample]:
+        """Prompter of a template, compiled once per context."""
+        prompter = self._prompters.get(template.name)
+        if prompter is None:
+            prompter = self._prompters[template.name] = compile_prompter(
+                template, self.subschema_renderer.render_canonical, self.system_message)
+        return prompter
+
+
+def iter_template(template: QueryTemplate,
+                  ctx: GeneratorContext,
+                  ) -> Iterator[Sample]:
+    """Yields the samples of a template, in the order of the notebook generators."""
+
+    prompter = ctx.prompter(template)
+    kind = template.sampler
+
+    if kind == LABEL:
+        return (prompter(label) for label in ctx.nodes)
+    if kind == LABEL_PAIR:
+        return iter_nodes_pairs(ctx.nodes, prompter, allow_repeats=ctx.allow_repeats)
+    if kind == NODE:
+        return iter_node_sampler(ctx.dparsed[template.sources[0]], prompter,
+                                 allow_repeats=ctx.allow_repeats)
+    if kind in (NODE_PAIR_SAME_LABEL, NODE_PAIR):
+        return iter_nodes_property_pairs_sampler(ctx.dparsed[template.sources[0]],
+                                                 ctx.dparsed[template.sources[1]],
+                                                 prompter,
+                                                 same_node=kind == NODE_PAIR_SAME_LABEL,
+                                                 allow_repeats=ctx.allow_repeats)
+    if kind == RELATIONSHIP:
+        return iter_relationships_samples(ctx.drels[template.sources[0]], prompter,
+                                          allow_repeats=ctx.allow_repeats)
+    if kind == RELATIONSHIP_WITH_PROPS:
+        return iter_relationships_props_samples(ctx.drelsprops[template.sources[0]], prompter,
+                                                allow_repeats=ctx.allow_repeats)
+    raise ValueError(f"Unknown sampler kind {kind!r} for template {template.name}.")
+
+
+def run_template(template: QueryTemplate,
+                 ctx: GeneratorContext,
+                 ) -> List[Sample]:
+    """Returns the list of samples of a template."""
+    return list(iter_template(template, ctx))
+
+
+def required_instances(jschema: Dict,
+                       names: Iterable[str] = None,
+                       ) -> Tuple[List[str], List[Dict]]:
+    """
+    The node labels and relationship triples whose instances are read by the
+    templates of the given generators (all of them by default):
+    - labels: labels with a property of a node datatype the templates read
+    - triples: {start, type, end} relationships whose start, end (and relationship)
+    properties have the datatypes of a relationship source
+    The other snapshot groups do not change the samples and need not be loaded.
+    """
+    index = as_schema_index(jschema)
+    templates = [TEMPLATES[name] for name in (TEMPLATES if names is None else names)]
+    nodes, pairs, triples = template_datatypes(templates, index.node_datatypes, index.rel_datatypes)
+
+    labels = [label for label in index.labels()
+              if nodes.intersection(index.node_properties_by_datatype(label))]
+    rels = []
+    for rel in index.relationships:
+        start = index.node_properties_by_datatype(rel['start'])
+        end = index.node_properties_by_datatype(rel['end'])
+        rtypes = index.rel_properties_by_datatype(rel['type'])
+        if (any(dt1 in start and dt2 in end for dt1, dt2 in pairs)
+                or any(dt1 in start and rt in rtypes and dt2 in end for dt1, rt, dt2 in triples)):
+            rels.append(rel)
+    return labels, rels
+
+
+#### Registry ####
+
+# Generators in the order of the notebook, keyed by template name
+GENERATORS: Dict[str, Callable[[GeneratorContext], Iterator[Sample]]] = {
+    name: partial(iter_template, template) for name, template in TEMPLATES.items()
+}
@@ -1,23 +1,54 @@
 """Functions to extract information from structured_schema"""
 
-from typing import Any, List, Dict, Union, Tuple
+from typing import Any, List, Dict, Union, Tuple, Callable
+from functools import lru_cache
+from time import perf_counter
+import json
 import re
 
-from neo4j import time
+from neo4j import time, spatial
 
 # Import local modules
 from utils.utilities import *
+from utils.schema_index import SchemaIndex
+from utils.instance_store import InstanceStore, node_groups, relationship_groups
+from utils.instance_table import NodeTable, RelationshipTable, TableChain
 
-def retrieve_datatypes(jschema: Dict,
+
+def as_schema_index(jschema: Union[Dict, SchemaIndex]
+                    ) -> SchemaIndex:
+    """Returns a SchemaIndex for the schema, building it if a raw dict is passed.
+    Functions that do many lookups call this once instead of rescanning jschema."""
+    if isinstance(jschema, SchemaIndex):
+        return jschema
+    return SchemaIndex(jschema)
+
+
+def as_instance_store(node_instances: Union[List[Any], InstanceStore] = (),
+                      rels_instances: List[Any] = (),
+                      ) -> InstanceStore:
+    """Returns an InstanceStore for the instances, indexing them if lists are passed."""
+    if isinstance(node_instances, InstanceStore):
+        return node_instances
+    return InstanceStore(node_instances, rels_instances)
+
+
+def retrieve_datatypes(jschema: Union[Dict, SchemaIndex],
                             comp: str) -> List[str]:
     
     """Retrieves the set of datatypes present in the graph.
     INPUTS:
-    - jschema - graph schema
+    - jschema - graph schema or its SchemaIndex
     - comp - values node, rel to extract datatypes for the specified graph component
     OUTPUT:
     - list of possible datatypes for the specified graph component"""
 
+    if isinstance(jschema, SchemaIndex):
+        if comp=="node":
+            return list(jschema.node_datatypes)
+        elif comp=="rel":
+            return list(jschema.rel_datatypes)
+
     if comp=="node":
         all_node_types = []
         all_nodes = get_nodes_list(jschema)
@@ -41,19 +72,28 @@ def retrieve_datatypes(jschema: Dict,
 
 #### NODES ####
 
-def get_nodes_list(jschema: Dict
+def get_nodes_list(jschema: Union[Dict, SchemaIndex]
                    ) -> List[str]:
     """Returns the list of node labels in the graph."""
+    if isinstance(jschema, SchemaIndex):
+        return jschema.labels()
     return list(jschema['node_props'].keys())
 
 
-def get_node_properties(jschema: Dict,
+def get_node_properties(jschema: Union[Dict, SchemaIndex],
                         label: str,
                         datatypes: bool=False,
                         datatype: str=""
                         ) -> Any:
     """Function to extract a list of properties for a given node.
     Options to return the datatypes or a properties of specific datatype only."""
+
+    if isinstance(jschema, SchemaIndex):
+        if datatypes and len(datatype) > 1:
+            return jschema.node_properties(label, datatype)
+        elif datatypes:
+            return jschema.node_props[label]
+        return jschema.node_properties(label)
    
     node_info = jschema['node_props'][label]
     if datatypes:
@@ -66,11 +106,12 @@ def get_node_properties(jschema: Dict,
     return props
 
 
-def get_nodes_properties_of_datatype(jschema: Dict,
+def get_nodes_properties_of_datatype(jschema: Union[Dict, SchemaIndex],
                                      nodes: List[str], 
                                      datatype: str=""
                                      ) -> List[Dict]:
     """Function to extract the properties of given datatype, for a list of nodes."""
+    jschema = as_schema_index(jschema)
     outputs = []
     for node in nodes:
         output = get_node_properties(jschema, node, datatypes=True, datatype=datatype)
@@ -82,24 +123,25 @@ def get_nodes_properties_of_datatype(jschema: Dict,
 
 #### RELATIONSHIPS ####
 
-def extract_relationships_list(jschema: Dict,
+def extract_relationships_list(jschema: Union[Dict, SchemaIndex],
                                formatted: bool=False
                                )-> Any:
     """Extracts the list of relationships in one of the following formats:
     formatted=True - each relationship is a string: (:start)-[:type]->(:end)
     formatted=False - each relationship is a dictionary with keys: start, type, end.
     """
+    relationships = jschema.relationships if isinstance(jschema, SchemaIndex) else jschema['relationships']
     if formatted:
         rels_list=[]
-        for el in jschema['relationships']:
+        for el in relationships:
             formatted_rels = f"(:{el['start']})-[:{el['type']}]->(:{el['end']})" 
             rels_list.append(formatted_rels)
     else:
-        rels_list = jschema['relationships']
+        rels_list = relationships
     return rels_list  
 
 
-def get_relationships_with_datatype(jschema: Dict,
+def get_relationships_with_datatype(jschema: Union[Dict, SchemaIndex],
                                     datatype: str,
                                     )->List[str]:
         """Returns a list of relationship types that have attributes with specified datatype."""
@@ -107,10 +149,14 @@ def get_relationships_with_datatype(jschema: Dict,
         rels_string = [list(e.keys())[0] for e in sampler]
         return rels_string
         
-def get_relationships_properties_of_datatype(jschema: Dict,
+def get_relationships_properties_of_datatype(jschema: Union[Dict, SchemaIndex],
                                              datatype: str
                                              ) -> List[Any]:
     """Extracts relationships properties of specified datatype."""
+    if isinstance(jschema, SchemaIndex):
+        return [{rel: jschema.rel_properties(rel, datatype)} for rel in jschema.rel_types()
+                if jschema.rel_properties(rel, datatype)]
+
     outputs = []
     for rel in list(jschema['rel_props'].keys()):
         props = jschema['rel_props'][rel]
@@ -121,69 +167,164 @@ def get_relationships_properties_of_datatype(jschema: Dict,
 
 #### SERIALIZE TEMPORAL DATA FOR SAVING ####
 
-def neo4j_date_to_string(v: str
+def neo4j_date_to_string(v: time.Date
                          )-> str:
     """Convert neo4j.time.Date to ISO formatted string."""
     """Sample neo4j.time.Date(2023, 10, 25)'"""
     return f"{v.year}-{v.month:02d}-{v.day:02d}"
 
 
-def neo4j_datetime_to_string(v: str
+def neo4j_datetime_to_string(v: time.DateTime
                              )-> str:
-    """Convert neo4j.time.DateTime to ISO formatted string."""
+    """Convert neo4j.time.DateTime to ISO formatted string, 
+    the time zone is omitted for a LocalDateTime (no tzinfo)."""
     """Sample neo4j.time.DateTime(2023, 11, 10, 12, 23, 32, 0, tzinfo=<UTC>)"""
-    return f"{v.year}-{v.month:02d}-{v.day:02d} T {v.hour:02d}:{v.minute:02d}:{v.second:02d} {v.tzinfo}"
+    s = f"{v.year}-{v.month:02d}-{v.day:02d} T {v.hour:02d}:{v.minute:02d}:{v.second:02d}"
+    return s if v.tzinfo is None else f"{s} {v.tzinfo}"
+
+
+def neo4j_time_to_string(v: time.Time
+                         )-> str:
+    """Convert neo4j.time.Time (or LocalTime) to ISO formatted string."""
+    """Sample neo4j.time.Time(10, 2, 3, tzinfo=<UTC>)"""
+    s = f"{v.hour:02d}:{v.minute:02d}:{v.second:02d}"
+    return s if v.tzinfo is None else f"{s} {v.tzinfo}"
+
+
+def neo4j_point_to_string(v: spatial.Point
+                          )-> str:
+    """Convert neo4j.spatial.Point to the Cypher point literal."""
+    """Sample neo4j.spatial.WGS84Point((13.4, 52.5)) -> point({srid: 4326, x: 13.4, y: 52.5})"""
+    coords = ", ".join(f"{axis}: {c}" for axis, c in zip("xyz", v))
+    return f"point({{srid: {v.srid}, {coords}}})"
+
+
+# Values json writes as they are, checked by exact type
+_PLAIN_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def serialize_value(v: Any
+                    )-> Any:
+    """Converts the neo4j temporal (Date, DateTime, Time, Duration) and spatial (Point)
+    values to strings, in a value, a list or a dictionary. Returns the object itself
+    when it holds no such value, and a converted copy otherwise: the input is never modified."""
+    t = type(v)
+    if t in _PLAIN_TYPES:
+        return v
+    if t is dict:
+        out = None
+        for key, value in v.items():
+            converted = serialize_value(value)
+            if converted is not value:
+                if out is None:
+                    out = dict(v)
+                out[key] = converted
+        return v if out is None else out
+    if t is list or t is tuple:
+        converted = [serialize_value(value) for value in v]
+        if all(a is b for a, b in zip(converted, v)):
+            return v
+        return converted
+    if t is time.Date:
+        return neo4j_date_to_string(v)
+    if t is time.DateTime:
+        return neo4j_datetime_to_string(v)
+    if t is time.Time:
+        return neo4j_time_to_string(v)
+    if t is time.Duration:
+        return v.iso_format()
+    if isinstance(v, spatial.Point):
+        return neo4j_point_to_string(v)
+    return v
+
+
+class Neo4jJSONEncoder(json.JSONEncoder):
+    """json encoder for extracted records holding neo4j temporal and spatial values,
+    converted with serialize_value as they are written (pass cls=Neo4jJSONEncoder
+    to write_json or write_jsonl)."""
+
+    def iterencode(self, o, _one_shot=False):
+        # Points and Durations are tuples, json would write them as lists
+        # before calling default, so they are converted up front
+        return super().iterencode(serialize_value(o), _one_shot)
 
 
 def transform_temporals_in_dict(d: Dict
                                 )-> Dict:
-    """Transform neo4j.time objects in a dictionary to ISO formatted strings."""
-    for key, value in d.items():
-        if isinstance(value, time.Date):
-            d[key] = neo4j_date_to_string(value)
-        elif isinstance(value, time.DateTime):
-            d[key] = neo4j_datetime_to_string(value)
-    return d
+    """Returns the dictionary with its neo4j.time and neo4j.spatial values as strings,
+    the dictionary itself if it has none."""
+    return serialize_value(d)
+
+
+def serialize_node_record(rec: Dict
+                          )-> Dict:
+    """Parse the neo4j temporal and spatial entries of one extracted node instance, 
+    returns a new record if any (the input is left unchanged)."""
+    return serialize_value(rec)
 
 
-def serialize_nodes_data(entries: List[Dict], 
+def serialize_relationship_record(rec: Dict
+                                  )-> Dict:
+    """Parse the neo4j temporal and spatial entries of one extracted relationship instance,
+    returns a new record if any (the input is left unchanged)."""
+    return serialize_value(rec)
+
+
+def serialize_nodes_data(entries: Union[List[Dict], InstanceStore],
                         )->List[Dict]:
-    """Function to parse the Neo4j.time entries from extracted instances
-    for a list of nodes."""
+    """Function to parse the neo4j temporal and spatial entries from extracted instances
+    for a list of nodes. Returns new lists, the records without such entries are shared."""
     
-    for sublist in entries:
-        for rec in sublist:
-            rec['Instance']['properties'] = transform_temporals_in_dict( rec['Instance']['properties'])
-    return entries
+    return [[serialize_node_record(rec) for rec in sublist] for sublist in node_groups(entries)]
 
 
-def serialize_relationships_data(entries: List[Dict], 
+def serialize_relationships_data(entries: Union[List[Dict], InstanceStore],
                                  )->List[Dict]:
-    """Function to parse the Neo4j.time entries from extracted instances
-    for a list of relationships."""
+    """Function to parse the neo4j temporal and spatial entries from extracted instances
+    for a list of relationships. Returns new lists, the records without such entries are shared."""
+
+    return [[serialize_relationship_record(rec) for rec in sublist] for sublist in relationship_groups(entries)]
+
 
-    for sublist in entries:
-        for rec in sublist:
-            t = list(rec.keys())
-            rec[t[0]] = transform_temporals_in_dict(rec[t[0]])
-            rec[t[1]] = transform_temporals_in_dict(rec[t[1]])
-            rec[t[2]] = transform_temporals_in_dict(rec[t[2]])
-    return entries
+def node_record_key(rec: Dict
+                    )-> str:
+    """Grouping key of a node instance record: its label."""
+    return rec['Instance']['Label']
+
+
+def relationship_record_key(rec: Dict
+                            )-> Tuple[str, ...]:
+    """Grouping key of a relationship instance record: its start, type, end keys."""
+    return tuple(rec.keys())
+
+
+def read_node_instances_jsonl(file_path: str
+                              )-> List[List[Dict]]:
+    """Reads a node instances snapshot written by Neo4jSchema.write_node_instances_jsonl,
+    in the format returned by extract_node_instances."""
+    return read_jsonl_groups(file_path, key=node_record_key)
+
+
+def read_relationships_instances_jsonl(file_path: str
+                                       )-> List[List[Dict]]:
+    """Reads a relationship instances snapshot written by Neo4jSchema.write_relationships_instances_jsonl,
+    in the format returned by extract_multiple_relationships_instances."""
+    return read_jsonl_groups(file_path, key=relationship_record_key)
 
 
 #### PARSED INSTANCES ###
 
-def parse_node_instances_datatype(jschema: List[Dict],
-                                  nodes_instances: List[Dict],
+def parse_node_instances_datatype(jschema: Union[Dict, SchemaIndex],
+                                  nodes_instances: Union[List[Dict], InstanceStore],
                                   nodes: List[str], 
                                   datatype: str,
                                   flatten: bool
                                   )->List[Any]:
     """Parse instances of nodes and properties with specified data type.
-    Format [[label, property, value], ...]"""
+    Format [NodeEntry(label, property, value), ...], grouped per instance unless flatten
+    Labels without instances are skipped."""
 
-    # Parse date and date_time in extracted instances
-    sampler = serialize_nodes_data(nodes_instances)
+    store = as_instance_store(nodes_instances)
 
     # Get the nodes and the properties of specifid datatype
     np_datatype = get_nodes_properties_of_datatype(jschema,nodes, datatype) 
@@ -194,12 +335,10 @@ def parse_node_instances_datatype(jschema: List[Dict],
         label = list(el.keys())[0]
         props_label = el[label] 
 
-        result_label = []
-        sampler_label = [e for e in sampler if e[0]['Instance']['Label']==label]
-
-        for instance in sampler_label[0]:
+        for instance in store.nodes(label):
             parsed_dict = extract_subdict(instance['Instance']['properties'], props_label) 
-            parsed_instance = [[label, key, value] for key, value in parsed_dict.items() if key and value]
+            parsed_instance = [NodeEntry(intern(label), intern(key), serialize_value(value))
+                               for key, value in parsed_dict.items() if key and value]
             if parsed_instance:
                 full_result.append(parsed_instance)
     
@@ -211,91 +350,94 @@ def parse_node_instances_datatype(jschema: List[Dict],
         return full_result
     
 
-def filter_relationships_instances(jschema: Dict,
-                                   rels_instances: List[Dict],
+def filter_relationships_instances(jschema: Union[Dict, SchemaIndex],
+                                   rels_instances: Union[List[Dict], InstanceStore],
                                    datatype_start: str,
                                    datatype_end: str
-                                   )-> List[Dict]:
+                                   )-> List[RelationshipEntry]:
     """Parses a list of relationships. It extracts those properties for both source and target nodes that are of specified data types.
+    Format [RelationshipEntry(start, {property: value}, type, end, {property: value}), ...]
     """
 
+    jschema = as_schema_index(jschema)
     result = []
 
-    for coll in rels_instances:
+    for coll in relationship_groups(rels_instances):
         for instance in coll:
             triple = list(instance.keys())
             
-            label_start = triple[0][:-6]
+            label_start = intern(triple[0][:-6])
             selected_props_start = get_node_properties(jschema, label_start, True, datatype_start)
-            selected_start = extract_subdict(instance[triple[0]], selected_props_start)
+            selected_start = serialize_value(extract_subdict(instance[triple[0]], selected_props_start))
             
-            label_end = triple[2][:-4]
+            label_end = intern(triple[2][:-4])
             selected_props_end =  get_node_properties(jschema, label_end, True, datatype_end)
-            selected_end = extract_subdict(instance[triple[2]], selected_props_end)
+            selected_end = serialize_value(extract_subdict(instance[triple[2]], selected_props_end))
             
-            rel = triple[1]
+            rel = intern(triple[1])
 
             if selected_start and selected_end:
-                result.append([label_start, selected_start, rel, label_end, selected_end])
+                result.append(RelationshipEntry(label_start, selected_start, rel, label_end, selected_end))
     return result
     
 
-def filter_relationships_with_props_instances(jschema: Dict,
-                                   instances: List[Dict],
+def filter_relationships_with_props_instances(jschema: Union[Dict, SchemaIndex],
+                                   instances: Union[List[Dict], InstanceStore],
                                    datatype_start: str,
                                    datatype_rel: str,
                                    datatype_end: str
-                                   )-> List[Dict]:
+                                   )-> List[RelationshipPropsEntry]:
     """Parses a list of relationships. 
     It extracts those properties for source, relationship and target that are of specified data types.
+    Format [RelationshipPropsEntry(start, {property: value}, type, {property: value}, end, {property: value}), ...]
     """
     
+    jschema = as_schema_index(jschema)
     result = []
 
-    for coll in instances:
+    for coll in relationship_groups(instances):
         for instance in coll:
             triple = list(instance.keys())
             
             # Remove the _start from the label 
-            label_start = triple[0][:-6]
+            label_start = intern(triple[0][:-6])
             # Retrieve node properties with specified datatype
             selected_props_start = get_node_properties(jschema, label_start, True, datatype_start)
             # Extract the corresponding subdictionary
-            selected_start = extract_subdict(instance[triple[0]], selected_props_start)
+            selected_start = serialize_value(extract_subdict(instance[triple[0]], selected_props_start))
 
             # Retrieve the relationship type
-            rel = triple[1]
-            # Extract all properties of given type for all relationships
-            selected_props_rel = get_relationships_properties_of_datatype(jschema, datatype_rel)
-            extracted = [d[rel] for d in selected_props_rel if rel in d]
-            if len(extracted) > 0:
-                selected_rel = extract_subdict(instance[triple[1]], extracted[0])
+            rel = intern(triple[1])
+            # Look up the relationship properties of given type
+            selected_props_rel = jschema.rel_properties(rel, datatype_rel)
+            if len(selected_props_rel) > 0:
+                selected_rel = serialize_value(extract_subdict(instance[triple[1]], selected_props_rel))
             else:
                 continue
         
             # Remove _end from label
-            label_end = triple[2][:-4]
+            label_end = intern(triple[2][:-4])
             # Retrieve node properties with specifid datatype
             selected_props_end =  get_node_properties(jschema, label_end, True, datatype_end)
             # Extract the correspnding subdictionary
-            selected_end = extract_subdict(instance[triple[2]], selected_props_end)
+            selected_end = serialize_value(extract_subdict(instance[triple[2]], selected_props_end))
 
             if selected_start and selected_end and selected_rel:
-                result.append([
+                result.append(RelationshipPropsEntry(
                     label_start, selected_start, 
                     rel, selected_rel, 
                     label_end, selected_end
-                    ])
+                    ))
     return result
 
     
-def retrieve_instances_with_relationships_props(relationship_instances: List[Any]
+def retrieve_instances_with_relationships_props(relationship_instances: Union[List[Any], InstanceStore]
                                                 ) -> List[Any]:
     """Returns the instances where the relationship has attributes."""
 
     instances_with_rel_props = []
 
-    for rel in relationship_instances:
+    for rel in relationship_groups(relationship_instances):
         filtered_instances = filter_dicts_list(rel)
         instances_with_rel_props.append(filtered_instances)
 
@@ -304,28 +446,228 @@ def retrieve_instances_with_relationships_props(relationship_instances: List[Any
 
     return instances_with_rel_props
 
+#### DATATYPE VIEWS OF PARSED INSTANCES ####
+
+def _interned(grouped: Dict[str, List[str]]
+              ) -> Dict[str, List[str]]:
+    """{datatype: properties} with interned property names."""
+    return {dtype: [intern(key) for key in keys] for dtype, keys in grouped.items()}
+
+
+def _groups_of(cache: Dict[str, Dict],
+               name: str,
+               lookup: Callable[[str], Dict[str, List[str]]],
+               ) -> Dict[str, List[str]]:
+    """Interned properties by datatype of a label or type, looked up once."""
+    grouped = cache.get(name)
+    if grouped is None:
+        grouped = cache[name] = _interned(lookup(name))
+    return grouped
+
+
+def _datatype_subdicts(props: Dict,
+                       grouped: Dict[str, List[str]],
+                       ) -> Dict[str, Dict]:
+    """{datatype: subdictionary of props restricted to the properties of that datatype},
+    non empty subdictionaries only. The keys of grouped are expected to be interned."""
+    subdicts = {}
+    for dtype, keys in grouped.items():
+        sub = {key: serialize_value(props[key]) for key in keys if key in props}
+        if sub:
+            subdicts[dtype] = sub
+    return subdicts
+
+
+def bucket_node_instances(jschema: Union[Dict, SchemaIndex],
+                          node_instances: Union[List[Any], InstanceStore],
+                          make_bucket: Callable[[str], Any] = None,
+                          ) -> Dict[str, List[List]]:
+    """
+    Walks the node instances once and buckets the NodeEntry(label, property, value) entries
+    by the datatype of the property. Each bucket is equal to
+    parse_node_instances_datatype(jschema, node_instances, nodes, datatype, True).
+    The temporal and spatial values are converted with serialize_value, the instances are not modified.
+    make_bucket(datatype) creates the bucket of a datatype, any sequence with an
+    append method (e.g. a NodeTable), a list by default.
+
+    Output:
+    - {datatype: [NodeEntry(label, property, value), ...]} for the node datatypes of the schema
+    """
+
+    jschema = as_schema_index(jschema)
+    store = as_instance_store(node_instances)
+    make_bucket = make_bucket or (lambda dtype: [])
+
+    buckets = {dtype: make_bucket(dtype) for dtype in jschema.node_datatypes}
+    for label in jschema.labels():
+        grouped = _interned(jschema.node_properties_by_datatype(label))
+        entry_label = intern(label)
+        for rec in store.nodes(label):
+            props = rec['Instance']['properties']
+            for dtype, keys in grouped.items():
+                bucket = buckets[dtype]
+                for key in keys:
+                    value = props.get(key)
+                    if key and value:
+                        bucket.append(NodeEntry(entry_label, key, serialize_value(value)))
+    return buckets
+
+
+def bucket_relationships_instances(jschema: Union[Dict, SchemaIndex],
+                                   rels_instances: Union[List[Any], InstanceStore],
+                                   make_pairs_bucket: Callable[[], Any] = list,
+                                   make_triples_bucket: Callable[[], Any] = list,
+                                   ) -> Tuple[Dict[Tuple[str, str], List], Dict[Tuple[str, str, str], List]]:
+    """
+    Walks the relationship instances once and buckets them by the datatypes
+    of the selected start, end (and relationship) properties.
+
+    Output:
+    - pairs: {(dt_start, dt_end): [RelationshipEntry(start, {prop: val}, type, end, {prop: val}), ...]},
+    each bucket equal to filter_relationships_instances(jschema, rels_instances, dt_start, dt_end)
+    - triples: {(dt_start, dt_rel, dt_end): [RelationshipPropsEntry(start, {prop: val}, type, {prop: val},
+    end, {prop: val}), ...]},
+    each bucket equal to filter_relationships_with_props_instances over the instances
+    returned by retrieve_instances_with_relationships_props
+    Only the non empty buckets are present. The property subdictionaries are shared
+    between the buckets of an instance, not copied.
+    make_pairs_bucket and make_triples_bucket create the buckets, lists by default
+    (e.g. RelationshipTable to fill columnar tables directly).
+    """
+
+    jschema = as_schema_index(jschema)
+    pairs = defaultdict(make_pairs_bucket)
+    triples = defaultdict(make_triples_bucket)
+    label_groups = {label: _interned(jschema.node_properties_by_datatype(label)) for label in jschema.labels()}
+    rel_groups = {}
+
+    for group in relationship_groups(rels_instances):
+        for rec in group:
+            key_start, rel, key_end = rec.keys()
+            label_start = intern(key_start[:-6])
+            label_end = intern(key_end[:-4])
+            rel = intern(rel)
+            start = _datatype_subdicts(rec[key_start], _groups_of(label_groups, label_start,
+                                                                  jschema.node_properties_by_datatype))
+            if not start:
+                continue
+            end = _datatype_subdicts(rec[key_end], _groups_of(label_groups, label_end,
+                                                              jschema.node_properties_by_datatype))
+            if not end:
+                continue
+
+            for dt1, selected_start in start.items():
+                for dt2, selected_end in end.items():
+                    pairs[(dt1, dt2)].append(RelationshipEntry(label_start, selected_start, rel, label_end, selected_end))
+
+            # Only the instances where all of start, relationship, end have properties
+            if not (rec[key_start] and rec[rel] and rec[key_end]):
+                continue
+            rel_subdicts = _datatype_subdicts(rec[rel], _groups_of(rel_groups, rel,
+                                                                   jschema.rel_properties_by_datatype))
+            for dt1, selected_start in start.items():
+                for rt, selected_rel in rel_subdicts.items():
+                    for dt2, selected_end in end.items():
+                        triples[(dt1, rt, dt2)].append(RelationshipPropsEntry(label_start, selected_start,
+                                                                              rel, selected_rel,
+                                                                              label_end, selected_end))
+    return pairs, triples
+
+
+def build_datatype_views(jschema: Union[Dict, SchemaIndex],
+                         node_instances: Union[List[Any], InstanceStore],
+                         rels_instances: Union[List[Any], InstanceStore],
+                         columnar: bool = False,
+                         ) -> Tuple[Dict[str, List], Dict[str, List], Dict[str, List]]:
+    """
+    Builds the dictionaries of parsed instances used by the samplers:
+    - dparsed: {datatype}_parsed -> [NodeEntry(label, property, value), ...], plus dtypes_parsed with all of them
+    - drels: {dt_start}_{dt_end}_rels -> relationship instances, plus all_rels, non empty only
+    - drelsprops: {dt_start}_{dt_rel}_{dt_end}_rels -> relationship with properties instances,
+    plus all_rels, non empty only
+    The neo4j temporal and spatial values are converted with serialize_value, so extracted
+    and serialized instances give the same views; the instances are not modified.
+    Node and relationship instances are each walked once (see bucket_node_instances,
+    bucket_relationships_instances); the "all" views reference the same entries.
+    With columnar, the entries go straight into NodeTable / RelationshipTable buckets
+    (see utils.instance_table), without building the lists, and the "all" views
+    are TableChains of them.
+    """
+
+    jschema = as_schema_index(jschema)
+    node_dtypes = jschema.node_datatypes
+    rel_dtypes = jschema.rel_datatypes
+    dtypes_pairs = list(product(node_dtypes, repeat=2))
+
+    if columnar:
+        concat = TableChain
+        make_bucket = lambda dtype: NodeTable(datatype=dtype)
+        make_pairs_bucket = lambda: RelationshipTable(with_rel_props=False)
+        make_triples_bucket = lambda: RelationshipTable(with_rel_props=True)
+    else:
+        concat = flatten_list
+        make_bucket, make_pairs_bucket, make_triples_bucket = None, list, list
+
+    node_buckets = bucket_node_instances(jschema, node_instances, make_bucket)
+    dparsed = {f"{datatype.lower()}_parsed": node_buckets[datatype] for datatype in node_dtypes}
+    dparsed['dtypes_parsed'] = concat(list(dparsed.values()))
+
+    pairs, triples = bucket_relationships_instances(jschema, rels_instances,
+                                                    make_pairs_bucket, make_triples_bucket)
+    drels = {f"{dt1.lower()}_{dt2.lower()}_rels": pairs.get((dt1, dt2), make_pairs_bucket())
+             for dt1, dt2 in dtypes_pairs}
+    drels['all_rels'] = concat(list(drels.values()))
+    drels = {key: value for key, value in drels.items() if value}
+
+    drelsprops = {}
+    for dt1, dt2 in dtypes_pairs:
+        for rt in rel_dtypes:
+            filtered = triples.get((dt1, rt, dt2))
+            if filtered:
+                drelsprops[f"{dt1.lower()}_{rt.lower()}_{dt2.lower()}_rels"] = filtered
+    drelsprops['all_rels'] = concat(list(drelsprops.values()))
+
+    return dparsed, drels, drelsprops
+
+
 #### EXTRACT LOCAL GRAPH INFO ####
 
-def build_minimal_subschema(jschema: Dict,
+# Subschema sections, compiled once into bound format methods
+SUBSCHEMA_NODES_TEMPLATE = "Relevant node labels and their properties {types} are:\n{nodes}\n"
+SUBSCHEMA_RELATIONSHIPS_TEMPLATE = "\nRelevant relationships are:\n{relations}\n"
+SUBSCHEMA_REL_PROPS_TEMPLATE = "\n\nRelevant relationship properties {types} are:\n{rel_props}\n"
+
+_format_nodes_section = SUBSCHEMA_NODES_TEMPLATE.format
+_format_relationships_section = SUBSCHEMA_RELATIONSHIPS_TEMPLATE.format
+_format_rel_props_section = SUBSCHEMA_REL_PROPS_TEMPLATE.format
+_format_relation = "{{'start': {start}, 'type': {type}, 'end': {end} }}".format
+
+
+def build_minimal_subschema(jschema: Union[Dict, SchemaIndex],
                     nodes_info: List[Tuple[str, Dict[str, str]]],
                     relationships_info: List[Tuple[str, str, str, Dict[str, str]]],
                     include_node_props: bool=True,
                     include_rel_props: bool=False,
                     include_types: bool = False,
+                    include_relationships: bool = True,
                     ) -> str:
     """
     Constructs a subschema description from given nodes and relationships, with an option to include data types for properties.
 
     Args:
+    - jschema: The graph schema or its SchemaIndex.
     - nodes: A list of tuples, where each tuple represents a node label and a dictionary of the node's properties with their data types.
     - relationships: A list of tuples, each representing a relationship. The tuple contains the start node label, relationship type, end node label, and a dictionary of the relationship's properties with their data types.
     - include_types: A boolean indicating whether to include data types in the property descriptions.
+    - include_relationships: If False, only the node section is returned (replaces slicing off the empty relationship section).
 
     Returns:
     - A string describing the node labels, their properties (optionally with data types), and relationships with their properties (optionally with data types), formatted for easy reading and suitable for various uses including fine-tuning a language model for Cypher query generation.
     """
 
-    def extract_specific_props(comp_props, comp_info):
+    jschema = as_schema_index(jschema)
+
+    def extract_specific_props(prop_datatype, comp_info):
         result = []
 
         # Iterate through comp_info to handle specified labels and properties
@@ -337,33 +679,16 @@ def build_minimal_subschema(jschema: Dict,
             if prop is None:
                 result.append([label, {}])
             else:
-                # Find and add the specified property if it exists
-                found_prop = False
-                for prop_details in comp_props.get(label, []):
-                    if prop_details['property'] == prop:
-                        result.append([label, {prop: prop_details['datatype']}])
-                        found_prop = True
-                        break  # Found the property, no need to keep searching
-                if not found_prop:
+                # Add the specified property if it exists
+                dtype = prop_datatype(label, prop)
+                if dtype is not None:
+                    result.append([label, {prop: dtype}])
+                else:
                     # If the property is specified but not found, include the label without properties
                     result.append([label, {}])
 
         return result
 
-    local_nodes = extract_specific_props(jschema["node_props"], nodes_info)
-    local_relationships = extract_specific_props(jschema["rel_props"], relationships_info)
-
-    rels_list = [item[0] for item in local_relationships]
-    def extract_specific_relations(rel_list, rels):
-        specific_rels=[]
-        for rel in rels:
-            specific_rel = [r for r in jschema["relationships"] if r["type"]==rel][0]
-            specific_rels.append(specific_rel)
-
-        return specific_rels
-
-    relevant_relations = extract_specific_relations(jschema["relationships"], rels_list)
-
     # Helper function to format node properties
     def format_props(props: Dict[str, str],
                      ) -> str:
@@ -372,38 +697,117 @@ def build_minimal_subschema(jschema: Dict,
         else:
             return ", ".join(f"{k}" for k in props.keys())
 
-
-    # Building relationships
-    relations= [f"{{'start': {e['start']}, 'type': {e['type']}, 'end': {e['end']} }}" for e in relevant_relations]
-    # Building relationship descriptions
-
-    # Combine all parts
     newline = "\n"
+    types = '(with datatypes)' if include_types else ''
+
+    local_nodes = extract_specific_props(jschema.node_property_datatype, nodes_info)
 
     if include_node_props:
         # Building node descriptions
         node_descriptions = [f"{label} {{{format_props(props)}}}" for label, props in local_nodes]
-        
     else:
         node_descriptions = [label for label, _ in local_nodes]
-        
+
+    subschema = _format_nodes_section(types=types, nodes=newline.join(node_descriptions))
+
+    if not include_relationships:
+        return subschema.strip()
+
+    local_relationships = extract_specific_props(jschema.rel_property_datatype, relationships_info)
+
+    # First (start, type, end) triple recorded for each relationship type
+    relevant_relations = [jschema.triples(item[0])[0] for item in local_relationships]
+    relations = [_format_relation(**e) for e in relevant_relations]
+
+    subschema += _format_relationships_section(relations=newline.join(relations))
 
     if include_rel_props:
+        # Building relationship descriptions
         relationship_descriptions= [f"{label} {{{format_props(props)}}}" for label, props in local_relationships]
+        subschema += _format_rel_props_section(types=types, rel_props=newline.join(relationship_descriptions))
 
-        subschema = f"""
-        Relevant node labels and their properties {'(with datatypes)' if include_types else ''} are:\n{newline.join(node_descriptions)}\n
-Relevant relationships are:\n{newline.join(relations)}\n
+    return subschema.strip()
 
-Relevant relationship properties {'(with datatypes)' if include_types else ''} are:\n{newline.join(relationship_descriptions)}\n
-    """
-    else:
-        subschema = f"""
-        Relevant node labels and their properties {'(with datatypes)' if include_types else ''} are:\n{newline.join(node_descriptions)}\n
-Relevant relationships are:\n{newline.join(relations)}\n
-  """
 
-    return subschema.strip()
+class SubschemaRenderer:
+    """Memoized build_minimal_subschema for a fixed schema.
+
+    A generator asks for the same handful of subschemas over and over,
+    so rendered strings are kept in a bounded LRU cache keyed on a
+    hashable form of the arguments."""
+
+    def __init__(self,
+                 jschema: Union[Dict, SchemaIndex],
+                 maxsize: int = 4096,
+                 ) -> None:
+        """Create a renderer over the schema; maxsize bounds the number of cached subschemas."""
+        self.schema_index = as_schema_index(jschema)
+        self._render = lru_cache(maxsize=maxsize)(self._render_canonical)
+        # Cached entry point for callers that already hold the canonical
+        # (tuple) arguments, e.g. the prompters compiled from utils.templates
+        self.render_canonical = self._render
+        # Time spent building the subschemas, i.e. in the cache misses
+        self.render_seconds = 0.0
+
+    @staticmethod
+    def canonical_key(info: List[Any]
+                      ) -> Tuple:
+        """Hashable form of nodes_info / relationships_info."""
+        return tuple(tuple(item) for item in info)
+
+    def _render_canonical(self,
+                          nodes_key: Tuple,
+                          relationships_key: Tuple,
+                          include_node_props: bool,
+                          include_rel_props: bool,
+                          include_types: bool,
+                          include_relationships: bool,
+                          ) -> str:
+        start = perf_counter()
+        subschema = build_minimal_subschema(self.schema_index,
+                                            nodes_key, relationships_key,
+                                            include_node_props, include_rel_props,
+                                            include_types, include_relationships)
+        self.render_seconds += perf_counter() - start
+        return subschema
+
+    def render(self,
+               nodes_info: List[Any],
+               relationships_info: List[Any],
+               include_node_props: bool=True,
+               include_rel_props: bool=False,
+               include_types: bool = False,
+               include_relationships: bool = True,
+               ) -> str:
+        """Same arguments and output as build_minimal_subschema, without the schema."""
+        return self._render(self.canonical_key(nodes_info),
+                            self.canonical_key(relationships_info),
+                            bool(include_node_props), bool(include_rel_props),
+                            bool(include_types), bool(include_relationships))
+
+    __call__ = render
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Returns hits, misses, current size, hit rate of the cache and the render time."""
+        info = self._render.cache_info()
+        calls = info.hits + info.misses
+        return {"hits": info.hits,
+                "misses": info.misses,
+                "size": info.currsize,
+                "maxsize": info.maxsize,
+                "hit_rate": info.hits / calls if calls else 0.0,
+                "render_seconds": self.render_seconds}
+
+    def report(self) -> str:
+        """One line summary of the cache usage."""
+        info = self.cache_info()
+        return (f"Subschema cache: {info['hits']} hits, {info['misses']} misses, "
+                f"{info['size']}/{info['maxsize']} entries, hit rate {info['hit_rate']:.1%}")
+
+    def clear(self) -> None:
+        """Empties the cache and resets the statistics."""
+        self._render.cache_clear()
+        self.render_seconds = 0.0
 
 
 
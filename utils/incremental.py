@@ -0,0 +1,362 @@
+"""Incremental refresh of the extracted node and relationship instances.
+
+The state of an extraction records, for each label, its node count and its
+schema properties, and for each (start, type, end) triple, the counts of its
+relationship type from the count store and the properties of the start node,
+the relationship and the end node. A refresh compares the current state with
+the saved one and re-extracts only the labels and triples that changed (or
+appeared); the other groups are kept from the existing instance files, the
+labels and triples no longer in the schema are dropped. The number of
+extraction queries is proportional to the changed part of the graph.
+
+The counts come from apoc.meta.stats(), they change when nodes or
+relationships are created or deleted: updates of property values that leave
+the counts and the schema unchanged are not detected, use --full (or
+full=True) to re-extract everything periodically.
+
+Usage, from the repository root (the Neo4j password is read from NEO4J_PASSWORD):
+
+    python -m utils.incremental \
+        --node-instances datas/node_instances.snap \
+        --rels-instances datas/rels_instances.snap \
+        --node-instances-size 12 --rels-instances-size 12 \
+        --neo4j-url bolt://localhost:7687
+"""
+
+from typing import Any, List, Dict, Tuple
+import argparse
+import os
+import sys
+
+# Import local modules
+from utils.utilities import *
+from utils.graph_utils import serialize_nodes_data, serialize_relationships_data
+from utils.instance_store import InstanceStore
+from utils.neo4j_schema import Neo4jSchema
+from utils.query_cache import MODES, RECORD, REPLAY, QueryCache
+from utils.snapshot import (read_instances, write_node_instances_snapshot,
+                            write_relationships_instances_snapshot)
+
+
+#### State ####
+
+def triple_id(rel: Dict[str, str]) -> str:
+    """Key of a relationship triple in the state, (:start)-[:type]->(:end)."""
+    return f"(:{rel['start']})-[:{rel['type']}]->(:{rel['end']})"
+
+
+def _properties(props: List[Dict]) -> List[List[str]]:
+    return sorted([el['property'], el['datatype']] for el in props)
+
+
+def instances_state(jschema: Dict[str, Any],
+                    stats: Dict[str, Any],
+                    node_instances_size: int,
+                    rels_instances_size: int,
+                    selected_labels: List[str] = None,
+                    rtriples: List[Dict] = None,
+                    ) -> Dict[str, Any]:
+    """
+    State of the instances of a graph.
+
+    Input:
+    - jschema: structured schema
+    - stats: output of Neo4jSchema.graph_stats
+    - node_instances_size, rels_instances_size: number of instances extracted
+    per label / triple
+    - selected_labels, rtriples: extracted labels and triples, all of the schema by default
+
+    Output:
+    - {'node_instances_size': .., 'rels_instances_size': ..,
+    'labels': {label: {'count': .., 'properties': [[property, datatype], ...]}},
+    'triples': {triple_id: {'counts': [..], 'properties': [start, relationship, end properties]}}}
+    """
+    node_props = jschema['node_props']
+    rel_props = jschema['rel_props']
+    labels = list(node_props) if selected_labels is None else selected_labels
+    rtriples = jschema['relationships'] if rtriples is None else rtriples
+    label_counts = stats.get('labels', {})
+    rel_counts = stats.get('relTypes', {})
+    type_counts = stats.get('relTypesCount', {})
+
+    state = {"node_instances_size": node_instances_size,
+             "rels_instances_size": rels_instances_size,
+             "labels": {},
+             "triples": {}}
+    for label in labels:
+        state["labels"][label] = {"count": label_counts.get(label, 0),
+                                  "properties": _properties(node_props.get(label, []))}
+    for rel in rtriples:
+        counts = [rel_counts.get(f"(:{rel['start']})-[:{rel['type']}]->()", 0),
+                  rel_counts.get(f"()-[:{rel['type']}]->(:{rel['end']})", 0),
+                  type_counts.get(rel['type'], 0)]
+        state["triples"][triple_id(rel)] = {
+            "counts": counts,
+            "properties": [_properties(node_props.get(rel['start'], [])),
+                           _properties(rel_props.get(rel['type'], [])),
+                           _properties(node_props.get(rel['end'], []))]}
+    return state
+
+
+def diff_states(previous: Dict[str, Any],
+                current: Dict[str, Any],
+                ) -> Dict[str, List[str]]:
+    """
+    Labels and triples to re-extract (new or changed) and to drop (no longer selected).
+    Everything is re-extracted when there is no previous state or the
+    number of instances per label / triple changed.
+    """
+    def changed(kind: str, size_key: str) -> List[str]:
+        if previous is None or previous.get(size_key) != current[size_key]:
+            return list(current[kind])
+        old = previous.get(kind, {})
+        return [key for key, entry in current[kind].items() if old.get(key) != entry]
+
+    def removed(kind: str) -> List[str]:
+        return [key for key in (previous or {}).get(kind, {}) if key not in current[kind]]
+
+    return {"labels": changed("labels", "node_instances_size"),
+            "removed_labels": removed("labels"),
+            "triples": changed("triples", "rels_instances_size"),
+            "removed_triples": removed("triples")}
+
+
+#### Refresh ####
+
+def plan_refresh(graph: Neo4jSchema,
+                 previous_state: Dict[str, Any],
+                 node_instances_size: int,
+                 rels_instances_size: int,
+                 selected_labels: List[str] = None,
+                 rtriples: List[Dict] = None,
+                 full: bool = False,
+                 ) -> Tuple[List[str], List[Dict], Dict[str, Any], Dict[str, List[str]]]:
+    """
+    Compares the current state of the graph with previous_state.
+
+    Output:
+    - labels, rtriples: the labels and triples of the refreshed instances
+    - state: the current state, to be saved with the instances
+    - changes: the labels and triples to re-extract and to drop, see diff_states;
+    the other labels and triples are kept from the previous instances
+    """
+    jschema = graph.get_structured_schema
+    labels = list(jschema['node_props']) if selected_labels is None else selected_labels
+    rtriples = jschema['relationships'] if rtriples is None else rtriples
+
+    state = instances_state(jschema, graph.graph_stats(), node_instances_size, rels_instances_size,
+                            labels, rtriples)
+    changes = diff_states(None if full else previous_state, state)
+    return labels, rtriples, state, changes
+
+
+def kept_groups(labels: List[str],
+                rtriples: List[Dict],
+                changes: Dict[str, List[str]],
+                ) -> Tuple[List[str], List[Dict]]:
+    """Labels and triples of a plan_refresh taken from the previous instances."""
+    changed_labels = set(changes["labels"])
+    changed_triples = set(changes["triples"])
+    return ([label for label in labels if label not in changed_labels],
+            [rel for rel in rtriples if triple_id(rel) not in changed_triples])
+
+
+def merge_refresh(graph: Neo4jSchema,
+                  labels: List[str],
+                  rtriples: List[Dict],
+                  changes: Dict[str, List[str]],
+                  node_instances: List[List[Dict]],
+                  rels_instances: List[List[Dict]],
+                  node_instances_size: int,
+                  rels_instances_size: int,
+                  batch_size: int = None,
+                  max_workers: int = None,
+                  ) -> Tuple[List[List[Dict]], List[List[Dict]]]:
+    """
+    Re-extracts the changed labels and triples of a plan_refresh and takes the
+    other groups from the previous instances, which need only hold the
+    kept_groups. Returns one serialized group per label and per triple, in order.
+    """
+    changed_labels = set(changes["labels"])
+    changed_triples = set(changes["triples"])
+    labels_to_extract = [label for label in labels if label in changed_labels]
+    triples_to_extract = [rel for rel in rtriples if triple_id(rel) in changed_triples]
+
+    extracted_nodes = serialize_nodes_data(
+        graph.extract_node_instances(labels_to_extract, node_instances_size,
+                                     batch_size, max_workers)) if labels_to_extract else []
+    extracted_rels = serialize_relationships_data(
+        graph.extract_multiple_relationships_instances(triples_to_extract, rels_instances_size,
+                                                       batch_size, max_workers)) if triples_to_extract else []
+    new_nodes = dict(zip(labels_to_extract, extracted_nodes))
+    new_rels = dict(zip(map(triple_id, triples_to_extract), extracted_rels))
+
+    # The groups that did not change are taken from the previous instances
+    store = InstanceStore(node_instances, rels_instances)
+    merged_nodes = [new_nodes[label] if label in new_nodes else store.nodes(label)
+                    for label in labels]
+    merged_rels = [new_rels[triple_id(rel)] if triple_id(rel) in new_rels else store.relationships(rel)
+                   for rel in rtriples]
+    return merged_nodes, merged_rels
+
+
+def refresh_instances(graph: Neo4jSchema,
+                      previous_state: Dict[str, Any],
+                      node_instances: List[List[Dict]],
+                      rels_instances: List[List[Dict]],
+                      node_instances_size: int,
+                      rels_instances_size: int,
+                      selected_labels: List[str] = None,
+                      rtriples: List[Dict] = None,
+                      batch_size: int = None,
+                      max_workers: int = None,
+                      full: bool = False,
+                      ) -> Tuple[List[List[Dict]], List[List[Dict]], Dict[str, Any], Dict[str, List[str]]]:
+    """
+    Re-extracts the instances of the labels and triples that changed since previous_state.
+
+    Input:
+    - graph: Neo4jSchema of the graph, with its current schema
+    - previous_state: state saved with the instances, None for a full extraction
+    - node_instances, rels_instances: the (serialized) instances of previous_state
+    - node_instances_size, rels_instances_size: instances extracted per label / triple
+    - selected_labels, rtriples: labels and triples to extract, all of the schema by default
+    - batch_size, max_workers: as in extract_node_instances
+    - full: re-extract everything
+
+    Output:
+    - node_instances: one serialized group per label of selected_labels, in that order
+    - rels_instances: one serialized group per triple of rtriples, in that order
+    - state: the current state, to be saved with the instances
+    - changes: the re-extracted and dropped labels and triples, see diff_states
+    """
+    labels, rtriples, state, changes = plan_refresh(graph, previous_state,
+                                                    node_instances_size, rels_instances_size,
+                                                    selected_labels, rtriples, full)
+    merged_nodes, merged_rels = merge_refresh(graph, labels, rtriples, changes,
+                                              node_instances, rels_instances,
+                                              node_instances_size, rels_instances_size,
+                                              batch_size, max_workers)
+    return merged_nodes, merged_rels, state, changes
+
+
+def refresh_report(changes: Dict[str, List[str]],
+                   state: Dict[str, Any],
+                   ) -> str:
+    """One line summary of a refresh."""
+    return (f"Re-extracted {len(changes['labels'])} of {len(state['labels'])} labels and "
+            f"{len(changes['triples'])} of {len(state['triples'])} relationship triples, "
+            f"dropped {len(changes['removed_labels'])} labels and {len(changes['removed_triples'])} triples")
+
+
+#### Files ####
+
+def state_path(node_instances_path: str) -> str:
+    """Default path of the state saved next to the node instances file."""
+    return os.path.splitext(node_instances_path)[0] + ".state.json"
+
+
+def read_instances_file(file_path: str,
+                        keys: List[Any] = None,
+                        ) -> List[List[Dict]]:
+    """Reads serialized instances from a binary snapshot (.snap), only the groups
+    of keys when set, or a json file, an empty list if the file does not exist yet."""
+    if not os.path.exists(file_path):
+        return []
+    return read_instances(file_path, keys)
+
+
+def refresh_instance_files(graph: Neo4jSchema,
+                           node_instances_path: str,
+                           rels_instances_path: str,
+                           node_instances_size: int,
+                           rels_instances_size: int,
+                           state_file: str = None,
+                           batch_size: int = None,
+                           max_workers: int = None,
+                           full: bool = False,
+                           ) -> Dict[str, List[str]]:
+    """
+    Refreshes the instance files (json or .snap) in place, from the state saved in
+    state_file (default: state_path(node_instances_path)), and saves the new state.
+    Returns the changes, see diff_states.
+    """
+    state_file = state_file or state_path(node_instances_path)
+    previous_state = read_json(state_file) if os.path.exists(state_file) else None
+
+    labels, rtriples, state, changes = plan_refresh(graph, previous_state,
+                                                    node_instances_size, rels_instances_size, full=full)
+    # Only the groups that did not change are read from the previous files
+    kept_labels, kept_triples = kept_groups(labels, rtriples, changes)
+    nodes, rels = merge_refresh(graph, labels, rtriples, changes,
+                                read_instances_file(node_instances_path, kept_labels),
+                                read_instances_file(rels_instances_path, kept_triples),
+                                node_instances_size, rels_instances_size,
+                                batch_size, max_workers)
+
+    jschema = graph.get_structured_schema
+    if node_instances_path.endswith(".snap"):
+        write_node_instances_snapshot(nodes, node_instances_path, list(jschema['node_props']))
+    else:
+        write_json(nodes, node_instances_path)
+    if rels_instances_path.endswith(".snap"):
+        write_relationships_instances_snapshot(rels, rels_instances_path, jschema['relationships'])
+    else:
+        write_json(rels, rels_instances_path)
+    # Saved last, an interrupted refresh is redone in full on the next run
+    write_json(state, state_file)
+    return changes
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m utils.incremental",
+        description="Re-extract the instances of the labels and relationships changed since the last extraction.")
+    parser.add_argument("--node-instances", required=True, help="node instances, .snap snapshot or json file")
+    parser.add_argument("--rels-instances", required=True, help="relationship instances, .snap snapshot or json file")
+    parser.add_argument("--node-instances-size", type=int, required=True,
+                        help="number of instances extracted per label")
+    parser.add_argument("--rels-instances-size", type=int, required=True,
+                        help="number of instances extracted per relationship triple")
+    parser.add_argument("--state", default=None,
+                        help="state of the previous extraction (default: <node instances>.state.json)")
+    parser.add_argument("--schema-cache", default=None,
+                        help="schema cache json file, reused while the graph counts do not change")
+    parser.add_argument("--batch-size", type=int, default=None, help="labels / triples extracted per query")
+    parser.add_argument("--workers", type=int, default=1, help="concurrent extraction queries")
+    parser.add_argument("--full", action="store_true", help="re-extract all the labels and triples")
+    parser.add_argument("--query-cache", default=None,
+                        help="sqlite file recording the query results, to replay the run offline")
+    parser.add_argument("--query-cache-mode", choices=MODES, default=RECORD,
+                        help="record (default), replay (no database) or passthrough")
+    parser.add_argument("--neo4j-url", default=os.environ.get("NEO4J_URI"), help="graph url (default: $NEO4J_URI)")
+    parser.add_argument("--neo4j-user", default=os.environ.get("NEO4J_USERNAME", "neo4j"),
+                        help="graph user name (default: $NEO4J_USERNAME or neo4j)")
+    parser.add_argument("--neo4j-database", default=os.environ.get("NEO4J_DATABASE", "neo4j"),
+                        help="graph database (default: $NEO4J_DATABASE or neo4j)")
+    args = parser.parse_args(argv)
+
+    password = os.environ.get("NEO4J_PASSWORD")
+    replay = args.query_cache is not None and args.query_cache_mode == REPLAY
+    if not replay and (not args.neo4j_url or password is None):
+        parser.error("needs --neo4j-url (or NEO4J_URI) and the NEO4J_PASSWORD variable")
+
+    query_cache = QueryCache(args.query_cache, args.query_cache_mode) if args.query_cache else None
+    graph = Neo4jSchema(args.neo4j_url, args.neo4j_user, password, args.neo4j_database,
+                        max_workers=args.workers, schema_cache_path=args.schema_cache,
+                        query_cache=query_cache)
+    try:
+        state_file = args.state or state_path(args.node_instances)
+        changes = refresh_instance_files(graph, args.node_instances, args.rels_instances,
+                                         args.node_instances_size, args.rels_instances_size,
+                                         state_file, args.batch_size, args.workers, args.full)
+        print(refresh_report(changes, read_json(state_file)))
+    finally:
+        graph.conn.close()
+        if query_cache is not None:
+            query_cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Label and triple indexed store of extracted instances"""
+
+from typing import Any, List, Dict, Iterable, Tuple, Union
+
+
+def node_label(rec: Dict) -> str:
+    """Label of an extracted node instance record."""
+    return rec['Instance']['Label']
+
+
+def relationship_triple(rec: Dict) -> Tuple[str, str, str]:
+    """(start, type, end) of an extracted relationship instance record,
+    read from its {start}_start, type, {end}_end keys."""
+    key_start, rel, key_end = rec.keys()
+    return (key_start[:-6], rel, key_end[:-4])
+
+
+def _triple_key(triple: Union[Tuple[str, str, str], Dict[str, str]]
+                ) -> Tuple[str, str, str]:
+    if isinstance(triple, dict):
+        return (triple['start'], triple['type'], triple['end'])
+    return tuple(triple)
+
+
+class InstanceStore:
+    """Node instances indexed by label and relationship instances indexed by
+    (start, type, end).
+
+    The instances are grouped once, at construction time, from their own
+    records: a label or triple is found wherever its records are, sublists
+    that are empty or mix several labels are handled, and groups of the same
+    label / triple are merged in load order. Looking up a label or triple
+    that has no instances returns an empty list."""
+
+    def __init__(self,
+                 node_instances: Iterable[List[Dict]] = (),
+                 rels_instances: Iterable[List[Dict]] = (),
+                 ) -> None:
+        """Index the instances as returned by extract_node_instances and
+        extract_multiple_relationships_instances (or read from their snapshots)."""
+
+        self._nodes: Dict[str, List[Dict]] = {}
+        for group in node_instances:
+            for rec in group:
+                label = node_label(rec)
+                bucket = self._nodes.get(label)
+                if bucket is None:
+                    bucket = self._nodes[label] = []
+                bucket.append(rec)
+
+        self._relationships: Dict[Tuple[str, str, str], List[Dict]] = {}
+        for group in rels_instances:
+            for rec in group:
+                triple = relationship_triple(rec)
+                bucket = self._relationships.get(triple)
+                if bucket is None:
+                    bucket = self._relationships[triple] = []
+                bucket.append(rec)
+
+    def __repr__(self) -> str:
+        return (f"InstanceStore(labels={len(self._nodes)}, "
+                f"triples={len(self._relationships)})")
+
+    #### Nodes ####
+
+    def labels(self) -> List[str]:
+        """Returns the labels that have instances, in load order."""
+        return list(self._nodes)
+
+    def nodes(self,
+              label: str,
+              ) -> List[Dict]:
+        """Returns the instances of a label, an empty list if there are none."""
+        return self._nodes.get(label, [])
+
+    def node_groups(self) -> List[List[Dict]]:
+        """Returns the non empty node instances groups, one per label."""
+        return list(self._nodes.values())
+
+    #### Relationships ####
+
+    def triples(self) -> List[Tuple[str, str, str]]:
+        """Returns the (start, type, end) triples that have instances, in load order."""
+        return list(self._relationships)
+
+    def relationships(self,
+                      triple: Union[Tuple[str, str, str], Dict[str, str]],
+                      ) -> List[Dict]:
+        """Returns the instances of a (start, type, end) triple or
+        {start, type, end} dictionary, an empty list if there are none."""
+        return self._relationships.get(_triple_key(triple), [])
+
+    def relationship_groups(self) -> List[List[Dict]]:
+        """Returns the non empty relationship instances groups, one per triple."""
+        return list(self._relationships.values())
+
+    #### Counts ####
+
+    def count_nodes(self) -> Dict[str, int]:
+        """Returns the number of instances per label."""
+        return {label: len(recs) for label, recs in self._nodes.items()}
+
+    def count_relationships(self) -> Dict[Tuple[str, str, str], int]:
+        """Returns the number of instances per triple."""
+        return {triple: len(recs) for triple, recs in self._relationships.items()}
+
+
+def node_groups(instances: Union[Iterable[List[Dict]], InstanceStore]
+                ) -> Iterable[List[Dict]]:
+    """Node instances groups of a store or of a list of extracted instances."""
+    if isinstance(instances, InstanceStore):
+        return instances.node_groups()
+    return instances
+
+
+def relationship_groups(instances: Union[Iterable[List[Dict]], InstanceStore]
+                        ) -> Iterable[List[Dict]]:
+    """Relationship instances groups of a store or of a list of extracted instances."""
+    if isinstance(instances, InstanceStore):
+        return instances.relationship_groups()
+    return instances
@@ -0,0 +1,403 @@
+"""Columnar, dictionary-encoded tables of parsed instances.
+
+The parsed views of graph_utils.build_datatype_views hold one record per
+entry: NodeEntry(label, property, value) for the nodes, RelationshipEntry(label_start,
+{props}, type, label_end, {props}) or RelationshipPropsEntry (with the relationship
+properties after the type) for the relationships. The tables store the same entries as columns of machine integers
+(array module): labels, properties, relationship triples and property key sets
+are dictionary encoded, the values go in a typed column chosen from the
+datatype or stay references to the extracted values (see ValueColumn), so the
+memory drops several times, not by an order of magnitude. They are sequences of
+entries, so the samplers of utils.utilities read them by index or by iteration as
+they read the lists; the entry records are rebuilt on access.
+
+The filters and groupings work on the code columns, with numpy when it is
+installed and with the array module otherwise."""
+
+from typing import Any, List, Dict, Iterable, Iterator, Tuple, Union
+from array import array
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Import local modules
+from utils.utilities import NodeEntry, RelationshipEntry, RelationshipPropsEntry
+
+# Typed value columns by datatype (apoc.meta.data names)
+_TYPED_COLUMNS = {"INTEGER": "q", "FLOAT": "d", "BOOLEAN": "b"}
+_PYTHON_TYPES = {"q": int, "d": float, "b": bool}
+
+
+class Dictionary:
+    """Bidirectional mapping between values and their integer codes, in order of first appearance."""
+
+    def __init__(self, values: Iterable[Any] = ()) -> None:
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+        for value in values:
+            self.encode(value)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._codes
+
+    def encode(self, value: Any) -> int:
+        """Code of the value, a new one if the value is not in the dictionary yet."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: Any) -> int:
+        """Code of the value, -1 if it is not in the dictionary."""
+        return self._codes.get(value, -1)
+
+
+class ValueColumn:
+    """
+    Column of property values: a typed array for the INTEGER, FLOAT and BOOLEAN
+    datatypes, a list of references to the extracted values otherwise. The string
+    and temporal values are mostly distinct, so a dictionary costs more than it
+    saves: dictionary encoded, the views of the 50x benchmark graph peak at 25.5 MB
+    instead of 6.9 MB. A value that does not fit the typed array (another Python type, an integer
+    over 64 bits) turns the column into a list, so any value is read back unchanged.
+    """
+
+    def __init__(self, datatype: str = None) -> None:
+        self.typecode = _TYPED_COLUMNS.get(datatype)
+        self._data = array(self.typecode) if self.typecode is not None else []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __getitem__(self, i: int) -> Any:
+        if self.typecode == "b":
+            return bool(self._data[i])
+        return self._data[i]
+
+    def append(self, value: Any) -> None:
+        if self.typecode is not None:
+            if type(value) is _PYTHON_TYPES[self.typecode]:
+                try:
+                    self._data.append(value)
+                    return
+                except OverflowError:
+                    pass
+            self._data = [self[i] for i in range(len(self._data))]
+            self.typecode = None
+        self._data.append(value)
+
+    def nbytes(self) -> int:
+        """Size of the column storage, the referenced values excluded."""
+        if self.typecode is not None:
+            return len(self._data) * self._data.itemsize
+        return len(self._data) * 8
+
+
+def _select(codes: array,
+            code: int,
+            ) -> array:
+    """Indices of the code in a code column."""
+    if code < 0:
+        return array("I")
+    if np is not None:
+        found = np.flatnonzero(np.frombuffer(codes, dtype=np.uint32) == code)
+        return array("I", found.astype(np.uint32).tobytes())
+    return array("I", [i for i, c in enumerate(codes) if c == code])
+
+
+def _intersect(indices: array,
+               other: array,
+               ) -> array:
+    if indices is None:
+        return other
+    keep = set(other)
+    return array("I", [i for i in indices if i in keep])
+
+
+def _group(codes: array,
+           dictionary: Dictionary,
+           ) -> Dict[Any, array]:
+    """{value: indices of its rows}, in order of first appearance."""
+    groups = [array("I") for _ in range(len(dictionary))]
+    for i, c in enumerate(codes):
+        groups[c].append(i)
+    return {value: group for value, group in zip(dictionary.values, groups) if group}
+
+
+class NodeTable:
+    """Columnar [label, property, value] entries, as in the {datatype}_parsed views."""
+
+    def __init__(self,
+                 entries: Iterable[List] = (),
+                 datatype: str = None,
+                 ) -> None:
+        """
+        - entries: [NodeEntry(label, property, value), ...]
+        - datatype: datatype of the values, selects the value column type
+        (see ValueColumn), None for a mix of datatypes
+        """
+        self.datatype = datatype
+        self.labels = Dictionary()
+        self.properties = Dictionary()
+        self.label_codes = array("I")
+        self.property_codes = array("I")
+        self.values = ValueColumn(datatype)
+        self.extend(entries)
+
+    def __repr__(self) -> str:
+        return (f"NodeTable(datatype={self.datatype}, rows={len(self)}, labels={len(self.labels)}, "
+                f"properties={len(self.properties)})")
+
+    def __len__(self) -> int:
+        return len(self.label_codes)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[List, List[List]]:
+        if isinstance(i, slice):
+            return self.rows(range(*i.indices(len(self))))
+        return NodeEntry(self.labels.values[self.label_codes[i]],
+                         self.properties.values[self.property_codes[i]],
+                         self.values[i])
+
+    def __iter__(self) -> Iterator[List]:
+        labels, properties, values = self.labels.values, self.properties.values, self.values
+        for i, (lc, pc) in enumerate(zip(self.label_codes, self.property_codes)):
+            yield NodeEntry(labels[lc], properties[pc], values[i])
+
+    def append(self, entry: List) -> None:
+        label, prop, value = entry
+        self.label_codes.append(self.labels.encode(label))
+        self.property_codes.append(self.properties.encode(prop))
+        self.values.append(value)
+
+    def extend(self, entries: Iterable[List]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def rows(self, indices: Iterable[int]) -> List[List]:
+        """The entries at the given indices."""
+        return [self[i] for i in indices]
+
+    def select(self,
+               label: str = None,
+               prop: str = None,
+               ) -> array:
+        """Indices of the entries with the given label and / or property."""
+        indices = None
+        if label is not None:
+            indices = _select(self.label_codes, self.labels.code(label))
+        if prop is not None:
+            indices = _intersect(indices, _select(self.property_codes, self.properties.code(prop)))
+        return array("I", range(len(self))) if indices is None else indices
+
+    def group_by_label(self) -> Dict[str, array]:
+        """{label: indices of its entries}."""
+        return _group(self.label_codes, self.labels)
+
+    def group_by_property(self) -> Dict[str, array]:
+        """{property: indices of its entries}."""
+        return _group(self.property_codes, self.properties)
+
+    def nbytes(self) -> int:
+        """Size of the columns, the dictionaries excluded."""
+        return (len(self.label_codes) * self.label_codes.itemsize
+                + len(self.property_codes) * self.property_codes.itemsize
+                + self.values.nbytes())
+
+
+class RelationshipTable:
+    """
+    Columnar relationship entries, as in the {dt_start}_{dt_end}_rels views
+    [label_start, {props}, type, label_end, {props}] or, with relationship
+    properties, the {dt_start}_{dt_rel}_{dt_end}_rels views
+    [label_start, {props}, type, {props}, label_end, {props}].
+
+    The (label_start, type, label_end) triples and the key tuples of the property
+    dictionaries are dictionary encoded; the values of all the dictionaries of a
+    row are stored consecutively in one value column, from the row offset.
+    """
+
+    def __init__(self,
+                 entries: Iterable[List] = (),
+                 with_rel_props: bool = None,
+                 ) -> None:
+        """
+        - entries: relationship entries, all of the same width
+        - with_rel_props: if the entries have relationship properties, found
+        from the first entry if None
+        """
+        self.with_rel_props = with_rel_props
+        self.triples = Dictionary()
+        self.keys = Dictionary()
+        self.triple_codes = array("I")
+        self.offsets = array("I")
+        self.values = ValueColumn()
+        self._key_codes: List[array] = []
+        self.extend(entries)
+
+    def __repr__(self) -> str:
+        return (f"RelationshipTable(rows={len(self)}, triples={len(self.triples)}, "
+                f"with_rel_props={self.with_rel_props})")
+
+    def __len__(self) -> int:
+        return len(self.triple_codes)
+
+    @property
+    def _dict_positions(self) -> Tuple[int, ...]:
+        return (1, 3, 5) if self.with_rel_props else (1, 4)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[List, List[List]]:
+        if isinstance(i, slice):
+            return self.rows(range(*i.indices(len(self))))
+        start, rtype, end = self.triples.values[self.triple_codes[i]]
+        offset = self.offsets[i]
+        dicts = []
+        for key_codes in self._key_codes:
+            keys = self.keys.values[key_codes[i]]
+            dicts.append({key: self.values[offset + j] for j, key in enumerate(keys)})
+            offset += len(keys)
+        if self.with_rel_props:
+            return RelationshipPropsEntry(start, dicts[0], rtype, dicts[1], end, dicts[2])
+        return RelationshipEntry(start, dicts[0], rtype, end, dicts[1])
+
+    def __iter__(self) -> Iterator[List]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, entry: List) -> None:
+        if self.with_rel_props is None:
+            self.with_rel_props = len(entry) == 6
+        if not self._key_codes:
+            self._key_codes = [array("I") for _ in self._dict_positions]
+        if self.with_rel_props:
+            triple = (entry[0], entry[2], entry[4])
+        else:
+            triple = (entry[0], entry[2], entry[3])
+        self.triple_codes.append(self.triples.encode(triple))
+        self.offsets.append(len(self.values))
+        for key_codes, position in zip(self._key_codes, self._dict_positions):
+            props = entry[position]
+            key_codes.append(self.keys.encode(tuple(props)))
+            for value in props.values():
+                self.values.append(value)
+
+    def extend(self, entries: Iterable[List]) -> None:
+        for entry in entries:
+            self.append(entry)
+
+    def rows(self, indices: Iterable[int]) -> List[List]:
+        """The entries at the given indices."""
+        return [self[i] for i in indices]
+
+    def select(self,
+               start: str = None,
+               rtype: str = None,
+               end: str = None,
+               ) -> array:
+        """Indices of the entries matching the given start label, type and / or end label."""
+        wanted = [code for code, (s, r, e) in enumerate(self.triples.values)
+                  if (start is None or s == start) and (rtype is None or r == rtype) and (end is None or e == end)]
+        if len(wanted) == len(self.triples):
+            return array("I", range(len(self)))
+        indices = array("I")
+        for code in wanted:
+            indices.extend(_select(self.triple_codes, code))
+        return array("I", sorted(indices))
+
+    def group_by_triple(self) -> Dict[Tuple[str, str, str], array]:
+        """{(label_start, type, label_end): indices of its entries}."""
+        return _group(self.triple_codes, self.triples)
+
+    def nbytes(self) -> int:
+        """Size of the columns, the dictionaries excluded."""
+        return (len(self.triple_codes) * self.triple_codes.itemsize
+                + len(self.offsets) * self.offsets.itemsize
+                + sum(len(codes) * codes.itemsize for codes in self._key_codes)
+                + self.values.nbytes())
+
+
+class TableChain:
+    """Concatenation of tables, read as one sequence of entries without copying them
+    (the dtypes_parsed and all_rels views)."""
+
+    def __init__(self, tables: List[Union[NodeTable, RelationshipTable]]) -> None:
+        self.tables = list(tables)
+        self._starts = [0]
+        for table in self.tables:
+            self._starts.append(self._starts[-1] + len(table))
+
+    def __repr__(self) -> str:
+        return f"TableChain(tables={len(self.tables)}, rows={len(self)})"
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[List, List[List]]:
+        if isinstance(i, slice):
+            return self.rows(range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("TableChain index out of range")
+        t = bisect_right(self._starts, i) - 1
+        return self.tables[t][i - self._starts[t]]
+
+    def __iter__(self) -> Iterator[List]:
+        for table in self.tables:
+            yield from table
+
+    def rows(self, indices: Iterable[int]) -> List[List]:
+        """The entries at the given indices."""
+        return [self[i] for i in indices]
+
+    def select(self, *args: Any, **kwargs: Any) -> array:
+        """Indices of the entries selected by the select method of the tables."""
+        indices = array("I")
+        for start, table in zip(self._starts, self.tables):
+            indices.extend(start + i for i in table.select(*args, **kwargs))
+        return indices
+
+    def nbytes(self) -> int:
+        """Size of the columns of the tables."""
+        return sum(table.nbytes() for table in self.tables)
+
+
+def _tabulate(views: Dict[str, List],
+              all_key: str,
+              make_table: Any,
+              ) -> Dict[str, Any]:
+    """Tables of the views, the all_key view chains the others when it is their concatenation."""
+    tables = {key: make_table(key, entries) for key, entries in views.items() if key != all_key}
+    if all_key in views:
+        entries = views[all_key]
+        if len(entries) == sum(len(table) for table in tables.values()):
+            tables[all_key] = TableChain(list(tables.values()))
+        else:
+            tables[all_key] = make_table(all_key, entries)
+        # Keep the key order of the views
+        tables = {key: tables[key] for key in views}
+    return tables
+
+
+def tabulate_views(dparsed: Dict[str, List],
+                   drels: Dict[str, List],
+                   drelsprops: Dict[str, List],
+                   ) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Columnar versions of the views of graph_utils.build_datatype_views, same keys and
+    entries in the same order. The {datatype}_parsed tables get the typed value column
+    of their datatype; dtypes_parsed and all_rels chain the other tables.
+    """
+    def node_table(key: str, entries: List) -> NodeTable:
+        datatype = key[:-len("_parsed")].upper() if key != "dtypes_parsed" else None
+        return NodeTable(entries, datatype)
+
+    return (_tabulate(dparsed, "dtypes_parsed", node_table),
+            _tabulate(drels, "all_rels", lambda key, entries: RelationshipTable(entries, with_rel_props=False)),
+            _tabulate(drelsprops, "all_rels", lambda key, entries: RelationshipTable(entries, with_rel_props=True)))
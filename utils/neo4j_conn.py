@@ -1,6 +1,6 @@
 """Graph database connector and query parsers."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Iterator
 import pandas as pd
 
 import neo4j
@@ -9,6 +9,10 @@ from neo4j import GraphDatabase
 
 # Import local modules
 from utils.utilities import *
+from utils.query_cache import QueryCache, query_key, MISSING, RECORD, REPLAY, PASSTHROUGH
+
+# Streamed results with more records are not cached
+STREAM_CACHE_RECORDS = 100_000
 
 class Neo4jGraph:
     """Neo4j wrapper for graph operations."""
@@ -19,12 +23,20 @@ class Neo4jGraph:
         username: str, 
         password: str, 
         database: str,
+        max_connection_pool_size: int = None,
         ) -> None:
         
-        """Create a new Neo4j graph wrapper instance."""
+        """Create a new Neo4j graph wrapper instance.
+        The driver is thread safe, query can be called from several threads,
+        each call runs in its own session from the connection pool."""
+
+        driver_config = {}
+        if max_connection_pool_size:
+            driver_config["max_connection_pool_size"] = max_connection_pool_size
       
         self._driver = neo4j.GraphDatabase.driver(url,
                                                    auth=(username, password),
+                                                   **driver_config,
                                                    )
         # Set the database name                                           
         self._database = database
@@ -65,8 +77,168 @@ class Neo4jGraph:
             try:
                 data = session.run(cypher_query, params)
                 return [r.data() for r in data]
+            except CypherSyntaxError as e:
+                raise ValueError(
+                    "Generated Cypher Statement is not valid\n" f"{e}")
+
+
+    def stream(self,
+               cypher_query: str,
+               params: dict = {},
+               db=None,
+               fetch_size: int = 1000,
+               ) -> Iterator[Dict[str, Any]]:
+        """Query Neo4j database lazily. Yields one dictionary per record,
+        records are pulled from the server in batches of fetch_size.
+        The session stays open until the generator is exhausted or closed."""
+
+        target_db = self._database if db is None else db
+
+        with self._driver.session(database=target_db, fetch_size=fetch_size) as session:
+            try:
+                for r in session.run(cypher_query, params):
+                    yield r.data()
             except CypherSyntaxError as e:
                 raise ValueError(
                     "Generated Cypher Statement is not valid\n" f"{e}") 
 
-    
\ No newline at end of file
+
+    def explain(self,
+                cypher_queries: List[str],
+                db=None,
+                ) -> List[Any]:
+        """Plans the queries with EXPLAIN, without running them, in a single session.
+        Returns None for each query that plans, the error message otherwise."""
+
+        target_db = self._database if db is None else db
+        errors = []
+
+        with self._driver.session(database=target_db) as session:
+            for cypher_query in cypher_queries:
+                try:
+                    session.run(f"EXPLAIN {cypher_query}").consume()
+                    errors.append(None)
+                except neo4j.exceptions.Neo4jError as e:
+                    errors.append(e.message or str(e))
+        return errors
+
+
+class CachedNeo4jGraph(Neo4jGraph):
+    """Neo4jGraph whose query results go through a QueryCache.
+
+    In record mode the results are served from the cache and the misses are
+    queried and stored; in replay mode no connection is opened and every
+    query must have been recorded; passthrough is a plain Neo4jGraph.
+    stream yields the records as they arrive and caches the result once it
+    is exhausted, unless it has more than max_stream_records records;
+    explain caches the planning result of each query."""
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        database: str,
+        cache: QueryCache,
+        max_connection_pool_size: int = None,
+        max_stream_records: int = STREAM_CACHE_RECORDS,
+        ) -> None:
+
+        self.cache = cache
+        self.max_stream_records = max_stream_records
+        if cache.mode == REPLAY:
+            self._driver = None
+            self._database = database
+            self.schema = ""
+        else:
+            super().__init__(url, username, password, database, max_connection_pool_size)
+
+
+    def _cached(self,
+                key: str,
+                cypher_query: str,
+                run: Any,
+                ) -> Any:
+        """Result of run() through the cache."""
+        value = self.cache.get(key)
+        if value is not MISSING:
+            return value
+        if self.cache.mode == REPLAY:
+            raise LookupError(f"Query not recorded in {self.cache.file_path}:\n{cypher_query}")
+        value = run()
+        self.cache.put(key, value, cypher_query)
+        return value
+
+
+    def query(self,
+              cypher_query: str,
+              params: dict = {},
+              db=None
+              ) -> List[Dict[str, Any]]:
+        """Query Neo4j database through the cache. Outputs a list of dictionaries."""
+
+        if self.cache.mode == PASSTHROUGH:
+            return super().query(cypher_query, params, db)
+        target_db = self._database if db is None else db
+        return self._cached(query_key(target_db, cypher_query, params), cypher_query,
+                            lambda: super(CachedNeo4jGraph, self).query(cypher_query, params, db))
+
+
+    def stream(self,
+               cypher_query: str,
+               params: dict = {},
+               db=None,
+               fetch_size: int = 1000,
+               ) -> Iterator[Dict[str, Any]]:
+        """Yields the records of the query as they arrive. A result that is read to
+        the end with at most max_stream_records records is cached, from a buffer."""
+
+        if self.cache.mode == PASSTHROUGH:
+            yield from super().stream(cypher_query, params, db, fetch_size)
+            return
+        target_db = self._database if db is None else db
+        key = query_key(target_db, cypher_query, params)
+        value = self.cache.get(key)
+        if value is not MISSING:
+            yield from value
+            return
+        if self.cache.mode == REPLAY:
+            raise LookupError(f"Query not recorded in {self.cache.file_path}:\n{cypher_query}")
+
+        buffer = []
+        for record in super().stream(cypher_query, params, db, fetch_size):
+            if buffer is not None:
+                buffer.append(record)
+                if len(buffer) > self.max_stream_records:
+                    buffer = None
+            yield record
+        if buffer is not None:
+            self.cache.put(key, buffer, cypher_query)
+
+
+    def explain(self,
+                cypher_queries: List[str],
+                db=None,
+                ) -> List[Any]:
+        """Plans the queries with EXPLAIN through the cache, only the missing ones reach the database."""
+
+        if self.cache.mode == PASSTHROUGH:
+            return super().explain(cypher_queries, db)
+        target_db = self._database if db is None else db
+        keys = [query_key(target_db, f"EXPLAIN {q}") for q in cypher_queries]
+        results = {key: self.cache.get(key) for key in keys}
+        missing = [(key, q) for key, q in zip(keys, cypher_queries) if results[key] is MISSING]
+        if missing and self.cache.mode == REPLAY:
+            raise LookupError(f"Query not recorded in {self.cache.file_path}:\nEXPLAIN {missing[0][1]}")
+        if missing:
+            errors = super().explain([q for _, q in missing], db)
+            for (key, q), error in zip(missing, errors):
+                self.cache.put(key, error, f"EXPLAIN {q}")
+                results[key] = error
+        return [results[key] for key in keys]
+
+
+    def close(self):
+        """Closes the Neo4j connection, the cache stays open."""
+        if self._driver is not None:
+            self._driver.close()
@@ -1,12 +1,21 @@
 
 """Functions to extract specific KG information and data using Cypher"""
 
-from typing import Any, List, Iterable
+from typing import Any, List, Iterable, Iterator, Tuple
+import hashlib
+import json
+import os
+import random
+from time import perf_counter
 import neo4j
 
 # Import local modules
 from utils.utilities import *
-from utils.neo4j_conn import Neo4jGraph
+from utils.neo4j_conn import Neo4jGraph, CachedNeo4jGraph
+from utils.query_cache import QueryCache
+from utils.schema_index import SchemaIndex
+from utils.graph_utils import Neo4jJSONEncoder
+from utils.templates import TEMPLATES, QueryTemplate, template_datatypes
 
 #### Queries ####
 
@@ -34,6 +43,242 @@ rel_properties_query = """
     RETURN {type: nodeLabels, properties: properties} AS output
     """
 
+#### Property projection ####
+
+class PropertyProjection:
+    """
+    Properties fetched by the instance extraction queries, instead of all of them.
+
+    Only the schema properties of the datatypes read by the query templates are
+    returned (see bind), minus the denied ones (or only the allowed ones); allow
+    and deny entries are property names, for every label and type, or
+    Label.property / TYPE.property names. With max_value_size, STRING and LIST
+    values longer than that (characters or elements) are not returned either.
+    The filters run in the queries, so the unused properties are not sent by the server.
+    """
+
+    def __init__(self,
+                 datatypes: Iterable[str] = None,
+                 allow: Iterable[str] = None,
+                 deny: Iterable[str] = None,
+                 max_value_size: int = None,
+                 templates: Iterable[QueryTemplate] = None,
+                 ) -> None:
+        """
+        - datatypes: datatypes of the fetched properties, overrides those read by the templates
+        - templates: query templates whose sources fix the fetched datatypes, all of them by default
+        """
+        self.datatypes = set(datatypes) if datatypes is not None else None
+        self.allow = set(allow) if allow is not None else None
+        self.deny = set(deny or ())
+        self.max_value_size = max_value_size
+        self.templates = list(TEMPLATES.values()) if templates is None else list(templates)
+        # Fetched datatypes of the node and relationship properties, all of them (None) until bound
+        self.node_datatypes = self.rel_datatypes = self.datatypes
+
+    def __repr__(self) -> str:
+        return (f"PropertyProjection(node_datatypes={self.node_datatypes}, rel_datatypes={self.rel_datatypes}, "
+                f"allow={self.allow}, deny={self.deny}, max_value_size={self.max_value_size})")
+
+    def bind(self,
+             schema_index: SchemaIndex,
+             ) -> None:
+        """Derives the fetched datatypes from the template sources and the schema datatypes
+        (see template_datatypes), unless datatypes was given. Called by Neo4jSchema."""
+        if self.datatypes is not None:
+            return
+        nodes, pairs, triples = template_datatypes(self.templates,
+                                                   schema_index.node_datatypes, schema_index.rel_datatypes)
+        self.node_datatypes = (nodes.union(*pairs)
+                               .union(dt for dt1, _, dt2 in triples for dt in (dt1, dt2)))
+        self.rel_datatypes = {rt for _, rt, _ in triples}
+
+    def selected(self,
+                 owner: str,
+                 props: List[Dict],
+                 relationship: bool = False,
+                 ) -> List[Dict]:
+        """The schema properties [{'property': .., 'datatype': ..}] of a label (or of a
+        relationship type) that are fetched."""
+        datatypes = self.rel_datatypes if relationship else self.node_datatypes
+        return [el for el in props
+                if (datatypes is None or el['datatype'] in datatypes)
+                and (self.allow is None or el['property'] in self.allow or f"{owner}.{el['property']}" in self.allow)
+                and el['property'] not in self.deny and f"{owner}.{el['property']}" not in self.deny]
+
+    def expression(self,
+                   var: str,
+                   owner: str,
+                   props: List[Dict],
+                   relationship: bool = False,
+                   ) -> str:
+        """Cypher map of the fetched properties of the variable var. Missing and
+        oversized values are null, see drop_null_properties."""
+        items = []
+        for el in self.selected(owner, props, relationship):
+            key = el['property'].replace("`", "``")
+            value = f"{var}.`{key}`"
+            if self.max_value_size is not None and (el['datatype'] == "STRING" or el['datatype'].startswith("LIST")):
+                value = f"CASE WHEN size({value}) <= {int(self.max_value_size)} THEN {value} END"
+            items.append(f"`{key}`: {value}")
+        return "{" + ", ".join(items) + "}"
+
+
+def drop_null_properties(props: Dict
+                         ) -> Dict:
+    """Removes the null entries of a projected properties map, Neo4j properties are never null."""
+    return {key: value for key, value in props.items() if value is not None}
+
+
+def node_instances_batch_query(labels: List[str],
+                               properties: List[str] = None,
+                               ) -> str:
+    """Builds one query that returns up to $n instances for each of the labels.
+    The label names are passed as the $labels parameter, idx is the label position.
+    properties are the Cypher expressions of the returned properties of p, per label
+    (default properties(p))."""
+    subqueries = [
+        f"""    MATCH (p:`{label}`)
+    WITH p LIMIT $n
+    RETURN {idx} AS idx, {{Label: $labels[{idx}], properties: {properties[idx] if properties else 'properties(p)'}}} AS Instance"""
+        for idx, label in enumerate(labels)
+    ]
+    return "CALL {\n" + "\n    UNION ALL\n".join(subqueries) + "\n}\nRETURN idx, Instance"
+
+
+def relationship_instances_batch_query(rtriples: List[Dict],
+                                       properties: List[Tuple[str, str, str]] = None,
+                                       ) -> str:
+    """Builds one query that returns up to $n instances for each of the relationship triples,
+    idx is the triple position. properties are the Cypher expressions of the returned
+    properties of a, r and b, per triple (default properties(a), properties(r), properties(b))."""
+    properties = properties or [("properties(a)", "properties(r)", "properties(b)")] * len(rtriples)
+    subqueries = [
+        f"""    MATCH (a:`{rel['start']}`)-[r:`{rel['type']}`]->(b:`{rel['end']}`)
+    WITH a, r, b LIMIT $n
+    RETURN {idx} AS idx, {source} AS source, {relp} AS rel, {target} AS target"""
+        for idx, (rel, (source, relp, target)) in enumerate(zip(rtriples, properties))
+    ]
+    return "CALL {\n" + "\n    UNION ALL\n".join(subqueries) + "\n}\nRETURN idx, source, rel, target"
+
+
+#### Sampling queries ####
+
+# Count store lookups, no scan
+node_count_query = "MATCH (n) RETURN count(n) AS count"
+
+def label_count_query(label: str
+                      ) -> str:
+    return f"MATCH (p:`{label}`) RETURN count(p) AS count"
+
+
+# Node id seeks over a range of ids, used to bound the id space
+id_range_probe_query = """
+    UNWIND range($low, $high) AS i
+    MATCH (n) WHERE id(n) = i
+    RETURN max(id(n)) AS max_id
+    """
+
+# All nodes scan, the exact bound of the id space when the probes missed ids
+max_id_query = "MATCH (n) RETURN max(id(n)) AS max_id"
+
+
+def label_ids_query(label: str
+                    ) -> str:
+    """Ids of all the nodes of a label, for the labels small enough to be scanned."""
+    return f"MATCH (p:`{label}`) RETURN id(p) AS id"
+
+
+def start_ids_query(rel: Dict
+                    ) -> str:
+    """Ids of the start nodes of a relationship triple, for the start labels small enough to be scanned.
+    The existential subquery stops at the first relationship of each start node."""
+    return f"""MATCH (a:`{rel['start']}`)
+    WHERE EXISTS {{ MATCH (a)-[:`{rel['type']}`]->(:`{rel['end']}`) }}
+    RETURN id(a) AS id"""
+
+
+def node_sample_query(label: str,
+                      properties: str = "properties(p)",
+                      ) -> str:
+    """Nodes of a label among the candidate $ids, found by id seeks."""
+    return f"""UNWIND $ids AS i
+    MATCH (p:`{label}`) WHERE id(p) = i
+    RETURN {properties} AS properties"""
+
+
+def relationship_sample_query(rel: Dict,
+                              properties: Tuple[str, str, str] = ("properties(a)", "properties(r)", "properties(b)"),
+                              ) -> str:
+    """Up to $per_node random relationships of the triple from each start node among
+    the candidate $ids, drawn in a subquery per start node (not the first ones the store returns).
+    Only the first $max_expand relationships of a start node are read and shuffled, so that
+    the cost of a supernode stays bounded."""
+    return f"""UNWIND $ids AS i
+    MATCH (a:`{rel['start']}`) WHERE id(a) = i
+    CALL {{
+        WITH a
+        MATCH (a)-[r:`{rel['type']}`]->(b:`{rel['end']}`)
+        WITH r, b LIMIT $max_expand
+        WITH r, b ORDER BY rand() LIMIT $per_node
+        RETURN r, b
+    }}
+    RETURN {properties[0]} AS source, {properties[1]} AS rel, {properties[2]} AS target"""
+
+
+# Single apoc.meta.data() pass, split client-side by split_meta_data
+meta_data_query = """
+    CALL apoc.meta.data()
+    YIELD label, other, elementType, type, property
+    RETURN label, other, elementType, type, property
+    """
+
+# Cheap counts from the count store, used to detect schema changes
+schema_fingerprint_query = """
+    CALL apoc.meta.stats()
+    YIELD labels, relTypesCount
+    RETURN labels, relTypesCount
+    """
+
+# Count store statistics per label, per (label)-[type]-> / -[type]->(label) and per type,
+# used to detect the labels and triples changed since an extraction
+graph_stats_query = """
+    CALL apoc.meta.stats()
+    YIELD labels, relTypes, relTypesCount
+    RETURN labels, relTypes, relTypesCount
+    """
+
+
+def split_meta_data(rows: List[Dict]
+                    ) -> Dict[str, List[Dict]]:
+    """Splits the rows of meta_data_query into the outputs of
+    node_properties_query, rel_properties_query and rel_query."""
+
+    node_properties: Dict[str, List[Dict]] = {}
+    rel_properties: Dict[str, List[Dict]] = {}
+    relationships = []
+
+    for row in rows:
+        if row["elementType"] == "node":
+            if row["type"] == "RELATIONSHIP":
+                for other_node in row["other"]:
+                    relationships.append({"start": row["label"],
+                                          "type": row["property"],
+                                          "end": str(other_node)})
+            else:
+                node_properties.setdefault(row["label"], []).append(
+                    {"property": row["property"], "datatype": row["type"]})
+        elif row["elementType"] == "relationship" and row["type"] != "RELATIONSHIP":
+            rel_properties.setdefault(row["label"], []).append(
+                {"property": row["property"], "datatype": row["type"]})
+
+    return {
+        "node_properties": [{"label": k, "properties": v} for k, v in node_properties.items()],
+        "rel_properties": [{"type": k, "properties": v} for k, v in rel_properties.items()],
+        "relationships": relationships,
+        }
+
+
 class Neo4jSchema(Neo4jGraph):
     """Neo4j wrapper for graph operations."""
 
@@ -43,15 +288,41 @@ class Neo4jSchema(Neo4jGraph):
         username: str, 
         password: str, 
         database: str,
+        max_workers: int = 1,
+        schema_cache_path: str = None,
+        refresh_schema: bool = False,
+        projection: PropertyProjection = None,
+        query_cache: QueryCache = None,
         ) -> None:
-        """Create a Neo4j graph wrapper instance and extract schema information."""
+        """Create a Neo4j graph wrapper instance and extract schema information.
+        max_workers is the default number of concurrent extraction queries.
+        If schema_cache_path is given, the schema is loaded from that file when
+        the graph fingerprint did not change, unless refresh_schema is True.
+        With a projection, the instance extraction only fetches the selected properties.
+        With a query_cache, the queries go through the cache (see CachedNeo4jGraph):
+        in replay mode, the schema and the instances come from a recorded session,
+        without a database (the sampling methods replay with the seed they were recorded with)."""
 
-        self.conn = Neo4jGraph(url, username, password, database)
+        self.max_workers = max_workers
+        self.database = database
+        self.schema_cache_path = schema_cache_path
+        # One pooled connection per concurrent extraction query
+        pool_size = max_workers if max_workers > 1 else None
+        if query_cache is not None:
+            self.conn = CachedNeo4jGraph(url, username, password, database, query_cache,
+                                         max_connection_pool_size=pool_size)
+        else:
+            self.conn = Neo4jGraph(url, username, password, database,
+                                   max_connection_pool_size=pool_size)
         self.schema: str = ""
         self.structured_schema: Dict[str, Any] = {}
+        self.schema_index: SchemaIndex = None
+        self._id_upper_bound: int = None
+        self._id_upper_bound_exact = False
+        self.projection = projection
 
         try:
-            self.build_schema()
+            self.build_schema(refresh=refresh_schema)
         except neo4j.exceptions.ClientError:
             raise ValueError(
                 "Could not use APOC procedures. "
@@ -71,19 +342,71 @@ class Neo4jSchema(Neo4jGraph):
         """Returns the schema as a json object."""
         return self.structured_schema
 
-    def build_schema(self) -> None:
-        """Build KG schema as a string or as a json object."""
+    @property
+    def get_schema_index(self) -> SchemaIndex:
+        """Returns the indexed view of the structured schema."""
+        return self.schema_index
+
+    def schema_fingerprint(self) -> str:
+        """Hash of the database name and the per-label / per-type counts.
+        These come from the count store, so it is cheap compared to apoc.meta.data()."""
+        stats = self.conn.query(schema_fingerprint_query)[0]
+        payload = json.dumps({"database": self.database,
+                              "labels": stats["labels"],
+                              "relTypesCount": stats["relTypesCount"]},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-        node_properties = [el["output"] for el in self.conn.query(node_properties_query)]
-        rel_properties = [el["output"] for el in self.conn.query(rel_properties_query)]
-        relationships = [el["output"] for el in self.conn.query(rel_query)]
-    
-        self.structured_schema = {
-            "node_props": {el["label"]: el["properties"] for el in node_properties},
-            "rel_props": {el["type"]: el["properties"] for el in rel_properties},
-            "relationships": relationships,
+    def graph_stats(self) -> Dict[str, Any]:
+        """Returns the node counts per label and the relationship counts per type,
+        {'labels': {label: count}, 'relTypes': {'(:A)-[:T]->()': count, ...}, 'relTypesCount': {type: count}}."""
+        return self.conn.query(graph_stats_query)[0]
+
+    def introspect_schema(self) -> Dict[str, Any]:
+        """Builds the structured schema from a single apoc.meta.data() call."""
+        meta = split_meta_data(self.conn.query(meta_data_query))
+        return {
+            "node_props": {el["label"]: el["properties"] for el in meta["node_properties"]},
+            "rel_props": {el["type"]: el["properties"] for el in meta["rel_properties"]},
+            "relationships": meta["relationships"],
             }
 
+    def build_schema(self,
+                     refresh: bool = False) -> None:
+        """Build KG schema as a string or as a json object.
+        With a schema cache, the cached schema is reused while the fingerprint matches."""
+
+        structured_schema = None
+
+        if self.schema_cache_path:
+            fingerprint = self.schema_fingerprint()
+            if not refresh and os.path.exists(self.schema_cache_path):
+                cached = read_json(self.schema_cache_path)
+                if cached.get("fingerprint") == fingerprint:
+                    structured_schema = cached["structured_schema"]
+
+        if structured_schema is None:
+            structured_schema = self.introspect_schema()
+            if self.schema_cache_path:
+                write_json({"fingerprint": fingerprint,
+                            "structured_schema": structured_schema},
+                           self.schema_cache_path)
+
+        self.set_structured_schema(structured_schema)
+
+    def set_structured_schema(self,
+                              structured_schema: Dict[str, Any]) -> None:
+        """Sets the structured schema, its index and its string description."""
+
+        self.structured_schema = structured_schema
+        self.schema_index = SchemaIndex(self.structured_schema)
+        if self.projection is not None:
+            self.projection.bind(self.schema_index)
+
+        node_properties = [{"label": k, "properties": v} for k, v in structured_schema["node_props"].items()]
+        rel_properties = [{"type": k, "properties": v} for k, v in structured_schema["rel_props"].items()]
+        relationships = structured_schema["relationships"]
+
         # Format node properties
         formatted_node_props = []
         for el in node_properties:
@@ -120,21 +443,121 @@ class Neo4jSchema(Neo4jGraph):
 
 
     #### Instances Utilities ####
+
+    def _node_properties(self,
+                         label: str,
+                         var: str = "p") -> str:
+        """Cypher expression of the fetched properties of a node, all without projection."""
+        if self.projection is None:
+            return f"properties({var})"
+        return self.projection.expression(var, label, self.structured_schema["node_props"].get(label, []))
+
+    def _relationship_properties(self,
+                                 rel: Dict) -> Tuple[str, str, str]:
+        """Cypher expressions of the fetched properties of the a, r, b variables of a triple."""
+        if self.projection is None:
+            return ("properties(a)", "properties(r)", "properties(b)")
+        return (self._node_properties(rel['start'], "a"),
+                self.projection.expression("r", rel['type'], self.structured_schema["rel_props"].get(rel['type'], []),
+                                           relationship=True),
+                self._node_properties(rel['end'], "b"))
+
+    def _node_record(self,
+                     rec: Dict) -> Dict:
+        """Drops the null entries left by the projection from a node instance record."""
+        if self.projection is not None:
+            rec['Instance']['properties'] = drop_null_properties(rec['Instance']['properties'])
+        return rec
+
+    def _relationship_record(self,
+                             rec: Dict) -> Dict:
+        """Drops the null entries left by the projection from a relationship instance record."""
+        if self.projection is not None:
+            for key, props in rec.items():
+                rec[key] = drop_null_properties(props)
+        return rec
+
+    def _node_instances_query(self,
+                              label: str,
+                              n: int) -> str:
+        return f"""MATCH (p:{label}) 
+                        WITH p LIMIT {n}
+                        RETURN {{Label: '{label}', properties: {self._node_properties(label)}}} AS Instance
+                        """
+
+    def _relationship_instances_query(self,
+                                      rel: Dict,
+                                      n: int) -> str:
+        if self.projection is None:
+            return f"""MATCH (a:{rel['start']})-[r:{rel['type']}]->(b:{rel['end']}) 
+                        RETURN a AS {rel['start']}_Start, properties(r) AS {rel['type']}, b AS {rel['end']}_End   
+                        LIMIT {n} """
+        source, relp, target = self._relationship_properties(rel)
+        return f"""MATCH (a:{rel['start']})-[r:{rel['type']}]->(b:{rel['end']}) 
+                        RETURN {source} AS {rel['start']}_Start, {relp} AS {rel['type']}, {target} AS {rel['end']}_End   
+                        LIMIT {n} """
+
+
+    def _fetch_node_instances(self,
+                              label: str,
+                              n: int) -> List[Any]:
+        """Runs the instances query for a single label."""
+        return [self._node_record(rec) for rec in self.conn.query(self._node_instances_query(label, n))]
+
+
+    def _fetch_node_instances_batch(self,
+                                    labels: List[str],
+                                    n: int) -> List[List[Any]]:
+        """Runs one instances query for several labels, returns one list per label."""
+        properties = [self._node_properties(label) for label in labels] if self.projection else None
+        data = self.conn.query(node_instances_batch_query(labels, properties),
+                               {"labels": labels, "n": n})
+        grouped = [[] for _ in labels]
+        for rec in data:
+            grouped[rec["idx"]].append(self._node_record({"Instance": rec["Instance"]}))
+        return grouped
+
+
+    def _fetch_relationship_instances_batch(self,
+                                            rtriples: List[Dict],
+                                            n: int) -> List[List[Any]]:
+        """Runs one instances query for several triples, returns one list per triple."""
+        properties = [self._relationship_properties(rel) for rel in rtriples] if self.projection else None
+        data = self.conn.query(relationship_instances_batch_query(rtriples, properties),
+                               {"n": n})
+        grouped = [[] for _ in rtriples]
+        for rec in data:
+            rel = rtriples[rec["idx"]]
+            grouped[rec["idx"]].append(self._relationship_record({
+                f"{rel['start']}_Start": rec["source"],
+                rel['type']: rec["rel"],
+                f"{rel['end']}_End": rec["target"],
+                }))
+        return grouped
+
     
     def extract_node_instances(self, 
                             selected_labels: List[str], 
-                            n: int) -> List[Any]:
+                            n: int,
+                            batch_size: int = None,
+                            max_workers: int = None) -> List[Any]:
         """
-        Function to extract node instances: attributes & values."""
+        Function to extract node instances: attributes & values.
+        With batch_size set, batch_size labels are extracted per query.
+        Up to max_workers queries (default self.max_workers) run concurrently,
+        the output keeps the order of selected_labels."""
+        max_workers = self.max_workers if max_workers is None else max_workers
+
+        if batch_size:
+            chunks = batched(list(selected_labels), batch_size)
+            fetch = lambda labels: self._fetch_node_instances_batch(labels, n)
+        else:
+            chunks = ([label] for label in selected_labels)
+            fetch = lambda labels: [self._fetch_node_instances(labels[0], n)]
+
         extracted = []
-        for label in selected_labels:
-            query_nodes = f"""MATCH (p:{label}) 
-                            WITH p LIMIT {n}
-                            RETURN {{Label: '{label}', properties: properties(p)}} AS Instance
-                            """
-            
-            data = self.conn.query(query_nodes)
-            extracted.append(data)
+        for grouped in ordered_map(fetch, chunks, max_workers):
+            extracted.extend(grouped)
 
         return extracted
     
@@ -147,36 +570,316 @@ class Neo4jSchema(Neo4jGraph):
         Function to extract instances for a given relationship, written as a triple.
         The data includes properties for both nodes and relationship (if any).
         """
-        extracted = []
-        query_rels = f"""MATCH (a:{rel['start']})-[r:{rel['type']}]->(b:{rel['end']}) 
-                        RETURN a AS {rel['start']}_Start, properties(r) AS {rel['type']}, b AS {rel['end']}_End   
-                        LIMIT {n} """
-        
-        data = self.conn.query(query_rels)
-        return data 
+        data = self.conn.query(self._relationship_instances_query(rel, n))
+        return [self._relationship_record(rec) for rec in data]
     
     
     def extract_multiple_relationships_instances( self,
                             rtriples: List[Any], 
                             n: int,
+                            batch_size: int = None,
+                            max_workers: int = None,
                             ) -> List[Any]:
-        """Extracts n instances of each from a relationships list."""
+        """Extracts n instances of each from a relationships list.
+        With batch_size set, batch_size triples are extracted per query.
+        Up to max_workers queries (default self.max_workers) run concurrently,
+        the output keeps the order of rtriples."""
+        max_workers = self.max_workers if max_workers is None else max_workers
+
+        if batch_size:
+            chunks = batched(list(rtriples), batch_size)
+            fetch = lambda triples: self._fetch_relationship_instances_batch(triples, n)
+        else:
+            chunks = ([rtriple] for rtriple in rtriples)
+            fetch = lambda triples: [self.extract_relationship_instances(triples[0], n)]
+
         extracted = []
-        for rtriple in rtriples:
-            temp_list = self.extract_relationship_instances(rtriple, n)
-            extracted.append(temp_list)
+        for grouped in ordered_map(fetch, chunks, max_workers):
+            extracted.extend(grouped)
+
         return extracted
 
-   
-        
-  
 
-   
+    def extract_node_instances_batched(self,
+                                       selected_labels: List[str],
+                                       n: int,
+                                       batch_size: int = 50,
+                                       max_workers: int = None,
+                                       ) -> List[Any]:
+        """
+        Extracts node instances for batch_size labels per round-trip.
+        The output has the same format as extract_node_instances:
+        one list of {'Instance': {'Label': label, 'properties': {...}}} per label."""
+        return self.extract_node_instances(selected_labels, n, batch_size, max_workers)
 
-    
 
-    
+    def extract_multiple_relationships_instances_batched(self,
+                                                         rtriples: List[Any],
+                                                         n: int,
+                                                         batch_size: int = 50,
+                                                         max_workers: int = None,
+                                                         ) -> List[Any]:
+        """
+        Extracts relationship instances for batch_size triples per round-trip.
+        The output has the same format as extract_multiple_relationships_instances:
+        one list of {start_Start: {...}, type: {...}, end_End: {...}} per triple."""
+        return self.extract_multiple_relationships_instances(rtriples, n, batch_size, max_workers)
 
 
+    #### Sampling Utilities ####
 
-        
+    def node_id_upper_bound(self,
+                            block: int = 1000,
+                            exact: bool = False,
+                            ) -> int:
+        """
+        Bound of the node ids, found with id seeks only: starting from the node count,
+        id blocks [k, k + block) are probed with k doubling until a block is empty, then
+        the last non empty block is found by bisection. Ids after a gap of more than
+        block ids may be missed. With exact, the bound is max(id(n)) + 1 instead, from a
+        scan of all the nodes. Computed once (and once more for exact).
+        """
+        if exact and not self._id_upper_bound_exact:
+            max_id = self.conn.query(max_id_query)[0]["max_id"]
+            self._id_upper_bound = max_id + 1 if max_id is not None else 0
+            self._id_upper_bound_exact = True
+        if self._id_upper_bound is None:
+            probe = lambda low: self.conn.query(id_range_probe_query,
+                                                {"low": low, "high": low + block - 1})[0]["max_id"]
+            low = high = max(self.conn.query(node_count_query)[0]["count"], 1)
+            upper = low
+            max_id = probe(high)
+            while max_id is not None:
+                upper, low = max_id + 1, high
+                high *= 2
+                max_id = probe(high)
+            # The block at low has nodes (or low is the node count), the block at high has none
+            while high - low > block:
+                mid = (low + high) // 2
+                max_id = probe(mid)
+                if max_id is None:
+                    high = mid
+                else:
+                    upper, low = max(upper, max_id + 1), mid
+            self._id_upper_bound = upper
+        return self._id_upper_bound
+
+
+    def _sample_by_ids(self,
+                       query: str,
+                       params: Dict[str, Any],
+                       n: int,
+                       rng: random.Random,
+                       deadline: float,
+                       id_pool: List[int] = None,
+                       hit_rate: float = 1.0,
+                       max_batch: int = 10000,
+                       ) -> List[Dict]:
+        """
+        Runs the sampling query on batches of candidate ids until it returned n rows,
+        the deadline passed or the candidates ran out.
+        The candidates are the shuffled id_pool, or random ids below node_id_upper_bound,
+        drawn without replacement, with batches sized from the observed hit rate. When the
+        ids below the probed bound ran out first, the ids up to the exact bound are drawn
+        too: the probes may have stopped at a gap of the id space.
+        """
+        rows = []
+        if id_pool is not None:
+            rng.shuffle(id_pool)
+        else:
+            upper = self.node_id_upper_bound()
+            tried = set()
+        probes = 0
+
+        while len(rows) < n and perf_counter() < deadline:
+            missing = n - len(rows)
+            if id_pool is not None:
+                if not id_pool:
+                    break
+                ids = id_pool[-missing:]
+                del id_pool[-missing:]
+            else:
+                if len(tried) >= upper:
+                    if self._id_upper_bound_exact:
+                        break
+                    upper = self.node_id_upper_bound(exact=True)
+                    continue
+                size = min(max_batch, upper - len(tried), max(missing, int(missing / hit_rate * 1.2)))
+                ids = []
+                while len(ids) < size:
+                    i = rng.randrange(upper)
+                    if i not in tried:
+                        tried.add(i)
+                        ids.append(i)
+            rows.extend(self.conn.query(query, dict(params, ids=ids)))
+            probes += len(ids)
+            # At least one hit per id space, so that the batches stay bounded
+            hit_rate = max(len(rows) / probes, 1 / upper) if id_pool is None else 1.0
+
+        return rows[:n]
+
+
+    def sample_label_instances(self,
+                               label: str,
+                               n: int,
+                               seed: Any = None,
+                               time_budget: float = 10.0,
+                               scan_threshold: int = 10000,
+                               ) -> List[Dict]:
+        """
+        Random sample of up to n instances of a label, in the format of extract_node_instances.
+        Labels of at most scan_threshold nodes are sampled from the list of their ids,
+        larger labels by seeking random node ids: the cost depends on n and the share of the
+        label among the nodes, not on the label size (the ids past the probed bound are only
+        drawn, after a scan of all the nodes, when the ones below it ran out, see _sample_by_ids).
+        Stops after time_budget seconds, with the instances found so far. The same seed gives
+        the same sample of the same graph.
+        """
+        deadline = perf_counter() + time_budget
+        rng = random.Random(f"{seed}|{label}") if seed is not None else random.Random()
+        count = self.conn.query(label_count_query(label))[0]["count"]
+        if count == 0:
+            return []
+
+        id_pool = None
+        hit_rate = 1.0
+        if count <= scan_threshold:
+            id_pool = [rec["id"] for rec in self.conn.query(label_ids_query(label))]
+        else:
+            hit_rate = count / max(self.node_id_upper_bound(), count)
+
+        rows = self._sample_by_ids(node_sample_query(label, self._node_properties(label)), {},
+                                   n, rng, deadline, id_pool, hit_rate)
+        return [self._node_record({"Instance": {"Label": label, "properties": row["properties"]}}) for row in rows]
+
+
+    def sample_triple_instances(self,
+                                rel: Dict,
+                                n: int,
+                                seed: Any = None,
+                                time_budget: float = 10.0,
+                                scan_threshold: int = 10000,
+                                per_node: int = 1,
+                                max_expand: int = 1000,
+                                ) -> List[Dict]:
+        """
+        Random sample of up to n instances of a relationship triple, in the format of
+        extract_relationship_instances. The start nodes are sampled as in
+        sample_label_instances (among the start nodes of the triple, for start labels
+        of at most scan_threshold nodes) and up to per_node random relationships are expanded
+        from each, among its first max_expand ones: instances are drawn per start node, not
+        uniformly over the relationships. The seed fixes the start nodes, the relationships
+        of a start node are drawn by the database.
+        """
+        deadline = perf_counter() + time_budget
+        rng = random.Random(f"{seed}|{rel['start']}|{rel['type']}|{rel['end']}") if seed is not None else random.Random()
+        count = self.conn.query(label_count_query(rel['start']))[0]["count"]
+        if count == 0:
+            return []
+
+        id_pool = None
+        hit_rate = 1.0
+        if count <= scan_threshold:
+            id_pool = [rec["id"] for rec in self.conn.query(start_ids_query(rel))]
+        else:
+            hit_rate = count / max(self.node_id_upper_bound(), count)
+
+        rows = self._sample_by_ids(relationship_sample_query(rel, self._relationship_properties(rel)),
+                                   {"per_node": per_node, "max_expand": max_expand},
+                                   n, rng, deadline, id_pool, hit_rate)
+        return [self._relationship_record({f"{rel['start']}_Start": row["source"],
+                                           rel['type']: row["rel"],
+                                           f"{rel['end']}_End": row["target"]})
+                for row in rows]
+
+
+    def sample_node_instances(self,
+                              selected_labels: List[str],
+                              n: int,
+                              seed: Any = None,
+                              time_budget: float = 10.0,
+                              scan_threshold: int = 10000,
+                              max_workers: int = None,
+                              ) -> List[Any]:
+        """
+        Sampling version of extract_node_instances: up to n random instances per label
+        (see sample_label_instances), time_budget seconds at most per label.
+        Up to max_workers labels (default self.max_workers) are sampled concurrently,
+        the output keeps the order of selected_labels.
+        """
+        max_workers = self.max_workers if max_workers is None else max_workers
+        fetch = lambda label: self.sample_label_instances(label, n, seed, time_budget, scan_threshold)
+        return list(ordered_map(fetch, selected_labels, max_workers))
+
+
+    def sample_multiple_relationships_instances(self,
+                                                rtriples: List[Any],
+                                                n: int,
+                                                seed: Any = None,
+                                                time_budget: float = 10.0,
+                                                scan_threshold: int = 10000,
+                                                per_node: int = 1,
+                                                max_expand: int = 1000,
+                                                max_workers: int = None,
+                                                ) -> List[Any]:
+        """
+        Sampling version of extract_multiple_relationships_instances: up to n random
+        instances per triple (see sample_triple_instances), time_budget seconds at most
+        per triple. The output keeps the order of rtriples.
+        """
+        max_workers = self.max_workers if max_workers is None else max_workers
+        fetch = lambda rel: self.sample_triple_instances(rel, n, seed, time_budget, scan_threshold,
+                                                         per_node, max_expand)
+        return list(ordered_map(fetch, rtriples, max_workers))
+
+
+    #### Streaming Utilities ####
+
+    def stream_node_instances(self,
+                              selected_labels: List[str],
+                              n: int,
+                              fetch_size: int = 1000,
+                              ) -> Iterator[Dict]:
+        """Yields the node instances one record at a time, label after label."""
+        for label in selected_labels:
+            for rec in self.conn.stream(self._node_instances_query(label, n),
+                                        fetch_size=fetch_size):
+                yield self._node_record(rec)
+
+
+    def stream_relationships_instances(self,
+                                       rtriples: List[Any],
+                                       n: int,
+                                       fetch_size: int = 1000,
+                                       ) -> Iterator[Dict]:
+        """Yields the relationship instances one record at a time, triple after triple."""
+        for rtriple in rtriples:
+            for rec in self.conn.stream(self._relationship_instances_query(rtriple, n),
+                                        fetch_size=fetch_size):
+                yield self._relationship_record(rec)
+
+
+    def write_node_instances_jsonl(self,
+                                   selected_labels: List[str],
+                                   n: int,
+                                   file_path: str,
+                                   fetch_size: int = 1000,
+                                   ) -> int:
+        """Streams the node instances to a json lines snapshot, with temporal and spatial
+        values serialized on the way. Returns the number of records written.
+        Read it back with graph_utils.read_node_instances_jsonl."""
+        records = self.stream_node_instances(selected_labels, n, fetch_size)
+        return write_jsonl(records, file_path, cls=Neo4jJSONEncoder)
+
+
+    def write_relationships_instances_jsonl(self,
+                                            rtriples: List[Any],
+                                            n: int,
+                                            file_path: str,
+                                            fetch_size: int = 1000,
+                                            ) -> int:
+        """Streams the relationship instances to a json lines snapshot, with temporal and
+        spatial values serialized on the way. Returns the number of records written.
+        Read it back with graph_utils.read_relationships_instances_jsonl."""
+        records = self.stream_relationships_instances(rtriples, n, fetch_size)
+        return write_jsonl(records, file_path, cls=Neo4jJSONEncoder)
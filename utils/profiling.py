@@ -0,0 +1,162 @@
+"""Per-generator profiling of a dataset build.
+
+profile_generator runs one generator (the iter_* sampler behind it) through
+collect_samples, counting the candidates as they stream by, and records the candidate and emitted counts, the wall
+times, the peak memory and the subschema rendering work. The records of a
+run are saved as a json or csv report, and summarized by the top generators
+for a given measure."""
+
+from typing import Any, List, Dict, Callable, Iterable, Tuple
+from time import perf_counter
+import csv
+import tracemalloc
+
+# Import local modules
+from utils.utilities import *
+
+
+class CountingIterator:
+    """Iterator over entries that counts the entries it yielded."""
+
+    def __init__(self, entries: Iterable[Any]) -> None:
+        self.count = 0
+        self._entries = iter(entries)
+
+    def __iter__(self) -> "CountingIterator":
+        return self
+
+    def __next__(self) -> Any:
+        entry = next(self._entries)
+        self.count += 1
+        return entry
+
+# Columns of the report, in order
+PROFILE_FIELDS = [
+    "name",
+    "candidates",
+    "emitted",
+    "seconds",
+    "generate_seconds",
+    "sample_seconds",
+    "peak_mb",
+    "render_seconds",
+    "render_misses",
+    "render_hits",
+    "duplicates",
+]
+
+
+def profile_generator(name: str,
+                      generator: Callable[[Any], Iterable[Dict]],
+                      ctx: Any,
+                      sample_max: int,
+                      seed: Any = None,
+                      trace_memory: bool = False,
+                      ) -> Tuple[List[Dict], Dict[str, Any]]:
+    """
+    Runs a generator on a GeneratorContext and samples its output.
+
+    Input:
+    - generator: function of the context returning the candidate samples,
+    an iterator is sampled on the fly (only the selected samples are kept)
+    - sample_max, seed: arguments of collect_samples
+    - trace_memory: record the peak of the allocations with tracemalloc,
+    which slows the run down
+
+    Output:
+    - the selected samples
+    - the profile record, with the keys of PROFILE_FIELDS (duplicates is None,
+    it is filled in by add_duplicates once the samples are merged)
+    """
+    renderer = ctx.subschema_renderer
+    before = renderer.cache_info()
+
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+
+    start = perf_counter()
+    try:
+        candidates = generator(ctx)
+        generated = perf_counter()
+        sampler = candidates if isinstance(candidates, list) else CountingIterator(candidates)
+        samples = collect_samples(sampler, sample_max, seed)
+        end = perf_counter()
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+    after = renderer.cache_info()
+    record = {"name": name,
+              "candidates": len(sampler) if isinstance(sampler, list) else sampler.count,
+              "emitted": len(samples),
+              "seconds": end - start,
+              "generate_seconds": generated - start,
+              "sample_seconds": end - generated,
+              "peak_mb": peak / 2**20 if peak is not None else None,
+              "render_seconds": after["render_seconds"] - before["render_seconds"],
+              "render_misses": after["misses"] - before["misses"],
+              "render_hits": after["hits"] - before["hits"],
+              "duplicates": None}
+    return samples, record
+
+
+def add_duplicates(records: List[Dict[str, Any]],
+                   dedup_stats: Dict[str, Dict[str, Any]],
+                   ) -> None:
+    """Sets the number of duplicates dropped per generator, from Deduplicator.stats()."""
+    for record in records:
+        stats = dedup_stats.get(record["name"])
+        if stats is not None:
+            record["duplicates"] = stats["exact"] + stats["near"]
+
+
+def write_profile_report(records: List[Dict[str, Any]],
+                         file_path: str,
+                         ) -> None:
+    """Saves the profile records to a csv file (.csv extension) or a json file."""
+    rows = [{field: record.get(field) for field in PROFILE_FIELDS} for record in records]
+    if file_path.endswith(".csv"):
+        with open(file_path, "w", newline="") as fp:
+            writer = csv.DictWriter(fp, fieldnames=PROFILE_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    else:
+        write_json(rows, file_path)
+
+
+def render_report(records: List[Dict[str, Any]]
+                  ) -> str:
+    """One line summary of the subschema cache usage of the profiled generators,
+    summed over the workers (see SubschemaRenderer.report)."""
+    hits = sum(r["render_hits"] for r in records)
+    misses = sum(r["render_misses"] for r in records)
+    calls = hits + misses
+    return (f"Subschema cache: {hits} hits, {misses} misses, "
+            f"hit rate {hits / calls if calls else 0.0:.1%}, "
+            f"{sum(r['render_seconds'] for r in records):.2f}s rendering")
+
+
+def profile_summary(records: List[Dict[str, Any]],
+                    top: int = 10,
+                    key: str = "seconds",
+                    ) -> str:
+    """Table of the top generators for a measure of PROFILE_FIELDS, with the run totals."""
+    ranked = sorted((r for r in records if r.get(key) is not None), key=lambda r: r[key], reverse=True)
+    total_seconds = sum(r["seconds"] for r in records) or 1.0
+    width = max([len(r["name"]) for r in ranked[:top]] + [9])
+
+    lines = [f"Top {min(top, len(ranked))} generators by {key}:",
+             f"{'generator':<{width}} {'candidates':>10} {'emitted':>8} {'seconds':>8} {'share':>6} "
+             f"{'peak MB':>8} {'render s':>8} {'dups':>6}"]
+    for r in ranked[:top]:
+        peak = f"{r['peak_mb']:.1f}" if r.get("peak_mb") is not None else "-"
+        dups = r["duplicates"] if r.get("duplicates") is not None else "-"
+        lines.append(f"{r['name']:<{width}} {r['candidates']:>10} {r['emitted']:>8} {r['seconds']:>8.3f} "
+                     f"{r['seconds'] / total_seconds:>6.1%} {peak:>8} {r['render_seconds']:>8.3f} {dups:>6}")
+    lines.append(f"{len(records)} generators, {sum(r['candidates'] for r in records)} candidates, "
+                 f"{sum(r['emitted'] for r in records)} emitted, {sum(r['seconds'] for r in records):.2f}s")
+    return "\n".join(lines)
@@ -0,0 +1,159 @@
+"""Persistent record / replay cache of Cypher query results.
+
+Results are stored in a local sqlite file, keyed by the database, the Cypher
+text and the parameters, so that a recorded session can be replayed without
+a database (see neo4j_conn.CachedNeo4jGraph). The modes are:
+- record: results are served from the cache, the misses are queried and stored
+- replay: results are served from the cache only, a miss raises a LookupError
+- passthrough: the cache is not used
+Entries older than ttl seconds are ignored and removed, and the least
+recently used entries are evicted beyond max_entries or max_bytes."""
+
+from typing import Any, Dict
+from time import time as now
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+
+RECORD = "record"
+REPLAY = "replay"
+PASSTHROUGH = "passthrough"
+MODES = (RECORD, REPLAY, PASSTHROUGH)
+
+# Returned by QueryCache.get for a missing or expired entry
+MISSING = object()
+
+
+def query_key(database: str,
+              cypher_query: str,
+              params: Dict[str, Any] = None,
+              ) -> str:
+    """Hash of the database, the Cypher text and the parameters."""
+    payload = json.dumps([database, cypher_query, params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class QueryCache:
+    """sqlite store of query results, safe to share between threads."""
+
+    def __init__(self,
+                 file_path: str,
+                 mode: str = RECORD,
+                 ttl: float = None,
+                 max_entries: int = None,
+                 max_bytes: int = None,
+                 ) -> None:
+        """
+        - file_path: sqlite file of the cache, created if needed
+        - mode: record, replay or passthrough
+        - ttl: lifetime of an entry in seconds, unlimited by default
+        - max_entries, max_bytes: size bounds, unbounded by default
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {', '.join(MODES)}.")
+        self.file_path = file_path
+        self.mode = mode
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(file_path, check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                                key TEXT PRIMARY KEY,
+                                query TEXT,
+                                created REAL,
+                                accessed REAL,
+                                size INTEGER,
+                                value BLOB)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._db.commit()
+
+    def __repr__(self) -> str:
+        return f"QueryCache({self.file_path!r}, mode={self.mode!r}, entries={len(self)})"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM entries").fetchone()[0]
+
+    def __enter__(self) -> "QueryCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Closes the sqlite file."""
+        with self._lock:
+            self._db.close()
+
+    def get(self,
+            key: str,
+            ) -> Any:
+        """Cached result of a query key, MISSING if it is not cached or expired."""
+        with self._lock:
+            row = self._db.execute("SELECT created, value FROM entries WHERE key = ?", (key,)).fetchone()
+            t = now()
+            if row is not None and self.ttl is not None and t - row[0] > self.ttl:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return MISSING
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (t, key))
+            self._db.commit()
+            self.hits += 1
+        return pickle.loads(row[1])
+
+    def put(self,
+            key: str,
+            value: Any,
+            query: str = None,
+            ) -> None:
+        """Stores the result of a query key, then evicts the least recently used
+        entries beyond the size bounds."""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        t = now()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, query, t, t, len(blob), blob))
+            self._evict()
+            self._db.commit()
+
+    def _evict(self) -> None:
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM entries WHERE created < ?", (now() - self.ttl,))
+        if self.max_entries is not None:
+            self._db.execute("""DELETE FROM entries WHERE key IN (
+                                    SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)""",
+                             (self.max_entries,))
+        if self.max_bytes is not None:
+            total = self._db.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+
+    def clear(self) -> None:
+        """Removes all the entries."""
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Returns hits, misses, number of entries and their size in bytes."""
+        with self._lock:
+            entries, size = self._db.execute("SELECT count(*), coalesce(sum(size), 0) FROM entries").fetchone()
+        calls = self.hits + self.misses
+        return {"mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "bytes": size,
+                "hit_rate": self.hits / calls if calls else 0.0}
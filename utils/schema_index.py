@@ -0,0 +1,129 @@
+"""Precomputed lookup tables over a structured_schema"""
+
+from typing import Any, List, Dict, Tuple
+
+
+class SchemaIndex:
+    """Indexed view of the structured_schema built by Neo4jSchema.
+
+    The raw schema is walked once at construction time; afterwards the
+    lookups used by graph_utils are plain dictionary accesses."""
+
+    def __init__(self,
+                 jschema: Dict[str, Any],
+                 ) -> None:
+        """Build the lookup tables from a structured schema dictionary
+        with keys node_props, rel_props, relationships."""
+
+        self.node_props: Dict[str, List[Dict]] = jschema['node_props']
+        self.rel_props: Dict[str, List[Dict]] = jschema['rel_props']
+        self.relationships: List[Dict] = jschema['relationships']
+
+        # (label, datatype) -> [property, ...] and (label, property) -> datatype
+        self._node_props_by_dtype: Dict[Tuple[str, str], List[str]] = {}
+        self._node_prop_dtype: Dict[Tuple[str, str], str] = {}
+        self._node_prop_names: Dict[str, List[str]] = {}
+        node_dtypes: Dict[str, None] = {}
+
+        for label, props in self.node_props.items():
+            self._node_prop_names[label] = [el['property'] for el in props]
+            for el in props:
+                dtype = el['datatype']
+                self._node_props_by_dtype.setdefault((label, dtype), []).append(el['property'])
+                self._node_prop_dtype.setdefault((label, el['property']), dtype)
+                node_dtypes[dtype] = None
+
+        # (type, datatype) -> [property, ...] and (type, property) -> datatype
+        self._rel_props_by_dtype: Dict[Tuple[str, str], List[str]] = {}
+        self._rel_prop_dtype: Dict[Tuple[str, str], str] = {}
+        rel_dtypes: Dict[str, None] = {}
+
+        for rtype, props in self.rel_props.items():
+            for prop in props:
+                dtype = prop.get('datatype')
+                if dtype:
+                    self._rel_props_by_dtype.setdefault((rtype, dtype), []).append(prop['property'])
+                    self._rel_prop_dtype.setdefault((rtype, prop['property']), dtype)
+                    rel_dtypes[dtype] = None
+
+        # label -> {datatype: [property, ...]} and type -> {datatype: [property, ...]}
+        self._node_props_grouped: Dict[str, Dict[str, List[str]]] = {}
+        for (label, dtype), props in self._node_props_by_dtype.items():
+            self._node_props_grouped.setdefault(label, {})[dtype] = props
+        self._rel_props_grouped: Dict[str, Dict[str, List[str]]] = {}
+        for (rtype, dtype), props in self._rel_props_by_dtype.items():
+            self._rel_props_grouped.setdefault(rtype, {})[dtype] = props
+
+        # Keep the insertion order so that repeated runs are deterministic
+        self.node_datatypes: List[str] = list(node_dtypes)
+        self.rel_datatypes: List[str] = list(rel_dtypes)
+
+        # type -> [{start, type, end}, ...]
+        self._triples_by_type: Dict[str, List[Dict]] = {}
+        for el in self.relationships:
+            self._triples_by_type.setdefault(el['type'], []).append(el)
+
+    def __repr__(self) -> str:
+        return (f"SchemaIndex(labels={len(self.node_props)}, "
+                f"rel_types={len(self.rel_props)}, "
+                f"triples={len(self.relationships)})")
+
+    #### Nodes ####
+
+    def labels(self) -> List[str]:
+        """Returns the list of node labels."""
+        return list(self.node_props.keys())
+
+    def node_properties(self,
+                        label: str,
+                        datatype: str = "",
+                        ) -> List[str]:
+        """Returns the node properties, optionally only those of a given datatype."""
+        if datatype:
+            return self._node_props_by_dtype.get((label, datatype), [])
+        return self._node_prop_names[label]
+
+    def node_properties_by_datatype(self,
+                                    label: str,
+                                    ) -> Dict[str, List[str]]:
+        """Returns {datatype: [property, ...]} for a node label, datatypes in schema order."""
+        return self._node_props_grouped.get(label, {})
+
+    def node_property_datatype(self,
+                               label: str,
+                               prop: str,
+                               ) -> Any:
+        """Returns the datatype of a node property, None if not in the schema."""
+        return self._node_prop_dtype.get((label, prop))
+
+    #### Relationships ####
+
+    def rel_types(self) -> List[str]:
+        """Returns the list of relationship types that carry properties."""
+        return list(self.rel_props.keys())
+
+    def rel_properties(self,
+                       rtype: str,
+                       datatype: str,
+                       ) -> List[str]:
+        """Returns the properties of given datatype for a relationship type."""
+        return self._rel_props_by_dtype.get((rtype, datatype), [])
+
+    def rel_properties_by_datatype(self,
+                                   rtype: str,
+                                   ) -> Dict[str, List[str]]:
+        """Returns {datatype: [property, ...]} for a relationship type, datatypes in schema order."""
+        return self._rel_props_grouped.get(rtype, {})
+
+    def rel_property_datatype(self,
+                              rtype: str,
+                              prop: str,
+                              ) -> Any:
+        """Returns the datatype of a relationship property, None if not in the schema."""
+        return self._rel_prop_dtype.get((rtype, prop))
+
+    def triples(self,
+                rtype: str,
+                ) -> List[Dict]:
+        """Returns the (start, type, end) triples for a relationship type."""
+        return self._triples_by_type.get(rtype, [])
@@ -0,0 +1,313 @@
+"""Compact binary snapshots of extracted node and relationship instances"""
+
+from typing import Any, List, Dict, Iterable, Iterator, Tuple, Union
+import json
+import mmap
+import os
+import struct
+import zlib
+
+# Import local modules
+from utils.utilities import read_json
+
+# File layout:
+#   MAGIC
+#   one block per group (label or relationship triple), each block is a
+#   sequence of records framed as <uint32 length><payload>, the whole block
+#   is optionally zlib compressed
+#   footer: json index with the string table and the block offsets
+#   <uint64 footer offset> MAGIC
+MAGIC = b"CYSNAP01"
+_LENGTH = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+NODES = "nodes"
+RELATIONSHIPS = "relationships"
+
+
+class StringTable:
+    """Interns labels, property names and relationship keys as integer ids."""
+
+    def __init__(self,
+                 strings: List[str] = None,
+                 ) -> None:
+        self.strings: List[str] = list(strings or [])
+        self._ids: Dict[str, int] = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self,
+               s: str,
+               ) -> int:
+        """Returns the id of the string, adding it to the table if needed."""
+        idx = self._ids.get(s)
+        if idx is None:
+            idx = self._ids[s] = len(self.strings)
+            self.strings.append(s)
+        return idx
+
+    def __getitem__(self,
+                    idx: int,
+                    ) -> str:
+        return self.strings[idx]
+
+
+#### Record codecs ####
+
+def _encode_props(props: Dict, table: StringTable) -> List:
+    return [[table.intern(k) for k in props], list(props.values())]
+
+
+def _decode_props(encoded: List, table: StringTable) -> Dict:
+    strings = table.strings
+    return {strings[k]: v for k, v in zip(encoded[0], encoded[1])}
+
+
+def encode_node_record(rec: Dict, table: StringTable) -> List:
+    """{'Instance': {'Label': label, 'properties': {...}}} -> [label_id, [prop_ids], [values]]"""
+    inst = rec['Instance']
+    return [table.intern(inst['Label'])] + _encode_props(inst['properties'], table)
+
+
+def decode_node_record(encoded: List, table: StringTable) -> Dict:
+    """Inverse of encode_node_record."""
+    return {'Instance': {'Label': table[encoded[0]],
+                         'properties': _decode_props(encoded[1:], table)}}
+
+
+def encode_relationship_record(rec: Dict, table: StringTable) -> List:
+    """{start_Start: {...}, type: {...}, end_End: {...}} -> [[key_id, [prop_ids], [values]], ...]"""
+    return [[table.intern(k)] + _encode_props(v, table) for k, v in rec.items()]
+
+
+def decode_relationship_record(encoded: List, table: StringTable) -> Dict:
+    """Inverse of encode_relationship_record."""
+    return {table[e[0]]: _decode_props(e[1:], table) for e in encoded}
+
+
+_CODECS = {
+    NODES: (encode_node_record, decode_node_record),
+    RELATIONSHIPS: (encode_relationship_record, decode_relationship_record),
+}
+
+
+def group_key(group: List[Dict],
+              kind: str,
+              ) -> Any:
+    """Key of a non empty group of records: the label for nodes,
+    the (start, type, end) triple for relationships."""
+    rec = group[0]
+    if kind == NODES:
+        return rec['Instance']['Label']
+    keys = list(rec.keys())
+    return (keys[0][:-6], keys[1], keys[2][:-4])
+
+
+def _index_key(key: Any) -> str:
+    return key if isinstance(key, str) else "\x1f".join(key)
+
+
+#### Writer ####
+
+def write_snapshot(groups: Iterable[List[Dict]],
+                   file_path: str,
+                   kind: str,
+                   keys: List[Any] = None,
+                   compress: bool = True,
+                   meta: Dict[str, Any] = None,
+                   ) -> int:
+    """
+    Writes node or relationship instances to a binary snapshot.
+
+    Input:
+    - groups: instances as returned by extract_node_instances (kind="nodes")
+    or extract_multiple_relationships_instances (kind="relationships")
+    - keys: optional label / triple dict for each group, needed to keep empty groups;
+    by default the key is read from the first record and empty groups are skipped.
+    A key may appear once, a ValueError is raised (and no file is left) otherwise
+    - compress: zlib compress each group block
+    - meta: extra json data stored in the footer
+
+    Output:
+    - number of records written
+    """
+    encode, _ = _CODECS[kind]
+    table = StringTable()
+    index = []
+    seen = set()
+    count = 0
+
+    with open(file_path, "wb") as fp:
+        fp.write(MAGIC)
+        for i, group in enumerate(groups):
+            if keys is not None:
+                key = keys[i]
+                if isinstance(key, dict):
+                    key = (key['start'], key['type'], key['end'])
+            elif group:
+                key = group_key(group, kind)
+            else:
+                continue
+            if _index_key(key) in seen:
+                fp.close()
+                os.remove(file_path)
+                raise ValueError(f"Duplicate snapshot group {key}, each label / triple is written once.")
+            seen.add(_index_key(key))
+
+            block = bytearray()
+            for rec in group:
+                payload = json.dumps(encode(rec, table), separators=(",", ":")).encode("utf-8")
+                block += _LENGTH.pack(len(payload))
+                block += payload
+            data = zlib.compress(bytes(block)) if compress else bytes(block)
+
+            index.append([key if isinstance(key, str) else list(key), fp.tell(), len(data), len(group)])
+            fp.write(data)
+            count += len(group)
+
+        footer_offset = fp.tell()
+        footer = {"kind": kind,
+                  "compressed": compress,
+                  "strings": table.strings,
+                  "groups": index,
+                  "meta": meta or {}}
+        fp.write(json.dumps(footer).encode("utf-8"))
+        fp.write(_OFFSET.pack(footer_offset))
+        fp.write(MAGIC)
+
+    return count
+
+
+def write_node_instances_snapshot(node_instances: Iterable[List[Dict]],
+                                  file_path: str,
+                                  labels: List[str] = None,
+                                  compress: bool = True,
+                                  ) -> int:
+    """Writes extracted node instances to a binary snapshot."""
+    return write_snapshot(node_instances, file_path, NODES, labels, compress)
+
+
+def write_relationships_instances_snapshot(rels_instances: Iterable[List[Dict]],
+                                           file_path: str,
+                                           relationships: List[Dict] = None,
+                                           compress: bool = True,
+                                           ) -> int:
+    """Writes extracted relationship instances to a binary snapshot."""
+    return write_snapshot(rels_instances, file_path, RELATIONSHIPS, relationships, compress)
+
+
+#### Reader ####
+
+class InstanceSnapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Only the footer is parsed when the file is opened; the records of a
+    label or triple are decoded when that group is requested. Iterating
+    the snapshot yields the groups in the format of the extract_* methods,
+    so it can be passed to the graph_utils parsers as is.
+    """
+
+    def __init__(self,
+                 file_path: str,
+                 ) -> None:
+        self.file_path = file_path
+        self._fp = open(file_path, "rb")
+        self._mm = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        tail = len(MAGIC) + _OFFSET.size
+        if self._mm[:len(MAGIC)] != MAGIC or self._mm[-len(MAGIC):] != MAGIC:
+            self.close()
+            raise ValueError(f"{file_path} is not a snapshot file.")
+        footer_offset = _OFFSET.unpack(self._mm[-tail:-len(MAGIC)])[0]
+        footer = json.loads(self._mm[footer_offset:-tail].decode("utf-8"))
+
+        self.kind: str = footer["kind"]
+        self.compressed: bool = footer["compressed"]
+        self.meta: Dict[str, Any] = footer["meta"]
+        self.table = StringTable(footer["strings"])
+        self._decode = _CODECS[self.kind][1]
+        self._groups: Dict[str, Tuple[Any, int, int, int]] = {}
+        for key, offset, length, count in footer["groups"]:
+            key = key if isinstance(key, str) else tuple(key)
+            self._groups[_index_key(key)] = (key, offset, length, count)
+
+    def __enter__(self) -> "InstanceSnapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Releases the memory map and the file."""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def __repr__(self) -> str:
+        return f"InstanceSnapshot({self.file_path!r}, kind={self.kind!r}, groups={len(self._groups)})"
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def keys(self) -> List[Any]:
+        """Labels (nodes) or (start, type, end) triples (relationships) in the snapshot."""
+        return [entry[0] for entry in self._groups.values()]
+
+    def count(self,
+              key: Any,
+              ) -> int:
+        """Number of records of a group, without decoding it."""
+        return self._groups[_index_key(key)][3]
+
+    def __contains__(self, key: Any) -> bool:
+        return _index_key(key) in self._groups
+
+    def iter_group(self,
+                   key: Any,
+                   ) -> Iterator[Dict]:
+        """Decodes the records of one label / triple lazily."""
+        _, offset, length, _ = self._groups[_index_key(key)]
+        block = self._mm[offset:offset + length]
+        if self.compressed:
+            block = zlib.decompress(block)
+        view = memoryview(block)
+        pos = 0
+        table = self.table
+        while pos < len(view):
+            size = _LENGTH.unpack_from(view, pos)[0]
+            pos += _LENGTH.size
+            yield self._decode(json.loads(bytes(view[pos:pos + size])), table)
+            pos += size
+
+    def __getitem__(self,
+                    key: Any,
+                    ) -> List[Dict]:
+        """Records of one label / triple."""
+        return list(self.iter_group(key))
+
+    def __iter__(self) -> Iterator[List[Dict]]:
+        for key in self.keys():
+            yield self[key]
+
+    def groups(self,
+               keys: List[Any] = None,
+               ) -> List[List[Dict]]:
+        """Records of the selected labels / triples (all by default), one list per group.
+        Missing keys are skipped."""
+        if keys is None:
+            return list(self)
+        keys = [(k['start'], k['type'], k['end']) if isinstance(k, dict) else k for k in keys]
+        return [self[k] for k in keys if k in self]
+
+
+def read_instances(file_path: str,
+                   keys: List[Any] = None,
+                   ) -> List[List[Dict]]:
+    """Reads serialized instances from a binary snapshot (.snap), only the groups of
+    the given labels / triples when keys is set, or all the groups of a json file."""
+    if file_path.endswith(".snap"):
+        with InstanceSnapshot(file_path) as snapshot:
+            return snapshot.groups(keys)
+    return read_json(file_path)
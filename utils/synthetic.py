@@ -0,0 +1,128 @@
+"""Synthetic schema and instances, shaped like the Neo4jSchema outputs.
+
+Used to benchmark and profile the pipeline without a graph database. The
+structured schema, the node instances and the relationship instances have
+the formats of get_structured_schema, extract_node_instances and
+extract_multiple_relationships_instances, with serialized temporal values."""
+
+from typing import Any, List, Dict, Tuple
+import random
+
+# apoc.meta.data property types, with their relative frequency
+DATATYPES: Dict[str, int] = {
+    "STRING": 5,
+    "INTEGER": 2,
+    "FLOAT": 1,
+    "DATE": 1,
+    "DATE_TIME": 1,
+    "BOOLEAN": 1,
+}
+
+# Size of the graph the notebook is tuned for, the unit of the scale factors
+BASE_GRAPH: Dict[str, int] = {
+    "labels": 8,
+    "props_per_label": 5,
+    "rel_types": 6,
+    "rel_props_per_type": 2,
+    "triples": 12,
+    "instances": 12,
+}
+
+_WORDS = ["graph", "neural", "network", "learning", "quantum", "theory", "model", "data",
+          "analysis", "system", "method", "algebra", "field", "energy", "protein", "language"]
+
+
+def scaled_graph(factor: float,
+                 **overrides: Any,
+                 ) -> Dict[str, int]:
+    """
+    Parameters of synthetic_graph for a graph factor times BASE_GRAPH: the number
+    of labels, relationship types and triples grow with the factor, the properties
+    per label and the instances per label / triple (fixed by the extraction) do not.
+    """
+    params = dict(BASE_GRAPH)
+    for key in ("labels", "rel_types", "triples"):
+        params[key] = max(1, int(round(params[key] * factor)))
+    params.update(overrides)
+    return params
+
+
+def _value(datatype: str,
+           rng: random.Random,
+           ) -> Any:
+    """Random serialized value of a datatype."""
+    if datatype == "STRING":
+        return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4)))
+    if datatype == "INTEGER":
+        return rng.randint(0, 10_000)
+    if datatype == "FLOAT":
+        return round(rng.uniform(0, 1000), 3)
+    if datatype == "DATE":
+        return f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    if datatype == "DATE_TIME":
+        return (f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} T "
+                f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d} UTC")
+    return rng.random() < 0.5
+
+
+def synthetic_graph(labels: int = 8,
+                    props_per_label: int = 5,
+                    rel_types: int = 6,
+                    rel_props_per_type: int = 2,
+                    triples: int = 12,
+                    instances: int = 12,
+                    datatypes: Dict[str, int] = None,
+                    fill_rate: float = 0.85,
+                    seed: int = 0,
+                    ) -> Tuple[Dict[str, Any], List[List[Dict]], List[List[Dict]]]:
+    """
+    Builds a random graph schema and instances.
+
+    Input:
+    - labels, props_per_label: node labels and properties per label
+    - rel_types, rel_props_per_type: relationship types, half of them carry properties
+    - triples: (start, type, end) relationships of the schema
+    - instances: instances per label and per triple
+    - datatypes: {datatype: weight} of the properties, default DATATYPES
+    - fill_rate: probability that an instance has a given property
+
+    Output:
+    - jschema: {'node_props': ..., 'rel_props': ..., 'relationships': ...}
+    - node_instances: [[{'Instance': {'Label': label, 'properties': {...}}}, ...], ...]
+    - rels_instances: [[{start_Start: {...}, type: {...}, end_End: {...}}, ...], ...]
+    """
+    rng = random.Random(seed)
+    datatypes = datatypes or DATATYPES
+    names, weights = list(datatypes), list(datatypes.values())
+
+    label_names = [f"Label{i}" for i in range(labels)]
+    node_props = {label: [{"property": f"prop{j}", "datatype": rng.choices(names, weights)[0]}
+                          for j in range(props_per_label)]
+                  for label in label_names}
+
+    type_names = [f"REL_TYPE_{i}" for i in range(rel_types)]
+    rel_props = {rtype: [{"property": f"rprop{j}", "datatype": rng.choices(names, weights)[0]}
+                         for j in range(rel_props_per_type)]
+                 for rtype in type_names[::2]}
+
+    relationships = [{"start": rng.choice(label_names),
+                      "type": type_names[i % rel_types],
+                      "end": rng.choice(label_names)}
+                     for i in range(triples)]
+
+    jschema = {"node_props": node_props, "rel_props": rel_props, "relationships": relationships}
+
+    def properties(props: List[Dict]) -> Dict[str, Any]:
+        return {el["property"]: _value(el["datatype"], rng) for el in props if rng.random() < fill_rate}
+
+    node_instances = [[{"Instance": {"Label": label, "properties": properties(node_props[label])}}
+                       for _ in range(instances)]
+                      for label in label_names]
+
+    rels_instances = [[{f"{rel['start']}_Start": properties(node_props[rel['start']]),
+                        rel['type']: properties(rel_props.get(rel['type'], [])),
+                        f"{rel['end']}_End": properties(node_props[rel['end']])}
+                       for _ in range(instances)]
+                      for rel in relationships]
+
+    return jschema, node_instances, rels_instances
@@ -0,0 +1,1121 @@
+"""Declarative registry of the question-Cypher query templates.
+
+Each QueryTemplate states the sampler that feeds it, the parsed instances
+it reads, the subschema to render and the Question / Cypher texts. The
+texts use f-string syntax over the sampler parameters (label_1, prop_1,
+val_1, ...) and the template constants. compile_prompter turns a template
+into a plain function that the utilities.build_* samplers call directly."""
+
+from typing import Any, List, Dict, Callable, Iterable, Set, Tuple
+from itertools import product
+
+# Import local modules
+from utils.utilities import Sample
+
+# Sampler kinds
+LABEL = "label"
+LABEL_PAIR = "label_pair"
+NODE = "node"
+NODE_PAIR_SAME_LABEL = "node_pair_same_label"
+NODE_PAIR = "node_pair"
+RELATIONSHIP = "relationship"
+RELATIONSHIP_WITH_PROPS = "relationship_with_props"
+
+# Positional parameters passed to the prompter by each kind of sampler
+SAMPLER_PARAMS: Dict[str, Tuple[str, ...]] = {
+    LABEL: ("label_1",),
+    LABEL_PAIR: ("label_1", "label_2"),
+    NODE: ("label_1", "prop_1", "val_1"),
+    NODE_PAIR_SAME_LABEL: ("label_1", "prop_1", "val_1", "prop_2", "val_2"),
+    NODE_PAIR: ("label_1", "prop_1", "val_1", "label_2", "prop_2", "val_2"),
+    RELATIONSHIP: ("label_1", "prop_1", "val_1", "rel_1", "label_2", "prop_2", "val_2"),
+    RELATIONSHIP_WITH_PROPS: ("label_1", "prop_1", "val_1", "rel_1", "rprop_1", "rval_1",
+                              "label_2", "prop_2", "val_2"),
+}
+
+# Number of instance lists (sources) read by each kind of sampler
+SAMPLER_SOURCES: Dict[str, int] = {
+    LABEL: 0,
+    LABEL_PAIR: 0,
+    NODE: 1,
+    NODE_PAIR_SAME_LABEL: 2,
+    NODE_PAIR: 2,
+    RELATIONSHIP: 1,
+    RELATIONSHIP_WITH_PROPS: 1,
+}
+
+
+class Subschema:
+    """Arguments of build_minimal_subschema, with parameter names in place of values."""
+
+    def __init__(self,
+                 nodes: List[List[str]],
+                 relationships: List[List[str]] = (),
+                 node_props: bool = True,
+                 rel_props: bool = False,
+                 types: bool = False,
+                 relationships_section: bool = True,
+                 prefix: str = "Graph schema: ",
+                 ) -> None:
+        """
+        - nodes: [[label param, property param (optional)], ...], e.g. [["label_1", "prop_1"]]
+        - relationships: [[type param, property param (optional)], ...], e.g. [["rel_1", "rprop_1"]]
+        - node_props, rel_props, types, relationships_section: the include_* flags
+        - prefix: text placed before the subschema in the Schema entry
+        """
+        self.nodes = [tuple(item) for item in nodes]
+        self.relationships = [tuple(item) for item in relationships]
+        self.node_props = node_props
+        self.rel_props = rel_props
+        self.types = types
+        self.relationships_section = relationships_section
+        self.prefix = prefix
+
+    def __repr__(self) -> str:
+        return (f"Subschema(nodes={self.nodes}, relationships={self.relationships}, "
+                f"node_props={self.node_props}, rel_props={self.rel_props}, types={self.types}, "
+                f"relationships_section={self.relationships_section}, prefix={self.prefix!r})")
+
+
+class QueryTemplate:
+    """One query type: where its parameters come from and how the sample is written."""
+
+    def __init__(self,
+                 name: str,
+                 sampler: str,
+                 subschema: Subschema,
+                 question: str,
+                 cypher: str,
+                 sources: Tuple[str, ...] = (),
+                 constants: Dict[str, Any] = None,
+                 doc: str = "",
+                 ) -> None:
+        """
+        - name: unique name of the template
+        - sampler: one of the sampler kinds, it fixes the parameters (see SAMPLER_PARAMS)
+        - subschema: the subschema of the sample
+        - question, cypher: f-string texts over the parameters and constants
+        - sources: keys of the parsed instances read by the sampler, in dparsed for nodes,
+        drels for relationships and drelsprops for relationships with properties
+        - constants: extra names usable in the texts, e.g. {'nhops': 3}
+        """
+        if sampler not in SAMPLER_PARAMS:
+            raise ValueError(f"Unknown sampler kind {sampler!r} for template {name}.")
+        if len(sources) != SAMPLER_SOURCES[sampler]:
+            raise ValueError(f"Template {name} expects {SAMPLER_SOURCES[sampler]} source(s) "
+                             f"for a {sampler} sampler, got {len(sources)}.")
+        self.name = name
+        self.sampler = sampler
+        self.subschema = subschema
+        self.question = question
+        self.cypher = cypher
+        self.sources = tuple(sources)
+        self.constants = dict(constants or {})
+        self.doc = doc
+
+    @property
+    def params(self) -> Tuple[str, ...]:
+        """Names of the positional parameters of the prompter."""
+        return SAMPLER_PARAMS[self.sampler]
+
+    def __repr__(self) -> str:
+        return f"QueryTemplate({self.name!r}, sampler={self.sampler!r}, sources={self.sources})"
+
+
+#### Compiler ####
+
+def _fstring_literal(text: str) -> str:
+    """Python source of an f-string literal with the given template text.
+    The replacement fields only hold simple expressions, so escaping the
+    whole text is safe."""
+    escaped = (text.replace("\\", "\\\\")
+                   .replace("\n", "\\n")
+                   .replace("\r", "\\r")
+                   .replace('"', '\\"'))
+    return 'f"' + escaped + '"'
+
+
+def _tuple_source(items: List[Tuple[str, ...]]) -> str:
+    """Python source of the tuple of tuples of parameter names."""
+    return "(" + "".join("(" + "".join(f"{name}, " for name in item) + "), " for item in items) + ")"
+
+
+def prompter_source(template: QueryTemplate) -> str:
+    """Python source of the prompter function of a template."""
+    sub = template.subschema
+    params = ", ".join(template.params)
+    if template.constants:
+        params += ", *, " + ", ".join(f"{k}={v!r}" for k, v in template.constants.items())
+    render = (f"_render({_tuple_source(sub.nodes)}, {_tuple_source(sub.relationships)}, "
+              f"{sub.node_props!r}, {sub.rel_props!r}, {sub.types!r}, {sub.relationships_section!r})")
+    return (
+        f"def {template.name}({params}):\n"
+        f"    return _Sample(_system_message,\n"
+        f"                   {_fstring_literal(template.question)},\n"
+        f"                   {sub.prefix!r} + {render},\n"
+        f"                   {_fstring_literal(template.cypher)})\n"
+    )
+
+
+def compile_prompter(template: QueryTemplate,
+                     render: Callable[..., str],
+                     system_message: str,
+                     ) -> Callable[..., Sample]:
+    """
+    Compiles a template into a prompter for the utilities.build_* samplers.
+
+    Input:
+    - template: the query template
+    - render: subschema renderer taking the canonical (tuple) arguments,
+    e.g. SubschemaRenderer.render_canonical
+    - system_message: the Prompt entry of the samples
+
+    Output:
+    - function of the sampler parameters returning a Sample, saved as
+    a dictionary with keys Prompt, Question, Schema, Cypher
+    """
+    namespace = {"_render": render, "_system_message": system_message, "_Sample": Sample}
+    try:
+        code = compile(prompter_source(template), f"<template {template.name}>", "exec")
+    except SyntaxError as e:
+        raise ValueError(f"Template {template.name} does not compile: {e}")
+    exec(code, namespace)
+    prompter = namespace[template.name]
+    prompter.__doc__ = template.doc
+    return prompter
+
+
+def template_datatypes(templates: Iterable[QueryTemplate],
+                       node_datatypes: Iterable[str],
+                       rel_datatypes: Iterable[str],
+                       ) -> Tuple[Set[str], Set[Tuple[str, str]], Set[Tuple[str, str, str]]]:
+    """
+    Datatypes of the parsed instances read by the templates, from their sources:
+    - nodes: {datatype} of the node entries, all of them for dtypes_parsed
+    - pairs: {(dt_start, dt_end)} of the relationship entries
+    - triples: {(dt_start, dt_rel, dt_end)} of the relationship with properties entries
+    The keys are matched against the schema datatypes, as in build_datatype_views.
+    """
+    node_datatypes, rel_datatypes = list(node_datatypes), list(rel_datatypes)
+    all_pairs = list(product(node_datatypes, repeat=2))
+    all_triples = [(dt1, rt, dt2) for dt1, dt2 in all_pairs for rt in rel_datatypes]
+
+    node_keys = {f"{dt.lower()}_parsed": [dt] for dt in node_datatypes}
+    node_keys['dtypes_parsed'] = node_datatypes
+    pair_keys = {f"{dt1.lower()}_{dt2.lower()}_rels": [(dt1, dt2)] for dt1, dt2 in all_pairs}
+    pair_keys['all_rels'] = all_pairs
+    triple_keys = {f"{dt1.lower()}_{rt.lower()}_{dt2.lower()}_rels": [(dt1, rt, dt2)]
+                   for dt1, rt, dt2 in all_triples}
+    triple_keys['all_rels'] = all_triples
+
+    nodes, pairs, triples = set(), set(), set()
+    for template in templates:
+        for source in template.sources:
+            if template.sampler == RELATIONSHIP:
+                pairs.update(pair_keys.get(source, ()))
+            elif template.sampler == RELATIONSHIP_WITH_PROPS:
+                triples.update(triple_keys.get(source, ()))
+            else:
+                nodes.update(node_keys.get(source, ()))
+    return nodes, pairs, triples
+
+
+#### Registry ####
+
+# All the query templates, in the order of the builder notebook
+TEMPLATES: Dict[str, QueryTemplate] = {t.name: t for t in [
+
+    #### One Node Label ####
+    QueryTemplate(
+        name="count_nodes_of_given_label",
+        doc="Determine how many nodes of specified label are in the graph.",
+        sampler=LABEL,
+        subschema=Subschema(nodes=[["label_1"]], node_props=False, rel_props=False, types=False, relationships_section=False),
+        question="""Find the total number of {label_1} in the graph!""",
+        cypher="MATCH (n:{label_1}) RETURN count(n)",
+        ),
+    QueryTemplate(
+        name="paths_with_node_endpoint",
+        doc="Find paths with specified endpoints.",
+        sampler=LABEL,
+        subschema=Subschema(nodes=[["label_1"]], node_props=False, rel_props=False, types=False, relationships_section=False),
+        question="""Identify three paths where {label_1} is a start or end node!""",
+        cypher=" MATCH p=(b:{label_1})-[r*]->(n) RETURN p UNION MATCH p=(n)-[r*]->(b:{label_1}) RETURN p LIMIT 3",
+        ),
+
+    #### One Node Label, One Property: Any Data Type Input ####
+    QueryTemplate(
+        name="match_one_node_one_prop",
+        doc="Return a given node label and a specified property.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Fetch the {label_1} nodes and extract their {prop_1} property!""",
+        cypher="MATCH (n:{label_1}) RETURN n.{prop_1}",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_prop_notnull_numeral",
+        doc="Return n (use figures, e.g. 8) nodes where a property is not null.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find 10 {label_1} that have the {prop_1} recorded and return these values!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NOT NULL RETURN n.{prop_1} LIMIT 10",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_prop_notnull_literal",
+        doc="Return n (use words, e.g. eight) nodes where a property is not null.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find ten {label_1} that have {prop_1} and return their records!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NOT NULL RETURN n.{prop_1} LIMIT 10",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_prop_null_numeral",
+        doc="Return n (use figures, e.g. 8) nodes where a property is null.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find 8 {label_1} that are missing the {prop_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NULL RETURN n LIMIT 8",
+        ),
+    QueryTemplate(
+        name="find_node_notproperty_count",
+        doc="Find how many nodes of given label are missing a specified property.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the total number of {label_1} for which the {prop_1} is missing!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NULL RETURN count(n)",
+        ),
+    QueryTemplate(
+        name="find_node_property_count",
+        doc="Count nodes of given label which have a certain property.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the total number of {label_1} that have the {prop_1} recorded!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NOT NULL RETURN count(n)",
+        ),
+    QueryTemplate(
+        name="find_node_by_property",
+        doc="Find instances of given node label that has a property with specified value.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {label_1} for which {prop_1} is {val_1}!""",
+        cypher="MATCH (n:{label_1} {{{prop_1}:'{val_1}'}}) RETURN n",
+        ),
+    QueryTemplate(
+        name="match_skip_limit_return_property",
+        doc="Return a list of values of a property, using skip and limit.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        constants={'nrecs': 2},
+        question="""Return the {prop_1} of the {label_1}, skip the first {nrecs} records and return {nrecs} records!""",
+        cypher="MATCH (n:{label_1}) RETURN n.{prop_1}  SKIP {nrecs} LIMIT {nrecs}",
+        ),
+
+    #### One Node Label, One Property: String Data Type ####
+    QueryTemplate(
+        name="match_where_skip_limit_return_property",
+        doc="Fetch a list of nodes with certain properties, use skip and limit.",
+        sampler=NODE,
+        sources=("string_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        constants={'nrecs': 2},
+        question="""Find the {label_1} for which {prop_1} starts with {val_1[0]}, skip the first {nrecs} records and return the next {nrecs} records of {prop_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} STARTS WITH '{val_1[0]}' WITH n.{prop_1} AS {prop_1} SKIP {nrecs} LIMIT {nrecs} RETURN {prop_1}",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_prop_one_val",
+        doc="Retrieve nodes of given label where a string property has a given value.",
+        sampler=NODE,
+        sources=("string_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {label_1} where {prop_1} is {val_1.strip()}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} = '{val_1}' RETURN n",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_string_contains",
+        doc="Retrieve nodes of specified label where a string property contains a given substring.",
+        sampler=NODE,
+        sources=("string_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {label_1} where {prop_1} contains {val_1[:5]}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} CONTAINS '{val_1[:5]}' RETURN n",
+        ),
+    QueryTemplate(
+        name="find_node_by_start_substring",
+        doc="Find instances of given node label that has a property that starts with a specified substring.",
+        sampler=NODE,
+        sources=("string_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {label_1} for which {prop_1} starts with {val_1[:3]}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} STARTS WITH '{val_1[:3]}' RETURN n",
+        ),
+    QueryTemplate(
+        name="where_one_node_string_re",
+        doc="Retrieve nodes of given label with a string property satisfies a condition given by a regular expression.",
+        sampler=NODE,
+        sources=("string_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Fetch the {label_1} where {prop_1} ends with {val_1[:2]}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} =~'{val_1[:2]}.*' RETURN n",
+        ),
+
+    #### One Node Label, One Property: Temporal Data Types ####
+    QueryTemplate(
+        name="find_count_in_interval",
+        doc="Node count for a given time interval.",
+        sampler=NODE,
+        sources=("date_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""How many {label_1} have {prop_1} between January 1, 2010 and January 1, 2015?!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} >= date('2010-01-01') AND n.{prop_1} <= date('2015-01-01') RETURN count(n) AS {label_1}s",
+        ),
+    QueryTemplate(
+        name="find_nodes_today",
+        doc="Find nodes with property dated within the last 24 hours.",
+        sampler=NODE,
+        sources=("date_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""List {label_1} that have {prop_1} in the last 24 hours!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} > datetime() - duration('P1D') RETURN n",
+        ),
+    QueryTemplate(
+        name="find_nodes_monday",
+        doc="Find the count of nodes with given label and specified property dated on a Monday.",
+        sampler=NODE,
+        sources=("date_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""How many {label_1} have {prop_1} on a Monday?""",
+        cypher="MATCH (n:{label_1}) WHERE date(n.{prop_1}).weekday = 1 RETURN count(n)",
+        ),
+    QueryTemplate(
+        name="find_property_after_hour",
+        doc="Find the count of nodes with given label and specified property dated after a given date and time.",
+        sampler=NODE,
+        sources=("date_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find how many {label_1}s have {prop_1} after 6PM, January 1, 2020?""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} >= datetime('2010-01-01T18:00:00') RETURN count(n) AS {label_1}s",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_prop_equals_year",
+        doc="Retrieve nodes of given label where a property has a specific year.",
+        sampler=NODE,
+        sources=("date_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        constants={'date_year': 2010},
+        question="""Fetch {label_1} where {prop_1} is in {date_year}!""",
+        cypher="MATCH (n:{label_1}) WHERE date(n.{prop_1}).year = {date_year} RETURN n",
+        ),
+    QueryTemplate(
+        name="where_one_node_one_prop_equals_date",
+        doc="Retrieve nodes of given label where a date property has a specified value.",
+        sampler=NODE,
+        sources=("date_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find {label_1} such that {prop_1} is {val_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} = date('{val_1}') RETURN n",
+        ),
+
+    #### One Node Label, One Property: Paths and Neighbors - Any Data Type ####
+    QueryTemplate(
+        name="find_unique_rels",
+        doc="Fetch unique relationships that have a given node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""How many unique relationships originate from {label_1} where {prop_1} is {val_1}?""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->() RETURN COUNT(DISTINCT TYPE(r)) AS rels, TYPE(r)",
+        ),
+    QueryTemplate(
+        name="connection_thru_two_rels",
+        doc="How many nodes are connected to a given node instance via two relationships.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""How many nodes are connected to {label_1} for which {prop_1} is {val_1}, by exactly two different types of relationships?""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n) WITH n, COLLECT(DISTINCT TYPE(r)) AS Types WHERE SIZE(Types) = 2 RETURN COUNT(n)",
+        ),
+    QueryTemplate(
+        name="rels_and_counts_and_nodes",
+        doc="Get information on nodes connected to a certain node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""List the nodes that are connected to {label_1} for which {prop_1} is {val_1}, with their relationship types and count these types!""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n) RETURN n, TYPE(r) AS Relations, COUNT(r) AS Counts",
+        ),
+    QueryTemplate(
+        name="rels_and_counts",
+        doc="Find relationships and their counts that are connected to a specified node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""List the types of relationships and their counts connected to {label_1} for which {prop_1} is {val_1}!""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->() RETURN TYPE(r) AS Relations, COUNT(r) AS Counts",
+        ),
+    QueryTemplate(
+        name="find_node_neighbours",
+        doc="Find all neighbors of a given node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find all nodes directly connected to the {label_1} that has {prop_1} {val_1}!""",
+        cypher="MATCH path=(:{label_1} {{{prop_1}:'{val_1}'}})-->() RETURN path",
+        ),
+    QueryTemplate(
+        name="find_neighbors_properties",
+        doc="Find the neighbors of a given node (specified intrinsically) and list their properties.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the nodes connected to {label_1} where {prop_1} is {val_1} and list their properties!""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n) RETURN properties(n), r",
+        ),
+    QueryTemplate(
+        name="find_node_neighbors_properties",
+        doc="Find the neighbors of a given node (specified extrinsically) and list their properties.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Identify nodes that are connected to {label_1} where {prop_1} is {val_1} and list their properties, including those of {label_1}!""",
+        cypher=" MATCH (b:{label_1})-[r]->(n) WHERE b.{prop_1} = '{val_1}' RETURN properties(b) AS {label_1}_props, properties(n) AS props",
+        ),
+    QueryTemplate(
+        name="find_properties_neighbors_relationship",
+        doc="Find properties of specified neighbors of a given node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""What are the properties of nodes connected to {label_1} for which {prop_1} is {val_1}, and what are their relationships to {label_1}?""",
+        cypher="MATCH (c:{label_1})<-[r]-(n) WHERE c.{prop_1} = '{val_1}' RETURN properties(n) AS props, r",
+        ),
+    QueryTemplate(
+        name="nodes_connected_to_two_nodes",
+        doc="Find common neighbors of two nodes, only one specified.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Which nodes are connected to {label_1} where {prop_1} is {val_1}, and also to another node?""",
+        cypher="MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n), (n)-[s]->(m) RETURN labels(n) AS Interim, labels(m) AS Target",
+        ),
+    QueryTemplate(
+        name="longest_path_from_node",
+        doc="Find the longest path originating from a given node, basic approach.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Identify the longest path originating from {label_1} for which {prop_1} is {val_1}, and list the properties of the nodes on the path!""",
+        cypher=" MATCH p=(a:{label_1}{{{prop_1}:'{val_1}'}})-[*]->(n) RETURN p, nodes(p) ORDER BY LENGTH(p) DESC LIMIT 1",
+        ),
+    QueryTemplate(
+        name="node_properties_for_two_relationships",
+        doc="Fetch node properties for a given path.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""What are the properties of nodes connected to {label_1} where {prop_1} is {val_1}, by two different types of relationships?""",
+        cypher="MATCH (e:{label_1}{{{prop_1}:'{val_1}'}})-[r1]->(n)-[r2]->(m) WHERE TYPE(r1) <> TYPE(r2) RETURN properties(n) AS props1, properties(m) AS props2",
+        ),
+    QueryTemplate(
+        name="average_props",
+        doc="Find the average count of properties of nodes along a path.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""What is the average number of properties per node connected to {label_1} for which {prop_1} is {val_1}!""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n) RETURN AVG(SIZE(keys(n))) AS AvgProps",
+        ),
+    QueryTemplate(
+        name="first_and_far_neighbors",
+        doc="Proprieties of nodes for which there is a path to a specified node.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Enumerate the properties of nodes that are either directly or indirectly connected to {label_1} for which {prop_1} is {val_1}!""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[*]->(n) RETURN DISTINCT properties(n) AS Properties",
+        ),
+    QueryTemplate(
+        name="nodes_connected_to_node",
+        doc="Find the neighbors of a node (extrinsincally specified property).",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question=""" List all nodes that are connected to {label_1} where {prop_1} contains {val_1}, along with the type of their relationship with {label_1}!""",
+        cypher="""MATCH (d:{label_1})-[r]->(n) WHERE d.{prop_1} CONTAINS '{val_1}' RETURN n, TYPE(r)""",
+        ),
+    QueryTemplate(
+        name="find_far_unique_rels",
+        doc="Find the distinct properties of nodes that are nhops away from a given node.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        constants={'nhops': 2},
+        question="""List the distinct properties of nodes that are {nhops} hops away from {label_1} with {prop_1} equal to {val_1}!""",
+        cypher=" MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[*{nhops}]->(n) RETURN DISTINCT properties(n) AS props",
+        ),
+    QueryTemplate(
+        name="find_far_neighbors_properties",
+        doc="Find the properties of nodes that are 3 hops away from a given node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        constants={'nhops': 3},
+        question="""List the properties of nodes that are {nhops} hops away from {label_1} with {prop_1} equal to {val_1}!""",
+        cypher=" MATCH (a:{label_1})-[*{nhops}]->(n) WHERE a.{prop_1} = '{val_1}' RETURN properties(n) AS props",
+        ),
+    QueryTemplate(
+        name="find_far_neighbors",
+        doc="Retrieve the node labels of the nodes that are nhops away from a given node instance.",
+        sampler=NODE,
+        sources=("dtypes_parsed",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        constants={'nhops': 3},
+        question="""List nodes that are {nhops} hops away from {label_1} for which {prop_1}={val_1}!""",
+        cypher="MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[*{nhops}]->(n) RETURN labels(n) AS FarNodes",
+        ),
+
+    #### One Node Label, Two Properties: String Data Type ####
+    QueryTemplate(
+        name="match_with_where_not_value",
+        doc="Retrieve a node property when another property does not take a certain value.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Retrieve distinct values of the {prop_2} from {label_1} where {prop_1} is not {val_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} <> '{val_1}' RETURN DISTINCT n.{prop_2} AS {prop_2}",
+        ),
+    QueryTemplate(
+        name="match_with_where_contains_substring",
+        doc="Retrieve two properties of a node if one of the properties does contain a given substring.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("string_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {prop_1} and the {prop_2} for those {label_1} where {prop_1} contains the substring {val_1[:2]}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} CONTAINS '{val_1[2:]}' RETURN n.{prop_1} AS {prop_1}, n.{prop_2} AS {prop_2}",
+        ),
+    QueryTemplate(
+        name="match_with_where_starts_with_substring",
+        doc="Retrieve two properties of a node if one of the properties starts with a given substring.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("string_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {prop_1} and the {prop_2} for those {label_1} where {prop_1} starts with {val_1[0]}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} STARTS WITH '{val_1[0]}' RETURN n.{prop_1} AS {prop_1}, n.{prop_2} AS {prop_2}",
+        ),
+    QueryTemplate(
+        name="match_with_where_not_is_value",
+        doc="Return two properties of a node if one of the properties does not start with a specified string.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("string_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Fetch unique values of {prop_1} and {prop_2} from {label_1} where {prop_1} does not start with {val_1[0]}!""",
+        cypher="MATCH (n:{label_1}) WHERE NOT n.{prop_1} STARTS WITH '{val_1[0]}' RETURN DISTINCT n.{prop_1} AS {prop_1}, n.{prop_2} AS {prop_2}",
+        ),
+    QueryTemplate(
+        name="match_properties_with_union",
+        doc="Find node instances if one of two properties contains a certain substring.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("string_parsed", "string_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Retrieve the {label_1} where {prop_1} or {prop_2} contains {val_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} CONTAINS '{val_1}' RETURN n AS node UNION ALL MATCH (m:{label_1}) WHERE m.{prop_2} CONTAINS '{val_1}' RETURN m AS node",
+        ),
+    QueryTemplate(
+        name="where_one_node_two_props_notnull_or",
+        doc="Find a specified property of a given label if another property fulfills a given condition or the specified property is not null.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("string_parsed", "string_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Fetch the distinct values of the {prop_2} from {label_1} where either {prop_1} is {val_1} or {prop_2} is not null!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} = '{val_1}' OR n.{prop_2} IS NOT NULL RETURN DISTINCT n.{prop_2} AS {prop_2}",
+        ),
+
+    #### One Node Label, Two Properties: Temporal Data Types ####
+    QueryTemplate(
+        name="find_property_in_year",
+        doc="Find a property of a given node if a temporal condition on a second property holds.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("dtypes_parsed", "date_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find all {prop_1} for {label_1} that have {prop_2} in 2020!""",
+        cypher="MATCH (n:{label_1}) WHERE date(n.{prop_2}).year = 2020 RETURN n.{prop_1}",
+        ),
+    QueryTemplate(
+        name="find_property_in_month",
+        doc="Find how many nodes of have a first property and a temporal condition on a second property.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("dtypes_parsed", "date_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find how many {label_1} with {prop_1} recorded have {prop_2} in June!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NOT NULL AND date(n.{prop_2}).month = 6 RETURN count(n)",
+        ),
+    QueryTemplate(
+        name="where_one_node_two_props_two_vals_or_notnull_date",
+        doc="Find a temporal property for a specified node label when a second property takes a given value.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("dtypes_parsed", "date_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {prop_2} for those {label_1}s where {prop_1} is {val_1} and the year of the {prop_2} is {val_2[:4]}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} = '{val_1}' AND date(n.{prop_2}).year = {val_2[:4]} RETURN n.{prop_2} AS {prop_2}",
+        ),
+    QueryTemplate(
+        name="find_property_after_date",
+        doc="Find a temporal property of a given node if a second temporal property satisfies a certain condition.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("date_parsed", "date_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find all {prop_1} for {label_1} that have {prop_2} after January 1, 2020!""",
+        cypher="MATCH (n:{label_1}) WHERE date(n.{prop_2}) > date('2020-01-01') RETURN n.{prop_1}",
+        ),
+
+    #### One Node Label, Two Properties: Numerical Data Types ####
+    QueryTemplate(
+        name="aggregate_integers_by_string",
+        doc="Find statistics of a numerical property for those nodes that satisfy a condition on a second property.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("dtypes_parsed", "integer_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""For each nonull {prop_1} of the {label_1}, how many times does it appear, and what are the minimum, maximum and average values of {prop_2} associated to it?""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} IS NOT NULL WITH DISTINCT n WITH n.{prop_1} as {prop_1}, COUNT(n) AS count, min(n.{prop_2}) AS min, max(n.{prop_2}) AS max, avg(n.{prop_2}) AS avg RETURN {prop_1}, count, min, max, avg",
+        ),
+    QueryTemplate(
+        name="match_with_where_not_null",
+        doc="Return nodes where a property is not null, a second property takes specified values, order by the second property.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("string_parsed", "integer_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Search for {prop_1} and {prop_2} from {label_1} where {prop_1} is not null and {prop_2} exceeds {val_2} and sort the results by {prop_2}, beginning with the largest!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1}  IS NOT NULL AND n.{prop_2} > {val_2} RETURN n.{prop_1} AS {prop_1}, n.{prop_2} AS {prop_2} ORDER BY {prop_2} DESC",
+        ),
+    QueryTemplate(
+        name="aggregate_numerical_by_integer",
+        doc="Count the nodes where two properties satisfy two numerical conditions.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("integer_parsed", "integer_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the {label_1} counts where {prop_1} is smaller than ten, and return the maximum, minimum and average values of the {prop_2}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} > 100 WITH DISTINCT n WITH n.{prop_1} as {prop_1}, COUNT(n) AS count, min(n.{prop_2}) AS min_{prop_2}, max(n.{prop_2}) AS max_{prop_2}, avg(n.{prop_2}) AS avg_{prop_2} RETURN {prop_1}, count, min_{prop_2}, max_{prop_2}, avg_{prop_2}",
+        ),
+    QueryTemplate(
+        name="match_with_where_or_numerical_literal",
+        doc="Find at most n nodes of specified label where a numerical property is greater or another is less than specified values.",
+        sampler=NODE_PAIR_SAME_LABEL,
+        sources=("integer_parsed", "integer_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_1", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find eight instances of {label_1} where either {prop_1} exceeds {val_1} or {prop_2} is less than {val_2}!""",
+        cypher="MATCH (n:{label_1}) WHERE n.{prop_1} > {val_1} OR n.{prop_2} < {val_2} RETURN n LIMIT 8",
+        ),
+
+    #### Two Node Labels, Properties: Relationships to Nodes ####
+    QueryTemplate(
+        name="find_nodes_connected_to_two_nodes",
+        doc="Find the nodes connected to two given nodes.",
+        sampler=LABEL_PAIR,
+        subschema=Subschema(nodes=[["label_1"], ["label_2"]], node_props=False, rel_props=False, types=False, relationships_section=False),
+        question="""Find nodes that share a relationship with both {label_1} and {label_2}!""",
+        cypher="""MATCH (c:{label_1})<-[r1]-(n)-[r2]->(d:{label_2}) RETURN labels(n)""",
+        ),
+    QueryTemplate(
+        name="nodes_connected_to_two_nodes_both",
+        doc="Find nodes on paths between two given nodes.",
+        sampler=LABEL_PAIR,
+        subschema=Subschema(nodes=[["label_1"], ["label_2"]], node_props=False, rel_props=False, types=False, relationships_section=False),
+        question="""Identify nodes that are connected to both {label_1} and {label_2}, directly or indirectly!""",
+        cypher="MATCH (a:{label_1})-[*]-(n)-[*]-(b:{label_2}) RETURN labels(n)",
+        ),
+    QueryTemplate(
+        name="find_common_rels",
+        doc="Find nodes that share common relationships with two given nodes.",
+        sampler=LABEL_PAIR,
+        subschema=Subschema(nodes=[["label_1"], ["label_2"]], node_props=False, rel_props=False, types=False, relationships_section=False),
+        question="""Are there any nodes that share a common relationship type with both {label_1} and {label_2}?""",
+        cypher="MATCH (a:{label_1})-[r]->(n), (d:{label_2})-[s]->(m) WHERE TYPE(r) = TYPE(s) RETURN labels(n), labels(m)",
+        ),
+    QueryTemplate(
+        name="rel_and_common_prop",
+        doc="Identify nodes with common properties.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Are there any nodes that are connected with {label_1} where {prop_1} is {val_1} and share a common property with {label_2}, for which {prop_2} equals {val_2}?""",
+        cypher="""MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r]->(n), (d:{label_2}{{{prop_2}:'{val_2}'}}) WHERE ANY(key in keys(n) WHERE n[key] = d[key]) RETURN n""",
+        ),
+
+    #### Two Node Labels, Properties: Unions of Sets ####
+    QueryTemplate(
+        name="match_nodes_with_union_all",
+        doc="Build a union of two sets (without filtering duplicates) extracted from two distinct node labels and their properties.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Return the {prop_1} for {label_1} combined with the {prop_2} for {label_2}!""",
+        cypher="MATCH (n:{label_1}) RETURN n.{prop_1} AS Records UNION ALL MATCH (m:{label_2}) RETURN m.{prop_2} AS Records",
+        ),
+    QueryTemplate(
+        name="match_nodes_with_union",
+        doc="Build a union of two sets (with filtering duplicates) extracted from two distinct node labels and their properties.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Return the {prop_1} for {label_1} combined with the {prop_2} for {label_2}, filter the duplicates if any!""",
+        cypher="MATCH (n:{label_1}) RETURN n.{prop_1} AS Records UNION MATCH (m:{label_2}) RETURN m.{prop_2} AS Records",
+        ),
+
+    #### Two Node Labels, Properties: Retrieve Properties ####
+    QueryTemplate(
+        name="match_two_nodes_two_props",
+        doc="Retrieve several samples of properties values that correspond to two node labels (same or distinct).",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Fetch eight samples of the {prop_1} of the {label_1} and the {prop_2} for {label_2}!""",
+        cypher="MATCH (n:{label_1}) MATCH (m:{label_2}) RETURN n.{prop_1}, m.{prop_2} LIMIT 8",
+        ),
+    QueryTemplate(
+        name="where_not_simple_path_and_property",
+        doc="Retrieve one property that is not in relationship to another node with a given property.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Look for the {prop_1} of the {label_1} that is not related  to the {label_2} with the  {prop_2}  {val_2}!""",
+        cypher="MATCH (n:{label_1}), (:{label_2} {{{prop_2}: '{val_2}'}}) WHERE NOT (n) --> (:{label_2}) RETURN n.{prop_1}",
+        ),
+
+    #### Two Node Labels, Properties: Paths ####
+    QueryTemplate(
+        name="path_existence",
+        doc="Determine if there is a path connected two given nodes.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Is there a path connecting {label_1} where {prop_1} is {val_1} and {label_2}, for which {prop_2} is {val_2}?""",
+        cypher="""MATCH (a:{label_1}{{{prop_1}:'{val_1}'}}), (b:{label_2}{{{prop_2}:'{val_2}'}}) RETURN EXISTS((a)-[*]-(b)) AS pathExists""",
+        ),
+    QueryTemplate(
+        name="number_of_paths",
+        doc="Find the number of paths with given end nodes.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""How many paths are there between {label_1} where {prop_1} is {val_1} and {label_2}, for which {prop_2} equals {val_2}?""",
+        cypher="""MATCH p=(a:{label_1}{{{prop_1}:'{val_1}'}})-[*]->(d:{label_2}{{{prop_2}:'{val_2}'}}) RETURN count(p)""",
+        ),
+    QueryTemplate(
+        name="end_of_the_path",
+        doc="Find the end node of a given path.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find nodes that are at the end of a path starting at {label_1} where {prop_1} is {val_1} and traversing through {label_2} with {prop_2} {val_2}!""",
+        cypher="""MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[*]->(d:{label_2}{{{prop_2}:'{val_2}'}})-[*]->(n) RETURN n
+                    """,
+        ),
+    QueryTemplate(
+        name="shortest_path_between_two_nodes",
+        doc="Find the shortest path between two nodes.",
+        sampler=NODE_PAIR,
+        sources=("dtypes_parsed", "dtypes_parsed"),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], node_props=True, rel_props=False, types=True, relationships_section=False),
+        question="""Find the shortest path between {label_1} where {prop_1} is {val_1} and {label_2}, with {prop_2} equal {val_2}, including the nodes on the path!""",
+        cypher="""MATCH p=shortestPath((a:{label_1}{{{prop_1}:'{val_1}'}})-[*]-(e:{label_2}{{{prop_2}:'{val_2}'}})) RETURN nodes(p)
+                    """,
+        ),
+
+    #### Relationships: Nodes and Relationships ####
+    QueryTemplate(
+        name="find_not_connected_nodes",
+        doc="Identify nodes that do not have certain relationships.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1"]], relationships=[["rel_1"]], node_props=False, rel_props=False, types=False),
+        question="""Fetch five {label_1} that are not linked through {rel_1} relationships!""",
+        cypher="MATCH (p:{label_1}) WHERE NOT EXISTS ((p)-[:{rel_1}]->()) RETURN p LIMIT 5",
+        ),
+    QueryTemplate(
+        name="find_connected_nodes",
+        doc="Find nodes that are connected via certain relationships.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1"]], relationships=[["rel_1"]], node_props=False, rel_props=False, types=False),
+        question="""Find four {label_1} that have {rel_1} links!""",
+        cypher="MATCH (p:{label_1}) WHERE EXISTS ((p)-[:{rel_1}]->()) RETURN p LIMIT 4",
+        ),
+    QueryTemplate(
+        name="find_node_relation_count",
+        doc="Count the number of specified relationships a node has.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=False),
+        question="""Fetch ten {label_1} and return the {prop_1} and the number of nodes connected to them via {rel_1} given in descending order of the node counts.""",
+        cypher="MATCH (n:{label_1}) WITH n.{prop_1} AS {prop_1}, size([(n)-[:{rel_1}]->() | 1]) AS count ORDER BY count DESC LIMIT 10 RETURN article_id, count",
+        ),
+
+    #### Relationships: Two Labels, One Property ####
+    QueryTemplate(
+        name="nodes_connected_to_first_node_and_not_connected_to_second_node",
+        doc="Determine which nodes are connected to node A but not connected to node B via a given relationship.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1"], ["label_2"]], relationships=[["rel_1"]], node_props=False, rel_props=False, types=False),
+        question=""" Which nodes are connected to {label_1}, but not to {label_2} via {rel_1}?""",
+        cypher="""MATCH (c:{label_1})-[r]-(n) WHERE NOT (n)-[:{rel_1}]-(:{label_2}) RETURN labels(n)""",
+        ),
+    QueryTemplate(
+        name="find_node_property_with_count_limit",
+        doc="Retrieve property values for several nodes A and the number of relationship counts to nodes B.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Search for the {prop_1} values from 20 {label_1} that are linked to {label_2} via {rel_1} and return {prop_1} along with the respective {label_2} counts!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WITH DISTINCT n, m RETURN n.{prop_1} AS {prop_1}, count(m) AS count LIMIT 20",
+        ),
+    QueryTemplate(
+        name="find_node_property_by_condition_on_node",
+        doc="Retrieve property values for nodes A that have more than five relationships to nodes B.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Find the {prop_1} of {label_1} that each have more than five {rel_1} relationships with {label_2}!""",
+        cypher="MATCH (n:{label_1}) -[r:{rel_1}]->(m:{label_2}) WITH DISTINCT n, m, r WITH n.{prop_1} AS {prop_1}, count(r) AS count WHERE count > 5 RETURN {prop_1}",
+        ),
+    QueryTemplate(
+        name="where_and_exists_simple_path",
+        doc="Fetch a property of nodes connected to a given node via a specified relationship.",
+        sampler=RELATIONSHIP,
+        sources=("string_string_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Fetch {prop_1} of the {label_1} that are connected to {label_2} via {rel_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE EXISTS {{ MATCH (n)-[:{rel_1}]->(:{label_2}) }} RETURN n.{prop_1} AS {prop_1}",
+        ),
+    QueryTemplate(
+        name="find_node_relation_ordered_count_desc",
+        doc="Retrieve, in descending order, the count of nodes linked to a given node.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""For each {label_1} find its {prop_1} and the count of {label_2} linked via {rel_1}, and retrieve seven results in desc order of the counts!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WITH DISTINCT n, m RETURN n.{prop_1} AS {prop_1}, count(m) AS count ORDER BY count DESC LIMIT 7",
+        ),
+    QueryTemplate(
+        name="find_node_relation_ordered_count",
+        doc="Retrieve, in ascending order, the counts of nodes linked to a given node.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""For each {label_1}, find the number of {label_2} linked via {rel_1} and retrieve the {prop_1} of the {label_1} and the {label_2} counts in ascending order!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WITH DISTINCT n, m RETURN n.{prop_1} AS {prop_1}, count(m) AS {label_2.lower()}_count ORDER BY {label_2.lower()}_count",
+        ),
+    QueryTemplate(
+        name="find_node_relation_ordered_count_filter",
+        doc="Retrieve the counts, larger than a given value, of nodes linked to a given node.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""For each {label_1} and its {prop_1}, count the {label_2} connected through {rel_1} and fetch the {prop_1} and the counts that are greater than 5, starting with the largest {prop_1} and count!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WITH DISTINCT n, m WITH n.{prop_1} AS {prop_1}, count(m) AS count WHERE count > 4 RETURN {prop_1}, count ORDER BY {prop_1} DESC, count DESC",
+        ),
+    QueryTemplate(
+        name="find_common_prop",
+        doc="Find related nodes with common properties.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Which nodes have a common property with {label_1} where {prop_1} is {val_1} and are {rel_1} linked to a {label_2}?""",
+        cypher="MATCH (a:{label_1} {{{prop_1}:'{val_1}'}})-[r:{rel_1}]->(b:{label_2}) WHERE ANY(key IN keys(a) WHERE a[key] = b[key]) RETURN b",
+        ),
+    QueryTemplate(
+        name="find_end_nodes_path",
+        doc="Find nodes that are at the end of a path with specified starting node.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Which nodes are at the end of a path starting from {label_1}, with {prop_1} equal to  {val_1}, passing through {label_2} via {rel_1}?""",
+        cypher="""MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[:{rel_1}]->(c:{label_2})-[r]->(n) RETURN n""",
+        ),
+    QueryTemplate(
+        name="find_end_node_properties",
+        doc="Find properties of nodes connected to specified nodes.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""What are the properties of {label_2} that is {rel_1} connected to {label_1} that has {prop_1} equal to {val_1}?""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WHERE n.{prop_1} = {val_1} RETURN properties(m) AS props",
+        ),
+
+    #### Relationships: Two Labels, Two Properties ####
+    QueryTemplate(
+        name="find_node_relation_ordered_count_collect",
+        doc="Find properties of nodes that are related under given conditions.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Fetch the {prop_1} of the {label_1} that are linked via {rel_1} to more than three {label_2}, and list {label_2} {prop_2} and {label_2} counts, ordering by {label_2} count and limiting to the top six results!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WITH DISTINCT n, m WITH n.{prop_1} AS {prop_1}, count(m) AS count, COLLECT(m.{prop_2}) as {prop_2} WHERE count > 3 RETURN {prop_1}, count, {prop_2} ORDER BY count LIMIT 6",
+        ),
+    QueryTemplate(
+        name="find_node_aggregation_date_rels",
+        doc="Evaluate the average values of a property for all nodes of the same label that are connected to a specified node.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Calculate the average {prop_2} for {label_2} that are linked to {label_1} via {rel_1} and have {prop_1} date before December 31, 2020!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}]->(m:{label_2}) WHERE m.{prop_1} < date('2020-12-31') RETURN avg(m.{prop_2}) AS avg_{prop_2}",
+        ),
+    QueryTemplate(
+        name="where_and_simple_path",
+        doc="Find a property of a node connected via a given relationship to a node for which a certain property takes a specified value.",
+        sampler=RELATIONSHIP,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Retrieve the {prop_2} for {label_2} that is linked through a {rel_1} relationship with the {label_1} where {prop_1} is {val_1}!""",
+        cypher="MATCH (n:{label_1}) -[{rel_1[:2].lower()}:{rel_1}]->(m) WHERE n.{prop_1}='{val_1}' RETURN m.{prop_2}",
+        ),
+    QueryTemplate(
+        name="relation_with_and_where",
+        doc="Retrieve related node properties that satisfy given conditions.",
+        sampler=RELATIONSHIP,
+        sources=("string_string_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1"]], node_props=True, rel_props=False, types=True),
+        question="""Find {label_2} that has a {prop_2} which begins with {label_2[0].lower()}, and is linked to {label_1} via {rel_1} relationship, where {label_1} has {prop_1} {val_1}!""",
+        cypher="MATCH (n:{label_1} {{{prop_1}: '{val_1}'}}) -[:{rel_1}]- (m:{label_2}) WHERE m.{prop_2} STARTS WITH '{label_2[0].lower()}' RETURN m",
+        ),
+
+    #### Relationships with Properties: Nodes and Relationships (with properties) ####
+    QueryTemplate(
+        name="find_not_connected_nodes_relprops",
+        doc="Identify nodes that do not have certain relationships.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1"]], relationships=[["rel_1", "rprop_1"]], node_props=False, rel_props=True, types=True, prefix=""),
+        question="""Fetch five {label_1} that are not linked through {rel_1} relationships where {rprop_1} is {rval_1}!""",
+        cypher="MATCH (p:{label_1}) WHERE NOT EXISTS {{(p)-[r:{rel_1}]->() WHERE r.{rprop_1}='{rval_1}' }} RETURN p LIMIT 5",
+        ),
+    QueryTemplate(
+        name="find_connected_nodes_relprops",
+        doc="Find nodes that are connected via certain relationships.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1"]], relationships=[["rel_1", "rprop_1"]], node_props=False, rel_props=True, types=True, prefix=""),
+        question="""Find four {label_1} that have {rel_1} links so that {rprop_1} are {rval_1}!""",
+        cypher="MATCH (p:{label_1}) WHERE EXISTS {{(p)-[r:{rel_1}]->() WHERE r.{rprop_1}='{rval_1}'}}  RETURN p LIMIT 4",
+        ),
+    QueryTemplate(
+        name="find_node_relation_count_relprops",
+        doc="Count the number of specified relationships a node has.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Fetch all the {label_1} and return the {prop_1} and the number of nodes connected to them via {rel_1} with {rprop_1} = {rval_1}.""",
+        cypher="MATCH (n:{label_1})-[r:{rel_1}]->() WHERE r.{rprop_1} = '{rval_1}' WITH (n), COUNT(*) AS numberOfDirectConnections RETURN n.{prop_1} AS {prop_1}, numberOfDirectConnections",
+        ),
+
+    #### Relationships with Properties: Two Labels, One Property, Relationship (with property) ####
+    QueryTemplate(
+        name="find_node_property_with_count_limit_relprops",
+        doc="Retrieve property values for several nodes A and the number of relationship counts to nodes B.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Search for the {prop_1} values from 20 {label_1} that are linked to {label_2} via {rel_1} with {rprop_1} = {rval_1}, and return {prop_1} along with the respective {label_2} counts!""",
+        cypher="MATCH (n:{label_1}) -[r:{rel_1}]->(m:{label_2}) WHERE r.{rprop_1}='{rval_1}' WITH DISTINCT n, m RETURN n.{prop_1} AS {prop_1}, count(m) AS count LIMIT 20",
+        ),
+    QueryTemplate(
+        name="where_and_exists_simple_path_relprops",
+        doc="Fetch a property of nodes connected to a given node via a relationship with specified properties.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Fetch {prop_1} of the {label_1} that are connected to {label_2} via {rel_1} where {rprop_1} are at most {rval_1}!""",
+        cypher="MATCH (n:{label_1}) WHERE EXISTS {{ MATCH (n)-[r:{rel_1}]->(:{label_2}) WHERE r.{rprop_1} < '{rval_1}'}} RETURN n.{prop_1} AS {prop_1}",
+        ),
+    QueryTemplate(
+        name="find_node_relation_ordered_count_desc_relprops",
+        doc="Retrieve, in descending order, the count of nodes linked to a given node, via a specified relationship.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""For each {label_1} find its {prop_1} and the count of {label_2} linked via {rel_1} where {rprop_1} is not '{rval_1}', and retrieve seven results in desc order of the counts!""",
+        cypher="MATCH (n:{label_1}) -[r:{rel_1}]->(m:{label_2}) WHERE r.{rprop_1} <> '{rval_1}' WITH DISTINCT n, m RETURN n.{prop_1} AS {prop_1}, count(m) AS count ORDER BY count DESC LIMIT 7",
+        ),
+    QueryTemplate(
+        name="find_node_relation_ordered_count_relprops",
+        doc="Retrieve, a property and the counts, in ascending order, of nodes linked to a given node.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""For each {label_1}, find the number of {label_2} linked via {rel_1} where {rprop_1} is {rval_1} and retrieve the {prop_1} of the {label_1} and the {label_2} counts in ascending order!""",
+        cypher="MATCH (n:{label_1}) -[r:{rel_1}]->(m:{label_2}) WHERE r.{rprop_1} = '{rval_1}' WITH DISTINCT n, m RETURN n.{prop_1} AS {prop_1}, count(m) AS count ORDER BY count",
+        ),
+    QueryTemplate(
+        name="find_common_prop_relprops",
+        doc="Find related nodes with common properties related via a specified relationship.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Which nodes have a common property with {label_1} where {prop_1} is {val_1} and are {rel_1} linked to {label_2}, where {rprop_1} is {rval_1}?""",
+        cypher="MATCH (a:{label_1}{{{prop_1}:'{val_1}'}})-[r:{rel_1} {{{rprop_1} :'{rval_1}'}}]->(b:{label_2}) WHERE ANY(key IN keys(a) WHERE a[key] = b[key]) RETURN b",
+        ),
+    QueryTemplate(
+        name="find_end_nodes_path_relprops",
+        doc="Find nodes that are at the end of a path with specified starting node and interim relationship.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Which nodes are at the end of a path starting from {label_1}, where {prop_1} is {val_1}, through {label_2} via {rel_1} with {rprop_1} {rval_1}?""",
+        cypher="""MATCH (a:{label_1} {{{prop_1}:'{val_1}'}})-[:{rel_1} {{{rprop_1}: '{rval_1}'}}]->(c:{label_2})-[r]->(n) RETURN n""",
+        ),
+    QueryTemplate(
+        name="find_end_node_properties_relprops",
+        doc="Find properties of nodes connected to specified nodes, via specified relationship.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""What are the properties of {label_2} that is {rel_1}, with {rprop_1} equal to {rval_1}, connected to {label_1} that has {prop_1} equal to {val_1}?""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}{{{rprop_1}: '{rval_1}'}}]->(m:{label_2}) WHERE n.{prop_1} = '{val_1}' RETURN properties(m) AS props",
+        ),
+
+    #### Relationships with Properties: Two Labels, Two Properties, Relationship (with property) ####
+    QueryTemplate(
+        name="find_node_relation_node_count_relprops",
+        doc="Retrieve properties and counts of nodes connected via a specified relationship.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Find {prop_1} of the {label_1} and return it along with the count of {label_2} that are linked via {rel_1} where {rprop_1} is {rval_1}!""",
+        cypher="MATCH (n:{label_1}) -[r:{rel_1}]->(m:{label_2}) WHERE r.{rprop_1} = '{rval_1}' RETURN n.{prop_1} AS {prop_1}, count(m) AS count",
+        ),
+    QueryTemplate(
+        name="relation_with_and_where_relprops",
+        doc="Find node properties that are connected via a relationship with non-null property.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Find the {label_2} with a {prop_2} starting with {label_2[0]}, and linked with an {label_1} through {rel_1} relationship. The {label_1} must have {prop_1}: {val_1} and be {rel_1} with {rprop_1} recorded!""",
+        cypher="MATCH (n:{label_1} {{{prop_1}: '{val_1}'}}) -[r:{rel_1}]- (m:{label_2}) WHERE m.{prop_2} STARTS WITH '{label_2[0]}' AND r.{rprop_1} IS NOT NULL RETURN n.{prop_2}",
+        ),
+    QueryTemplate(
+        name="find_node_aggregation_date_rels_relprops",
+        doc="Find property average of a node in a specified relationship with another given node.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Calculate the average {prop_2} for {label_2} that is linked to {label_1} via {rel_1} where {rprop_1} is {rval_1} and has {prop_1} date before December 31, 2020!""",
+        cypher="MATCH (n:{label_1}) -[:{rel_1}{{{rprop_1}: '{rval_1}'}}]->(m:{label_2}) WHERE m.{prop_1} < date('2020-12-31') RETURN avg(m.{prop_2}) AS avg_{prop_2}",
+        ),
+    QueryTemplate(
+        name="where_and_simple_path_relprops",
+        doc="Retrieve properties of specific nodes that have relationships with given properties.",
+        sampler=RELATIONSHIP_WITH_PROPS,
+        sources=("all_rels",),
+        subschema=Subschema(nodes=[["label_1", "prop_1"], ["label_2", "prop_2"]], relationships=[["rel_1", "rprop_1"]], node_props=True, rel_props=True, types=True, prefix=""),
+        question="""Search for the {prop_2} in {label_2} that is linked through a {rel_1} relationship with {label_1} where {prop_1} is {val_1} and {rel_1} has {rprop_1} on {rval_1}!""",
+        cypher="MATCH (n:{label_1}) -[{rel_1[:2].lower()}:{rel_1} {{{rprop_1} : '{rval_1}'}}]->(m) WHERE n.{prop_1}='{val_1}' RETURN m.{prop_2}",
+        ),
+]}
@@ -1,19 +1,92 @@
 """Collection of basic Python helper functions"""
 
 import json
-from typing import Any, List, Dict, Callable
+from typing import Any, List, Dict, Callable, Iterable, Iterator, Hashable, Union, NamedTuple
 import pickle
+import sys
 import itertools
 from itertools import product, combinations
 import random
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+intern = sys.intern
+
+### Record types ###
+
+class NodeEntry(NamedTuple):
+    """[label, property, value] entry of the parsed node instances."""
+    label: str
+    prop: str
+    value: Any
+
+
+class RelationshipEntry(NamedTuple):
+    """[start, {property: value}, type, end, {property: value}] entry of the parsed relationship instances."""
+    start: str
+    start_props: Dict
+    rel: str
+    end: str
+    end_props: Dict
+
+
+class RelationshipPropsEntry(NamedTuple):
+    """[start, {property: value}, type, {property: value}, end, {property: value}] entry
+    of the parsed relationship with properties instances."""
+    start: str
+    start_props: Dict
+    rel: str
+    rel_props: Dict
+    end: str
+    end_props: Dict
+
+
+class Sample:
+    """Fine-tuning sample, saved as a dictionary with keys Prompt, Question, Schema, Cypher.
+    The keys can also be read as sample["Cypher"]."""
+
+    __slots__ = ("prompt", "question", "schema", "cypher")
+
+    KEYS = ("Prompt", "Question", "Schema", "Cypher")
+
+    def __init__(self, prompt: str, question: str, schema: str, cypher: str) -> None:
+        self.prompt = prompt
+        self.question = question
+        self.schema = schema
+        self.cypher = cypher
+
+    def __getitem__(self, key: str) -> str:
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key.lower())
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Sample):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Sample(question={self.question!r}, cypher={self.cypher!r})"
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"Prompt": self.prompt, "Question": self.question, "Schema": self.schema, "Cypher": self.cypher}
+
+
+def record_to_json(o: Any) -> Any:
+    """json default hook, writes the Sample records as dictionaries."""
+    if isinstance(o, Sample):
+        return o.to_dict()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
 
 ### File handlers ###
 
-def write_json(an_object: List[Any], file_path: str ) -> None:
-    """Writes a Python object to a json file."""
+def write_json(an_object: List[Any], file_path: str, cls: type = None) -> None:
+    """Writes a Python object to a json file, cls is an optional json.JSONEncoder subclass."""
     with open(file_path, "w") as fp:
-        json.dump(an_object, fp)
+        json.dump(an_object, fp, cls=cls, default=record_to_json)
 
 
 def read_json(file_path: str) -> Any:
@@ -23,14 +96,46 @@ def read_json(file_path: str) -> Any:
         return data
     
 
+def write_jsonl(records: Iterable[Any], file_path: str, cls: type = None) -> int:
+    """Writes the records to a json lines file, one record per line,
+    as they are produced. Returns the number of records written.
+    cls is an optional json.JSONEncoder subclass."""
+    count = 0
+    with open(file_path, "w") as fp:
+        for rec in records:
+            fp.write(json.dumps(rec, cls=cls, default=record_to_json))
+            fp.write("\n")
+            count += 1
+    return count
+
+
+def read_jsonl(file_path: str) -> Iterator[Any]:
+    """Lazily reads the records of a json lines file."""
+    with open(file_path, "r") as fp:
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_jsonl_groups(file_path: str,
+                      key: Callable[[Any], Hashable]
+                      ) -> List[List[Any]]:
+    """Reads a json lines file into a list of lists,
+    consecutive records with the same key are grouped together."""
+    return [list(group) for _, group in itertools.groupby(read_jsonl(file_path), key=key)]
+
+
 def write_pkl(an_object: Any, file_path: str) -> None:
     """Writes a Python object to a pickle file."""
     with open(file_path, 'wb') as f:
         pickle.dump(an_object, f)
 
 
-def read_pkl(an_object: Any, file_path: str) -> Any:
-    """Reads a pickle file."""
+def read_pkl(file_path: Any, legacy_file_path: str = None) -> Any:
+    """Reads a pickle file.
+    The former read_pkl(an_object, file_path) call form is still accepted."""
+    if legacy_file_path is not None:
+        file_path = legacy_file_path
     with open(file_path, 'rb') as f:
         an_object = pickle.load(f)
         return an_object
@@ -70,8 +175,79 @@ def flatten_list(nested_list: List[List]) -> List[str]:
     return flat_list
 
 
+def batched(lst: List[Any],
+            size: int
+            ) -> Iterator[List[Any]]:
+    """Splits a list into consecutive chunks of at most size elements."""
+    if size < 1:
+        raise ValueError("The batch size must be a positive integer.")
+    for i in range(0, len(lst), size):
+        yield lst[i:i + size]
+
+
+def iter_unique(entries: Iterable,
+                key: Callable[[Any], Hashable]
+                ) -> Iterator:
+    """Yields the entries whose key was not seen before, keeping the first one."""
+    seen = set()
+    for e in entries:
+        k = key(e)
+        if k not in seen:
+            seen.add(k)
+            yield e
+
+
+### Concurrency helpers ###
+
+def ordered_map(func: Callable[[Any], Any],
+                items: Iterable[Any],
+                max_workers: int = None,
+                max_pending: int = None,
+                ) -> Iterator[Any]:
+    """
+    Applies func to the items on a pool of max_workers threads and yields
+    the results in the order of the items.
+
+    At most max_pending calls (default 2 * max_workers) are in flight at a time,
+    so a slow consumer or a long input does not queue up unbounded work.
+    With max_workers None or 1 the items are processed sequentially.
+    """
+    if not max_workers or max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    max_pending = max_pending or 2 * max_workers
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            pending.append(executor.submit(func, item))
+        while pending:
+            yield pending.popleft().result()
+
+
 ### Helpers for building samples data ###
 
+def iter_node_sampler(nlist: Iterable[List],
+                      prompter: Callable[..., Dict],
+                      allow_repeats: bool
+                      ) -> Iterator[Dict]:
+    """
+    Lazy version of build_node_sampler, yields one fine-tuning entry at a time.
+    """
+
+    if allow_repeats:
+        entries = nlist
+    else:
+        # Filter the node instances for node, property duplicates
+        entries = iter_unique(nlist, key=lambda e: (e[0], e[1]))
+
+    for e in entries:
+        yield prompter(e[0], e[1], e[2])
+
+
 def build_node_sampler(nlist: List[List], 
                        prompter: Callable[..., Dict],
                        allow_repeats: bool
@@ -80,7 +256,8 @@ def build_node_sampler(nlist: List[List],
     Build the samples for queries that involve one node label with attribute, values.
 
     Input:
-    - nlist: [[label, property, value],...] extracted from parsed node instances
+    - nlist: [NodeEntry(label, property, value),...] extracted from parsed node instances,
+    or [[label, property, value], ...] lists
     - prompter: prompt builder function
     - allow_repeats: if repeated entries with the same label, property pair 
     but different values are to be included or not
@@ -89,23 +266,45 @@ def build_node_sampler(nlist: List[List],
     - fine-tuning data
     """
 
-    # Filter the node instances for node, property duplicates
-    seen = set()
-    filtered = [e for e in nlist if (e[0], e[1]) not in seen and not seen.add((e[0], e[1]))]
+    return list(iter_node_sampler(nlist, prompter, allow_repeats))
+    
 
-    sampler = []
+def group_by_label(nlist: Iterable[NodeEntry]
+                   ) -> Dict[str, List[NodeEntry]]:
+    """Buckets NodeEntry(label, property, value) (or [label, property, value]) entries by label,
+    keeping their order."""
+    buckets = defaultdict(list)
+    for e in nlist:
+        buckets[e[0]].append(e)
+    return buckets
+
+
+def iter_property_pairs(nlist_1: List[List],
+                        nlist_2: List[List],
+                        same_node: bool,
+                        allow_repeats: bool
+                        ) -> Iterator[tuple]:
+    """
+    Lazy version of get_property_pairs. Yields the same pairs, in the same order,
+    with a cost proportional to the number of pairs produced: same label pairs
+    come from per-label buckets of nlist_2, and without repeats each list is
+    deduplicated on (label, property) before the pairs are formed.
+    """
 
-    if allow_repeats:
-        entries = nlist
+    if not allow_repeats:
+        # The first occurrence of a (label_1, prop_1, label_2, prop_2) pair
+        # combines the first occurrences of (label_1, prop_1) and (label_2, prop_2)
+        nlist_1 = list(iter_unique(nlist_1, key=lambda e: (e[0], e[1])))
+        nlist_2 = list(iter_unique(nlist_2, key=lambda e: (e[0], e[1])))
+
+    if same_node:
+        buckets = group_by_label(nlist_2)
+        for e1 in nlist_1:
+            for e2 in buckets.get(e1[0], ()):
+                yield (e1, e2)
     else:
-        entries = filtered
+        yield from product(nlist_1, nlist_2)
 
-    for entry in entries:
-        temp_dict = prompter(entry[0], entry[1], entry[2])
-        sampler.append(temp_dict)
-
-    return sampler
-    
 
 def get_property_pairs(nlist_1: List[List],
                        nlist_2: List[List],
@@ -117,37 +316,41 @@ def get_property_pairs(nlist_1: List[List],
     and associated values.
 
     Input:
-    - nlist_1: [[label_1, property_1, value_1],...] extracted from node instances
-    - nlist_2: [[label_2, property_2, value_2],...] extracted from node instances
+    - nlist_1: [NodeEntry(label_1, property_1, value_1),...] extracted from node instances
+    - nlist_2: [NodeEntry(label_2, property_2, value_2),...] extracted from node instances
     - same_node: if label_1, label_2 can be the same or not
     - allow_repeats: if repeated entries with the same label, property pair 
     and different values are to be included or not
 
     Output:
-    - [label_1, prop_1, val_1, label_2, prop_2, val_2] if distinct labels
-    - [label_1, prop_1, val_1, prop_2, val_2] if the same label 
+    - (entry_1, entry_2) pairs of NodeEntry, with the same label if same_node
     """
 
-    prod = list(product(nlist_1, nlist_2))
-
-    if same_node:
-        output = [e for e in prod if e[0][0] == e[1][0]]
-    else:
-        output = prod
+    return list(iter_property_pairs(nlist_1, nlist_2,
+                                    same_node=same_node,
+                                    allow_repeats=allow_repeats))
+    
 
+def iter_nodes_property_pairs_sampler(nlist_1: List[List],
+                                      nlist_2: List[List],
+                                      prompter: Callable[..., Dict],
+                                      same_node: bool,
+                                      allow_repeats: bool,
+                                      )-> Iterator[Dict]:
+    """
+    Lazy version of build_nodes_property_pairs_sampler, yields one fine-tuning entry at a time.
+    """
 
-    seen_pairs = set()
-    filtered = [e for e in output if (e[0][0], e[0][1], e[1][0], e[1][1]) \
-    not in seen_pairs and not \
-    seen_pairs.add((e[0][0],e[0][1], e[1][0], e[1][1]))]
+    output = iter_property_pairs(nlist_1, nlist_2,
+                                 same_node=same_node,
+                                 allow_repeats=allow_repeats)
 
-    if allow_repeats:
-        output = output
-    else:
-        output = filtered
+    for e1, e2 in output:
+        if same_node:
+            yield prompter(e1[0], e1[1], e1[2], e2[1], e2[2])
+        else:
+            yield prompter(e1[0], e1[1], e1[2], e2[0], e2[1], e2[2])
 
-    return output
-    
 
 def build_nodes_property_pairs_sampler(nlist_1: List[List],
                                        nlist_2: List[List],
@@ -160,8 +363,8 @@ def build_nodes_property_pairs_sampler(nlist_1: List[List],
     Builds sampler for pairs of nodes, property, values with or without repeats.
     
     Input:
-    - nlist_1: [[label_1, property_1, value_1],...] extracted from node instances
-    - nlist_2: [[label_2, property_2, value_2],...] extracted from node instances
+    - nlist_1: [NodeEntry(label_1, property_1, value_1),...] extracted from node instances
+    - nlist_2: [NodeEntry(label_2, property_2, value_2),...] extracted from node instances
     - prompter: prompt builder function
     - same_node: if label_1, label_2 can be the same or not
     - allow_repeats: if repeated entries with the same label, property pair 
@@ -172,23 +375,23 @@ def build_nodes_property_pairs_sampler(nlist_1: List[List],
 
     """
 
-    output = get_property_pairs(nlist_1, nlist_2,
-                                same_node=same_node,
-                                allow_repeats=allow_repeats)
-
-    sampler = []
+    return list(iter_nodes_property_pairs_sampler(nlist_1, nlist_2, prompter,
+                                                  same_node=same_node,
+                                                  allow_repeats=allow_repeats))
+    
+    
+def iter_nodes_pairs(nodes: List[str],
+                     prompter: Callable[..., Dict],
+                     allow_repeats: bool,
+                     ) -> Iterator[Dict]:
+    """
+    Lazy version of build_nodes_pairs, yields one fine-tuning entry at a time.
+    """
 
-    for e in output:
-        if same_node:
-            temp_dict = prompter(e[0][0], e[0][1], e[0][2], e[1][1], e[1][2])
-        else:
-            temp_dict = prompter(e[0][0], e[0][1], e[0][2], e[1][0], e[1][1], e[1][2])
+    for e in product(nodes, nodes):
+        yield prompter(e[0], e[1])
 
-        sampler.append(temp_dict)
 
-    return sampler
-    
-    
 def build_nodes_pairs(nodes: List[str],
                       prompter: Callable[..., Dict],
                       allow_repeats: bool,
@@ -206,17 +409,25 @@ def build_nodes_pairs(nodes: List[str],
     - fine-tuning data
     """
 
-    output = list(product(nodes, nodes))
+    return list(iter_nodes_pairs(nodes, prompter, allow_repeats))
+    
 
-    sampler = []
+def iter_relationships_samples(rel_list: Iterable[Any],
+                               prompter: Callable[..., Dict],
+                               allow_repeats: bool) -> Iterator[Dict]:
+    """
+    Lazy version of build_relationships_samples, yields one fine-tuning entry at a time.
+    """
 
-    for e in output:
-        temp_dict = prompter(e[0], e[1])
+    if not allow_repeats:
+        # Filter the instances for node, property duplicates
+        rel_list = iter_unique(rel_list, key=lambda e: (e[0], e[2], e[3]))
 
-        sampler.append(temp_dict)
+    for e in rel_list:
+        for k, v in e[1].items():
+            for kk, vv in e[4].items():
+                yield prompter(e[0], k, v, e[2], e[3], kk, vv)
 
-    return sampler
-    
 
 def build_relationships_samples(rel_list: List[Any],
                                 prompter: Callable[..., Dict],
@@ -227,8 +438,8 @@ def build_relationships_samples(rel_list: List[Any],
     The start and end nodes properties can be selected using their datatypes.
     
     Input:
-    - rel_list: [start_label, [{property: val}, ...], relationship_type, end_label, 
-    [{property_: value},...] are extracted from relationship instances
+    - rel_list: [RelationshipEntry(start_label, {property: val, ...}, relationship_type, end_label,
+    {property: value, ...}), ...] extracted from relationship instances, or the same entries as lists
     - prompter: prompt builder function
     - allow_repeats: if repeated entries with the same start node, relationship type, end node 
     are to be included or not
@@ -238,27 +449,26 @@ def build_relationships_samples(rel_list: List[Any],
 
     """
     
-     # Filter the instances for node, property duplicates
-    seen = set()
-    filtered = [e for e in rel_list if (e[0], e[2], e[3]) not in seen and not seen.add((e[0], e[2], e[3]))]
-
+    return list(iter_relationships_samples(rel_list, prompter, allow_repeats))
+    
 
-    if allow_repeats:
-        rel_list= rel_list
-    else:
-        rel_list = filtered
+def iter_relationships_props_samples(rel_list: Iterable[Any],
+                                     prompter: Callable[..., Dict],
+                                     allow_repeats: bool) -> Iterator[Dict]:
+    """
+    Lazy version of build_relationships_props_samples, yields one fine-tuning entry at a time.
+    """
 
-    sampler = []
+    if not allow_repeats:
+        # Filter the instances for node, property duplicates
+        rel_list = iter_unique(rel_list, key=lambda e: (e[0], e[2], e[4]))
 
     for e in rel_list:
         for k, v in e[1].items():
-            for kk, vv in e[4].items():
-                temp_dict = prompter(e[0], k, v, e[2], e[3], kk, vv)
-                sampler.append(temp_dict)
-
+            for kk, vv in e[3].items():
+                for kkk, vvv in e[5].items():
+                    yield prompter(e[0], k, v, e[2], kk, vv, e[4], kkk, vvv)
 
-    return sampler
-    
 
 def build_relationships_props_samples(rel_list: List[Any],
                                 prompter: Callable[..., Dict],
@@ -269,52 +479,72 @@ def build_relationships_props_samples(rel_list: List[Any],
     The start and end nodes properties as well as the relationship properties can be selected using their datatypes.
     
     Input:
-    - rel_list: [start_label, {property: val, prop: val}, relationship_type , {property: val, property: val}, end_label, {property_: value, ...}] 
-    are extracted from relationship instances
+    - rel_list: [RelationshipPropsEntry(start_label, {property: val, ...}, relationship_type, {property: val, ...},
+    end_label, {property: value, ...}), ...] extracted from relationship instances,
+    or the same entries as lists
     - prompter: prompt builder function
     - allow_repeats: if repeated entries with the same start node, relationship type, end node are to be included or not
 
     Output:
-    - list of dictionaries with keys: Prompt, Question, Schema, Cypher
+    - fine-tuning data
     """
     
-    # Filter the instances for node, property duplicates
-    seen = set()
-    filtered = [e for e in rel_list if (e[0], e[2], e[4]) not in seen and not seen.add((e[0], e[2], e[4]))]
-
+    return list(iter_relationships_props_samples(rel_list, prompter, allow_repeats))
 
-    if allow_repeats:
-        rel_list= rel_list
-    else:
-        rel_list = filtered
-
-    sampler = []
+    
 
-    for e in rel_list:
-        for k, v in e[1].items():
-            for kk, vv in e[3].items():
-                for kkk, vvv in e[5].items():
-                    temp_dict = prompter(e[0], k, v, e[2], kk, vv, e[4], kkk, vvv)
-                    sampler.append(temp_dict)
+def reservoir_sample(entries: Iterable[Any],
+                     sample_max: int,
+                     rng: Union[random.Random, Any] = random,
+                     ) -> List[Any]:
+    """
+    Uniformly selects at most sample_max entries from a stream in one pass,
+    keeping only the selected entries in memory (reservoir sampling).
+    """
+    reservoir = []
+    if sample_max <= 0:
+        return reservoir
 
-    return sampler
+    for i, e in enumerate(entries):
+        if i < sample_max:
+            reservoir.append(e)
+        else:
+            j = rng.randrange(i + 1)
+            if j < sample_max:
+                reservoir[j] = e
+    return reservoir
 
-    
 
-def collect_samples(sampler: List[Dict], 
-                    sample_max: int) -> List[Dict]:
+def collect_samples(sampler: Iterable[Dict], 
+                    sample_max: int,
+                    seed: Any = None,
+                    ) -> List[Dict]:
     
     """
     Function to select a specified number of samples of each type.
     
     Input:
-    - sampler: list of dictionaries with keys: Prompt, Question, Schema, Cypher
+    - sampler: list of samples (Sample records or dictionaries with keys Prompt, Question, Schema, Cypher),
+    or a generator of them (e.g. from the iter_* builders), which is consumed lazily
     - sample_max: max number of samples of each type
+    - seed: seed or random.Random instance for reproducible selections,
+    the global random module is used if None
 
     Output:
-    - list of dictionaries with keys: Prompt, Question, Schema, Cypher
+    - list of the selected samples
     """
-    
+
+    if seed is None:
+        rng = random
+    elif isinstance(seed, random.Random):
+        rng = seed
+    else:
+        rng = random.Random(seed)
+
+    # Generators are sampled on the fly, with memory bounded by sample_max
+    if not isinstance(sampler, list):
+        return reservoir_sample(sampler, sample_max, rng)
+
     num_samples = len(sampler)
 
     # Ensure sample_max is not greater than the number of available samples
@@ -323,8 +553,4 @@ def collect_samples(sampler: List[Dict],
 
     # Only sample if there are more than M samples
     else:
-        return random.sample(sampler, sample_max)
-        
-
-
-
+        return rng.sample(sampler, sample_max)
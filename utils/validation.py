@@ -0,0 +1,129 @@
+"""Validation of generated Cypher queries with EXPLAIN.
+
+The queries are planned against the target graph, without being run. Queries
+with the same structure (the query with its literals stripped) plan the same
+way, so only one representative per structure is sent and the answer is
+cached. The representatives go in batches, one session per batch, and the
+batches run in parallel over the connection pool.
+
+The explainer is any object with an explain(queries) method returning, for
+each query, None if it plans and the error message otherwise: a Neo4jGraph,
+or a local stand-in for testing."""
+
+from typing import Any, List, Dict, Iterable, Iterator, Tuple
+from itertools import islice
+
+# Import local modules
+from utils.utilities import *
+from utils.dedup import normalize_cypher
+
+
+def structural_key(query: str) -> str:
+    """The query with its string and number literals stripped and its whitespace normalized."""
+    return normalize_cypher(query, mask_literals=True)
+
+
+class QueryValidator:
+    """Batched, cached EXPLAIN validation of Cypher queries."""
+
+    def __init__(self,
+                 explainer: Any,
+                 batch_size: int = 50,
+                 max_workers: int = 4,
+                 cache: Dict[str, Any] = None,
+                 ) -> None:
+        """
+        - explainer: object with an explain(queries) method, e.g. a Neo4jGraph
+        - batch_size: number of queries planned per session
+        - max_workers: number of batches planned in parallel
+        - cache: structural key -> error message (None if valid), e.g. from a previous run
+        """
+        self.explainer = explainer
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.cache: Dict[str, Any] = dict(cache or {})
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return (f"QueryValidator(batch_size={self.batch_size}, max_workers={self.max_workers}, "
+                f"cached={len(self.cache)})")
+
+    def _explain_batch(self,
+                       batch: List[Tuple[str, str]],
+                       ) -> List[Tuple[str, Any]]:
+        errors = self.explainer.explain([query for _, query in batch])
+        return [(key, error) for (key, _), error in zip(batch, errors)]
+
+    def validate_queries(self,
+                         queries: Iterable[str],
+                         ) -> List[Any]:
+        """Returns, for each query, None if it plans and the error message otherwise."""
+
+        queries = list(queries)
+        keys = [structural_key(query) for query in queries]
+
+        # One representative query per structure that is not cached yet
+        pending = {}
+        for key, query in zip(keys, queries):
+            if key in self.cache or key in pending:
+                self.hits += 1
+            else:
+                self.misses += 1
+                pending[key] = query
+
+        batches = batched(list(pending.items()), self.batch_size)
+        for results in ordered_map(self._explain_batch, batches, max_workers=self.max_workers):
+            self.cache.update(results)
+
+        return [self.cache[key] for key in keys]
+
+    def validate_samples(self,
+                         samples: List[Dict],
+                         drop: bool = False,
+                         ) -> List[Dict]:
+        """
+        Validates the Cypher entry of the samples.
+
+        Output:
+        - drop=True: the valid samples
+        - drop=False: all the samples, the invalid ones with an extra Error key
+        """
+        errors = self.validate_queries([sample["Cypher"] for sample in samples])
+        if drop:
+            return [sample for sample, error in zip(samples, errors) if error is None]
+        return [sample if error is None else dict(sample, Error=error)
+                for sample, error in zip(samples, errors)]
+
+    def iter_validate_samples(self,
+                              samples: Iterable[Dict],
+                              drop: bool = False,
+                              chunk_size: int = 10_000,
+                              ) -> Iterator[Dict]:
+        """Lazy validate_samples: the samples are read and validated chunk_size at a time,
+        the results of a chunk are yielded before the next one is read."""
+        samples = iter(samples)
+        for chunk in iter(lambda: list(islice(samples, chunk_size)), []):
+            yield from self.validate_samples(chunk, drop=drop)
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Returns hits, misses (queries planned), number of structures and invalid ones."""
+        calls = self.hits + self.misses
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "structures": len(self.cache),
+                "invalid": sum(1 for error in self.cache.values() if error is not None),
+                "hit_rate": self.hits / calls if calls else 0.0}
+
+    def report(self) -> str:
+        """One line summary of the validation."""
+        info = self.cache_info()
+        return (f"Cypher validation: {info['misses']} queries planned for {info['hits'] + info['misses']} "
+                f"samples (hit rate {info['hit_rate']:.1%}), {info['invalid']} of "
+                f"{info['structures']} query structures are invalid")
+
+    def save_cache(self,
+                   file_path: str,
+                   ) -> None:
+        """Saves the cache to a json file, to be passed back with read_json."""
+        write_json(self.cache, file_path)